@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+import datetime
+import os
+import sys
+
+def usage():
+	print(f"Usage: {sys.argv[0]} startingDate simulationLength houseCount|populationFile outputFolder workerCount [port [seed]]")
+
+if len(sys.argv) not in (6, 7, 8):
+	usage()
+	sys.exit(1)
+
+try:
+	startingDate = datetime.datetime.strptime(sys.argv[1], "%Y-%m-%d")
+	simulationLength = max(0, int(sys.argv[2]))
+	# instead of the number of houses, a file with a saved population can be given
+	if os.path.isfile(sys.argv[3]):
+		houseCount = None
+		populationFile = sys.argv[3]
+	else:
+		houseCount = max(0, int(sys.argv[3]))
+		populationFile = None
+	outputFolder = sys.argv[4] # mostly anything can be a path under POSIX, this would be too hard to validate anyway
+	workerCount = max(1, int(sys.argv[5]))
+	port = int(sys.argv[6]) if len(sys.argv) >= 7 else 5555
+	if not 0 < port < 65536:
+		raise ValueError()
+	seed = int(sys.argv[7]) if len(sys.argv) == 8 else None
+except ValueError:
+	usage()
+	sys.exit(1)
+
+# load only the statistics the simulation needs, this has to be configured before importing the simulator
+from simulator import dataConfig
+dataConfig.configureForSimulation(startingDate, simulationLength)
+
+# importing after already running code is evil, I know
+# but this takes a long time and would just delay the parameter checking
+from simulator.distributed import Coordinator
+from simulator.population import Population
+
+population = Population.load(populationFile) if populationFile is not None else None
+Coordinator.run(startingDate, simulationLength, houseCount, workerCount, outputFolder, port=port, seed=seed, population=population)
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+
+import sys
+
+def usage():
+	print(f"Usage: {sys.argv[0]} houseCount populationFile [seed]")
+
+if len(sys.argv) not in (3, 4):
+	usage()
+	sys.exit(1)
+
+try:
+	houseCount = max(0, int(sys.argv[1]))
+	populationFile = sys.argv[2] # mostly anything can be a path under POSIX, this would be too hard to validate anyway
+	seed = int(sys.argv[3]) if len(sys.argv) == 4 else None
+except ValueError:
+	usage()
+	sys.exit(1)
+
+# importing after already running code is evil, I know
+# but this takes a long time and would just delay the parameter checking
+import numpy
+
+from simulator.population import Population
+
+if seed is not None:
+	numpy.random.seed(seed % 2**32)
+
+print("Creating population...")
+Population.random(houseCount).save(populationFile)
@@ -2,5 +2,7 @@
 
 DIR=$(dirname "${BASH_SOURCE[0]}")
 pushd "${DIR}" > /dev/null
-simulator/data/download.sh
+simulator/data/download.sh "$@"
+status=$?
 popd > /dev/null
+exit $status
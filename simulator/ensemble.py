@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+
+import datetime
+import sys
+
+def usage():
+	print(f"Usage: {sys.argv[0]} startingDate simulationLength houseCount outputFolder maxReplicas [metric tolerance]")
+
+if len(sys.argv) not in (6, 8):
+	usage()
+	sys.exit(1)
+
+try:
+	startingDate = datetime.datetime.strptime(sys.argv[1], "%Y-%m-%d")
+	simulationLength = max(0, int(sys.argv[2]))
+	houseCount = max(0, int(sys.argv[3]))
+	outputFolder = sys.argv[4] # mostly anything can be a path under POSIX, this would be too hard to validate anyway
+	maxReplicas = max(1, int(sys.argv[5]))
+	if len(sys.argv) == 8:
+		metric = sys.argv[6]
+		tolerance = max(0.0, float(sys.argv[7]))
+		# the metrics module doesn't load any statistics, so it can be imported already here
+		from simulator import metrics
+		if metric not in metrics.names:
+			raise ValueError(f"Unknown metric: {metric}")
+	else:
+		metric = "SmartPeakToAverage"
+		tolerance = 0.01
+except ValueError:
+	usage()
+	sys.exit(1)
+
+# load only the statistics the simulations need, this has to be configured before importing the simulator
+from simulator import dataConfig
+dataConfig.configureForSimulation(startingDate, simulationLength)
+
+# importing after already running code is evil, I know
+# but this takes a long time and would just delay the parameter checking
+from simulator.ensemble import Ensemble
+
+Ensemble.run(startingDate, simulationLength, houseCount, outputFolder, maxReplicas=maxReplicas, metric=metric, tolerance=tolerance)
@@ -1,26 +1,46 @@
 #!/usr/bin/env python3
 
 import datetime
+import os
 import sys
 
 def usage():
-	print(f"Usage: {sys.argv[0]} startingDate simulationLength houseCount outputFolder")
+	print(f"Usage: {sys.argv[0]} startingDate simulationLength houseCount|populationFile outputFolder [slotLength [tickLength]]")
 
-if len(sys.argv) != 5:
+if len(sys.argv) not in (5, 6, 7):
 	usage()
 	sys.exit(1)
 
 try:
 	startingDate = datetime.datetime.strptime(sys.argv[1], "%Y-%m-%d")
 	simulationLength = max(0, int(sys.argv[2]))
-	houseCount = max(0, int(sys.argv[3]))
+	# instead of the number of houses, a file with a saved population can be given
+	if os.path.isfile(sys.argv[3]):
+		houseCount = None
+		populationFile = sys.argv[3]
+	else:
+		houseCount = max(0, int(sys.argv[3]))
+		populationFile = None
 	outputFolder = sys.argv[4] # mostly anything can be a path under POSIX, this would be too hard to validate anyway
+	slotLength = int(sys.argv[5]) if len(sys.argv) >= 6 else 1
+	if slotLength not in [1, 5, 15, 60]:
+		raise ValueError()
+	tickLength = int(sys.argv[6]) if len(sys.argv) == 7 else 24 * 60
+	if tickLength <= 0 or tickLength % slotLength != 0 or ((24 * 60) % tickLength != 0 and tickLength % (24 * 60) != 0):
+		raise ValueError()
 except ValueError:
 	usage()
 	sys.exit(1)
 
+# load only the statistics the simulation needs, this has to be configured before importing the simulator
+from simulator import dataConfig, timeConfig
+timeConfig.configure(tickLength=tickLength)
+dataConfig.configureForSimulation(startingDate, simulationLength)
+
 # importing after already running code is evil, I know
 # but this takes a long time and would just delay the parameter checking
 from simulator import Simulator
+from simulator.population import Population
 
-Simulator.run(startingDate, simulationLength, houseCount, outputFolder)
+population = Population.load(populationFile) if populationFile is not None else None
+Simulator.run(startingDate, simulationLength, houseCount, outputFolder, population=population, slotLength=slotLength, tickLength=tickLength)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import sys
+
+def usage():
+	print(f"Usage: {sys.argv[0]} serverConfig")
+
+if len(sys.argv) != 2:
+	usage()
+	sys.exit(1)
+
+try:
+	with open(sys.argv[1], "r") as serverConfigFile:
+		serverConfig = json.load(serverConfigFile)
+	# each population is either a number of houses to generate or a file with a saved population
+	populationSources = serverConfig["populations"]
+	if len(populationSources) == 0:
+		raise ValueError("at least one population is needed")
+	for name, source in populationSources.items():
+		if not (isinstance(source, str) and os.path.isfile(source)) and int(source) < 0:
+			raise ValueError(f"population {name} must be a house count or a population file")
+	port = int(serverConfig.get("port", 8555))
+	if not 0 < port < 65536:
+		raise ValueError("port must be between 1 and 65535")
+	socketPath = serverConfig.get("socket")
+	processes = serverConfig.get("processes")
+	seed = serverConfig.get("seed")
+	slotLength = serverConfig.get("slotLength")
+	if slotLength is not None and int(slotLength) not in [1, 5, 15, 60]:
+		raise ValueError("slotLength must be one of 1, 5, 15 or 60 minutes")
+except (OSError, ValueError, KeyError, TypeError) as e:
+	print(f"Invalid server config: {e}")
+	usage()
+	sys.exit(1)
+
+# importing after already running code is evil, I know
+# but this takes a long time and would just delay the parameter checking
+# the queries can ask for any dates, so all the downloaded statistics are loaded
+import numpy
+
+from simulator import timeConfig
+from simulator.population import Population
+from simulator.server import Server
+
+if slotLength is not None:
+	timeConfig.configure(slotLength=int(slotLength))
+if seed is not None:
+	numpy.random.seed(seed % 2**32)
+
+print("Creating populations...")
+populations = {}
+for name, source in populationSources.items():
+	if isinstance(source, str) and os.path.isfile(source):
+		populations[name] = Population.load(source)
+	else:
+		populations[name] = Population.random(int(source))
+
+Server.run(populations, port=port, socketPath=socketPath, processes=processes)
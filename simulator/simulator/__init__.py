@@ -1,3 +1,9 @@
 #!/usr/bin/env python3
 
-from .simulator import Simulator
+# the simulator is imported only when it's first used, as importing it loads all the statistics
+# this way the config modules (e.g. the data config) can be imported and changed before the statistics are loaded
+def __getattr__(name: str):
+	if name == "Simulator":
+		from .simulator import Simulator
+		return Simulator
+	raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -5,27 +5,33 @@ import math
 import random
 
 from abc import ABC, abstractmethod, abstractclassmethod
-from types import SimpleNamespace
+from typing import Dict, Optional, Tuple
 
 import numpy
 
 from . import applianceStatistics
+from . import priceConfig
+from . import timeConfig
 from . import utils
 
 from .constants import oneDay
-from .profile import Profile
-from .utils import minutesIn
+from .priceIndex import PriceIndex
+from .profile import Profile, SparseProfile
+from .utils import slotOfDay, slotsIn
 
 # abstract base class for household appliances
 class Appliance(ABC):
+	# the attributes are kept in slots instead of a dictionary, as the large simulations have millions of appliances
+	# the usage statistics are not in the slots, they are set for each appliance class
+	__slots__ = ("currentDT", "priceIndex", "smartDemand", "uncontrolledDemand", "spreadOutDemand")
+	
 	# current date and time in the simulation
 	currentDT: datetime.datetime
-	# an object for storing information between demand calculations
-	memory: SimpleNamespace
 	# appliance usage statistics
 	usageStatistics: applianceStatistics.ApplianceStatistics
-	# the electricity price for any given minute in the simulation
-	priceProfile: Profile
+	# the data derived from the electricity prices of the house, shared with the other appliances in the house
+	# the appliance gets it when it's added to the house, the house keeps it up to date with the price signals
+	priceIndex: PriceIndex
 	# the electricity demand of this appliance if it was smart
 	smartDemand: Profile
 	# the electricity demand of this appliance if it would charge as early as possible
@@ -35,8 +41,7 @@ class Appliance(ABC):
 	
 	# constructor, just prepares the variables
 	def __init__(self):
-		self.memory = SimpleNamespace()
-		self.priceProfile = Profile()
+		self.priceIndex = None
 		self.smartDemand = Profile()
 		self.uncontrolledDemand = Profile()
 		self.spreadOutDemand = Profile()
@@ -52,21 +57,22 @@ class Appliance(ABC):
 		# generate usage for one day in the future
 		self.generateUsage(dt, dt + oneDay)
 	
-	# moves ahead one day and does all the calculations that need to be done in that day
+	# moves ahead one tick and does all the calculations that need to be done in that tick
 	def tick(self):
 		# remove past, unneeded values from the profiles to free up some memory
-		self.priceProfile.prune(self.currentDT - oneDay)
+		# the price data is pruned by the house, as it's shared by all its appliances
 		self.smartDemand.prune(self.currentDT - oneDay)
 		self.uncontrolledDemand.prune(self.currentDT - oneDay)
 		self.spreadOutDemand.prune(self.currentDT - oneDay)
 		
-		# generate appliance usage for one more day in the future
-		self.generateUsage(self.currentDT + oneDay, self.currentDT + 2 * oneDay)
-		# calculate the power demand for the next day
-		self.calculateDemand(self.currentDT, self.currentDT + oneDay)
+		# generate appliance usage for one more tick in the future, the usage is always known at least a day ahead
+		tick = timeConfig.tick()
+		self.generateUsage(self.currentDT + oneDay, self.currentDT + oneDay + tick)
+		# calculate the power demand for the next tick
+		self.calculateDemand(self.currentDT, self.currentDT + tick)
 		
-		# move ahead one day
-		self.currentDT += oneDay
+		# move ahead one tick
+		self.currentDT += tick
 	
 	# generates appliance usage for a given time interval
 	@abstractmethod
@@ -93,25 +99,31 @@ class Appliance(ABC):
 	@abstractmethod
 	def calculateSpreadOutDemand(self, fromDT: datetime.datetime, toDT: datetime.datetime):
 		pass
-	
-	# sets the electricity price profile for a given time interval
-	def setPriceProfile(self, dt: datetime.datetime, prices: numpy.ndarray):
-		self.priceProfile.set(dt, prices)
 
 # abstract base class for battery-based household appliances (e.g. electric car)
 class Battery(Appliance, ABC):
+	__slots__ = ("chargingPower", "usages")
+	
 	# appliance usage statistics
 	usageStatistics: applianceStatistics.BatteryStatistics
 	
 	# the power with which the battery charges
 	chargingPower: float # kW
+	# for each day the disconnection time, connection time and charge needed after the usage [kWh]
+	usages: Dict[datetime.date, Tuple[Tuple[datetime.time, datetime.time], float]]
+	# the electricity demands of the battery, stored as the intervals when it is charging
+	smartDemand: SparseProfile
+	uncontrolledDemand: SparseProfile
+	spreadOutDemand: SparseProfile
 	
 	# constructor, just prepares the variables
 	def __init__(self, chargingPower: float = 0):
 		self.chargingPower = chargingPower
 		super().__init__()
-		# for each day keeps disconnection time, connection time and charge needed after the usage
-		self.memory.usages = dict()
+		self.smartDemand = SparseProfile()
+		self.uncontrolledDemand = SparseProfile()
+		self.spreadOutDemand = SparseProfile()
+		self.usages = dict()
 	
 	# creates a random appliance with the right parameters
 	@classmethod
@@ -124,7 +136,7 @@ class Battery(Appliance, ABC):
 		# we need to know the usage for one day ahead (at least the disconnect time)
 		for midnight in utils.midnightsBetween(fromDT, toDT+oneDay):
 			date = midnight.date()
-			if date not in self.memory.usages:
+			if date not in self.usages:
 				disconnectionTime, connectionTime = self.usageStatistics.randomUsageInterval(date)
 				# if the values are invalid make up an usage interval giving us as much charging time as possible
 				if disconnectionTime is None:
@@ -133,40 +145,38 @@ class Battery(Appliance, ABC):
 					connectionTime = datetime.time(00, 00)
 					
 				chargeNeeded = self.usageStatistics.randomNeededCharge(date)
-				self.memory.usages[date] = ((disconnectionTime, connectionTime), chargeNeeded)
+				self.usages[date] = ((disconnectionTime, connectionTime), chargeNeeded)
 	
 	# calculates appliance power demand for a given time interval acting as if the appliance was smart
 	def calculateSmartDemand(self, fromDT: datetime.datetime, toDT: datetime.datetime):
-		# for each day in the interval, it charges the battery in the minutes with the cheapest electricity available
+		# for each day in the interval, it charges the battery in the time slots with the cheapest electricity available
 		for midnight in utils.midnightsBetween(fromDT, toDT):
 			date = midnight.date()
-			powerProfile = numpy.zeros(2*minutesIn(oneDay), dtype=float)
 			
 			# get the needed charge and the interval when the battery is connected
-			((_, connectionTime), chargeNeeded) = self.memory.usages[date]
-			((disconnectionTime, _), _) = self.memory.usages[date + oneDay]
+			((_, connectionTime), chargeNeeded) = self.usages[date]
+			((disconnectionTime, _), _) = self.usages[date + oneDay]
 			
 			# get for how long the battery must be charged
-			chargePerSlot = self.chargingPower / 60 # kWh per minute
+			chargePerSlot = self.chargingPower * timeConfig.slotLength / 60 # kWh per time slot
 			slotsToChargeCompletely = math.ceil(chargeNeeded / chargePerSlot)
 			
 			# if it needs to be charged, charge it
 			if slotsToChargeCompletely > 0:
-				connectionSlot = connectionTime.hour * 60 + connectionTime.minute
-				disconnectionSlot = minutesIn(oneDay) + disconnectionTime.hour * 60 + disconnectionTime.minute
+				connectionSlot = slotOfDay(connectionTime, roundUp=True)
+				disconnectionSlot = slotsIn(oneDay) + slotOfDay(disconnectionTime)
 				
 				# if there is not enough time to charge the battery completely, just charge it all the available time
 				if disconnectionSlot - connectionSlot <= slotsToChargeCompletely:
-					powerProfile[connectionSlot:disconnectionSlot] = self.chargingPower
+					self.smartDemand.addEvent(midnight, connectionSlot, self.chargingPower, disconnectionSlot - connectionSlot)
 				# otherwise pick enough of the cheapest time slots and charge the battery during those
 				else:
-					priceProfile = self.priceProfile.get(midnight, midnight+2*oneDay)
-					cheapestSlots = numpy.argpartition(priceProfile[connectionSlot:disconnectionSlot], slotsToChargeCompletely)[:slotsToChargeCompletely] + connectionSlot
-					powerProfile[cheapestSlots[:-1]] = self.chargingPower
+					cheapestSlots = self.priceIndex.cheapestSlots(midnight, midnight+2*oneDay, connectionSlot, disconnectionSlot, slotsToChargeCompletely)
+					# the cheapest slots are mostly next to each other, so they are saved as runs of consecutive slots
+					for startingSlot, length in utils.consecutiveRuns(cheapestSlots[:-1]):
+						self.smartDemand.addEvent(midnight, startingSlot, self.chargingPower, length)
 					lastSlotCharge = chargeNeeded - (chargePerSlot * (slotsToChargeCompletely - 1))
-					powerProfile[cheapestSlots[-1]] = lastSlotCharge * 60
-			
-			self.smartDemand.add(midnight, powerProfile)
+					self.smartDemand.addEvent(midnight, int(cheapestSlots[-1]), lastSlotCharge * 60 / timeConfig.slotLength, 1)
 	
 	# calculates appliance power demand for a given time interval acting as if the battery wanted to charge as early as possible
 	def calculateUncontrolledDemand(self, fromDT: datetime.datetime, toDT: datetime.datetime):
@@ -174,31 +184,27 @@ class Battery(Appliance, ABC):
 		for midnight in utils.midnightsBetween(fromDT, toDT):
 			date = midnight.date()
 			
-			powerProfile = numpy.zeros(2*minutesIn(oneDay), dtype=float)
-			
 			# get the needed charge and the interval when the battery is connected
-			((_, connectionTime), chargeNeeded) = self.memory.usages[date]
-			((disconnectionTime, _), _) = self.memory.usages[date + oneDay]
+			((_, connectionTime), chargeNeeded) = self.usages[date]
+			((disconnectionTime, _), _) = self.usages[date + oneDay]
 			
 			# get for how long the battery must be charged
-			chargePerSlot = self.chargingPower / 60
+			chargePerSlot = self.chargingPower * timeConfig.slotLength / 60
 			slotsToChargeCompletely = math.ceil(chargeNeeded / chargePerSlot)
 			
 			# if it needs to be charged, charge it
 			if slotsToChargeCompletely > 0:
-				connectionSlot = connectionTime.hour * 60 + connectionTime.minute
-				disconnectionSlot = minutesIn(oneDay) + disconnectionTime.hour * 60 + disconnectionTime.minute
+				connectionSlot = slotOfDay(connectionTime, roundUp=True)
+				disconnectionSlot = slotsIn(oneDay) + slotOfDay(disconnectionTime)
 				
 				# if there is not enough time to charge the battery completely, just charge it all the available time
 				if disconnectionSlot - connectionSlot < slotsToChargeCompletely:
-					powerProfile[connectionSlot:disconnectionSlot] = self.chargingPower
+					self.uncontrolledDemand.addEvent(midnight, connectionSlot, self.chargingPower, disconnectionSlot - connectionSlot)
 				# otherwise start charging it as soon as it is available and charge until it's full
 				else:
-					powerProfile[connectionSlot:connectionSlot+slotsToChargeCompletely-1] = self.chargingPower
+					self.uncontrolledDemand.addEvent(midnight, connectionSlot, self.chargingPower, slotsToChargeCompletely - 1)
 					lastSlotCharge = chargeNeeded - (chargePerSlot * (slotsToChargeCompletely - 1))
-					powerProfile[connectionSlot+slotsToChargeCompletely] = lastSlotCharge * 60
-			
-			self.uncontrolledDemand.add(midnight, powerProfile)
+					self.uncontrolledDemand.addEvent(midnight, connectionSlot + slotsToChargeCompletely, lastSlotCharge * 60 / timeConfig.slotLength, 1)
 	
 	# calculates appliance power demand for a given time interval acting as if the battery wanted to charge as evenly as possible
 	def calculateSpreadOutDemand(self, fromDT: datetime.datetime, toDT: datetime.datetime):
@@ -206,57 +212,65 @@ class Battery(Appliance, ABC):
 		for midnight in utils.midnightsBetween(fromDT, toDT):
 			date = midnight.date()
 			
-			powerProfile = numpy.zeros(2*minutesIn(oneDay), dtype=float)
-			
 			# get the needed charge and the interval when the battery is connected
-			((_, connectionTime), chargeNeeded) = self.memory.usages[date]
-			((disconnectionTime, _), _) = self.memory.usages[date + oneDay]
+			((_, connectionTime), chargeNeeded) = self.usages[date]
+			((disconnectionTime, _), _) = self.usages[date + oneDay]
 			
 			# get for how long the battery must be charged
-			chargePerSlot = self.chargingPower / 60
+			chargePerSlot = self.chargingPower * timeConfig.slotLength / 60
 			slotsToChargeCompletely = math.ceil(chargeNeeded / chargePerSlot)
 			
 			# if it needs to be charged, charge it
 			if slotsToChargeCompletely > 0:
-				connectionSlot = connectionTime.hour * 60 + connectionTime.minute
-				disconnectionSlot = minutesIn(oneDay) + disconnectionTime.hour * 60 + disconnectionTime.minute
+				connectionSlot = slotOfDay(connectionTime, roundUp=True)
+				disconnectionSlot = slotsIn(oneDay) + slotOfDay(disconnectionTime)
 				
 				# if there is not enough time to charge the battery completely, just charge it all the available time
 				if disconnectionSlot - connectionSlot < slotsToChargeCompletely:
-					powerProfile[connectionSlot:disconnectionSlot] = self.chargingPower
+					self.spreadOutDemand.addEvent(midnight, connectionSlot, self.chargingPower, disconnectionSlot - connectionSlot)
 				# otherwise charge it evenly over the whole connected period
 				else:
-					powerProfile[connectionSlot:disconnectionSlot] = chargeNeeded / ((disconnectionSlot - connectionSlot) / 60)
-			
-			self.spreadOutDemand.add(midnight, powerProfile)
+					self.spreadOutDemand.addEvent(midnight, connectionSlot, chargeNeeded / ((disconnectionSlot - connectionSlot) * timeConfig.slotLength / 60), disconnectionSlot - connectionSlot)
 
 # abstract base class for accumulator-based household appliances (e.g. water heater, refrigerator)
 class Accumulator(Appliance, ABC):
+	__slots__ = ("chargingPower", "capacity", "dischargingProfileScale", "smartCharge", "uncontrolledCharge", "spreadOutCharge", "spreadOutCharging")
+	
 	# appliance usage statistics
 	usageStatistics: applianceStatistics.AccumulatorStatistics
 	# the power with which the appliance charges
 	chargingPower: float # kW
 	# the charging capacity of the appliance
 	capacity: float # kWh
+	# how much more the appliance discharges than the discharging profile from the statistics says
+	dischargingProfileScale: float
+	# the state of the appliance between calculations, the current charge for each algorithm [kWh]
+	smartCharge: float
+	uncontrolledCharge: float
+	spreadOutCharge: float
+	# if the appliance is charging right now with the spread out algorithm
+	spreadOutCharging: bool
 	
 	# constructor, just prepares the variables
-	def __init__(self, chargingPower: float, capacity: float, dischargingProfileScale: float):
+	# the initial state of the appliance is random, unless it is specified
+	def __init__(self, chargingPower: float, capacity: float, dischargingProfileScale: float, smartCharge: float = None, spreadOutCharge: float = None, spreadOutCharging: bool = None):
 		super().__init__()
 		self.chargingPower = chargingPower
 		self.capacity = capacity
 		
+		if smartCharge is None:
+			smartCharge = random.random() * self.capacity
+		if spreadOutCharging is None:
+			spreadOutCharging = random.choice([True, False])
+		if spreadOutCharge is None:
+			spreadOutCharge = random.random() * self.capacity
+		
 		# variables for storing the state of the appliance between calculations
-		self.memory.dischargingProfileScale = dischargingProfileScale
-		self.memory.smart = SimpleNamespace()
-		self.memory.smart.currentCharge = random.random() * self.capacity
-		self.memory.uncontrolled = SimpleNamespace()
-		self.memory.uncontrolled.currentCharge = self.capacity
-		self.memory.spreadOut = SimpleNamespace()
-		self.memory.spreadOut.charging = random.choice([True, False])
-		self.memory.spreadOut.currentCharge = random.random() * self.capacity
-
-		# the profile of how the accumulator discharges (e.g. water heater cools down or gets used, fridge heats up)
-		self.memory.dischargingProfile = Profile()
+		self.dischargingProfileScale = dischargingProfileScale
+		self.smartCharge = smartCharge
+		self.uncontrolledCharge = self.capacity
+		self.spreadOutCharging = spreadOutCharging
+		self.spreadOutCharge = spreadOutCharge
 	
 	# creates a random accumulator with the right parameters
 	@classmethod
@@ -268,88 +282,112 @@ class Accumulator(Appliance, ABC):
 		dischargingProfileScale = cls.usageStatistics.randomDischargingProfileScale() * (chargingPower / cls.usageStatistics.averageChargingPower)
 		return cls(chargingPower, capacity, dischargingProfileScale)
 	
-	# moves ahead one day and does all the calculations that need to be done in that day
-	def tick(self):
-		# remove past, unneeded values from the profiles to free up some memory
-		self.memory.dischargingProfile.prune(self.currentDT - oneDay)
-		super().tick()
+	# returns into how many steps the algorithms split each time slot of the simulation
+	# with longer time slots the appliance could charge up more than its capacity in one slot, in that case the algorithms work with shorter steps
+	# and the demand of the appliance in each time slot is then the average of its demand in the steps of that slot
+	def stepsPerSlot(self) -> int:
+		for steps in range(1, timeConfig.slotLength):
+			if timeConfig.slotLength % steps == 0 and 1.1 * self.chargingPower * (timeConfig.slotLength / steps) / 60 <= self.capacity:
+				return steps
+		return timeConfig.slotLength
 	
 	# generates appliance usage for a given time interval
+	# the accumulator discharges according to the discharging profile from the statistics scaled by its own scale, so there is nothing to generate
 	def generateUsage(self, fromDT: datetime.datetime, toDT: datetime.datetime):
-		# generate how much will the accumulator discharge during that interval
-		dischargingProfile = self.usageStatistics.dischargingProfile.get(fromDT, toDT) * self.memory.dischargingProfileScale
-		self.memory.dischargingProfile.set(fromDT, dischargingProfile)
+		pass
+	
+	# returns how much the accumulator discharges in each time slot in the given interval (e.g. water heater cools down or gets used, fridge heats up) [kW]
+	# the discharging profile from the statistics is shared by all the accumulators of the same kind, each of them just scales it
+	def dischargingProfile(self, fromDT: datetime.datetime, toDT: datetime.datetime) -> numpy.ndarray:
+		return self.usageStatistics.dischargingProfile.get(fromDT, toDT) * self.dischargingProfileScale
 	
 	# calculates appliance power demand for a given time interval acting as if the appliance was smart
 	def calculateSmartDemand(self, fromDT: datetime.datetime, toDT: datetime.datetime):
 		# adapted from https://ktiml.mff.cuni.cz/~fink/publication/greedy.pdf
 		# asymptotically, this would be faster with prefix sum trees or union-find data structures
 		# but in Python that is actually spreadOuter than using a quadratic algorithm with numpy
-		# the limit preparation, which is linear, is spreadOuter than the actual algorithm anyway, so it doesn't matter
 		
 		# get the cheapest slots in which to turn on the appliance so that it never discharges under its lower limit and never charges over its upper limit
 		# normally, the appliance doesn't charge more than it needs to, so at the end of the interval it would be charged barely above the lower limit
 		# then at the start of the next calculated interval it would need to charge more to catch up
 		# we calculate the charging profile with a bit of an overlap to avoid this
 		endMargin = oneDay
-		wantedSlots = utils.minutesBetween(fromDT, toDT)
-		totalSlots = utils.minutesBetween(fromDT, toDT+endMargin)
-		
-		# the electricity prices in the interval
-		priceProfile = self.priceProfile.get(fromDT, toDT+endMargin)
+		steps = self.stepsPerSlot()
+		stepLength = timeConfig.slotLength / steps # minutes
+		wantedSlots = utils.slotsBetween(fromDT, toDT) * steps
+		totalSlots = utils.slotsBetween(fromDT, toDT+endMargin) * steps
 		
-		# how much energy goes into the appliance each minute it's turned on
-		chargingRate = self.chargingPower / 60 # kWh per minute
-		# how much energy leaves the appliance each minute of the interval
-		dischargingRates = self.memory.dischargingProfile.get(fromDT, toDT+endMargin) / 60 # kWh per minute for each minute
+		# how much energy goes into the appliance each step it's turned on
+		chargingRate = self.chargingPower * stepLength / 60 # kWh per step
+		# how much energy leaves the appliance each step of the interval
+		dischargingRates = numpy.repeat(self.dischargingProfile(fromDT, toDT+endMargin), steps) * stepLength / 60 # kWh per step for each step
 		
-		startingCharge = self.memory.smart.currentCharge # kWh
+		startingCharge = self.smartCharge # kWh
 		
 		# never discharge past 0 and never charge over the capacity
 		lowerTarget = 0 # kWh
 		upperTarget = self.capacity # kWh
 		
 		# convert the limits and charging rates to integer steps
-		dischargingSum = numpy.cumsum(dischargingRates) # total kWh cumulatively discharged for each minute
+		dischargingSum = numpy.cumsum(dischargingRates) # total kWh cumulatively discharged for each step
 		lowerLimit = numpy.ceil((lowerTarget - startingCharge + dischargingSum) / chargingRate).astype(int)
 		upperLimit = numpy.floor((upperTarget - startingCharge + dischargingSum) / chargingRate).astype(int)
-		lowerLimit = numpy.maximum(lowerLimit, 0)
-		upperLimit = numpy.minimum(upperLimit, totalSlots)
-		
-		# cut the limits to all the reachable charge values
-		for i in range(totalSlots - 1):
-			if lowerLimit[i+1] < lowerLimit[i]:
-				lowerLimit[i+1] = lowerLimit[i]
-			if upperLimit[i+1] < upperLimit[i]:
-				upperLimit[i+1] = upperLimit[i]
-		
-		for i in reversed(range(totalSlots - 1)):
-			if lowerLimit[i] < lowerLimit[i+1] - 1:
-				lowerLimit[i] = lowerLimit[i+1] - 1
-			if upperLimit[i] < upperLimit[i+1] - 1:
-				upperLimit[i] = upperLimit[i+1] - 1
-		
-		for i in range(totalSlots):
-			if lowerLimit[i] > i:
-				lowerLimit[i] = i
-			else:
-				break
-		
-		for i in range(totalSlots):
-			if upperLimit[i] > i + 1:
-				upperLimit[i] = i + 1
-			else:
-				break
-		
-		# the profile of how the appliance will charge, 1 for every slot it will charge, 0 otherwise
-		chargingProfile = numpy.zeros(totalSlots)
+		lowerLimit, upperLimit = self.cutLimits(lowerLimit, upperLimit)
 		
 		# starting point of the algorithm is 0
 		lowerLimit = numpy.concatenate(([0], lowerLimit))
 		upperLimit = numpy.concatenate(([0], upperLimit))
 		
-		# the charging slots ordered from cheapest slot to most expensive slot
-		cheapestOrder = numpy.argsort(priceProfile)
+		# the profile of how the appliance will charge, 1 for every slot it will charge, 0 otherwise
+		# with the coarse-to-fine scheduling, the charging is first planned for whole blocks as long as the cheap price intervals, and then refined inside the partially used blocks
+		blockLength = round(priceConfig.cheapIntervalLength / stepLength)
+		if timeConfig.coarseToFineScheduling and blockLength > 1:
+			# the electricity prices in the interval, shared with the other appliances in the house
+			priceProfile = self.priceIndex.prices(fromDT, toDT+endMargin, steps)
+			boundaries, blockPrices = self.priceIndex.blocks(fromDT, toDT+endMargin, steps, blockLength)
+			chargingProfile = self.coarseToFineCharging(priceProfile, lowerLimit, upperLimit, boundaries, blockPrices)
+		else:
+			# the order of the slots from the cheapest to the most expensive, shared with the other appliances in the house
+			chargingProfile = self.cheapestCharging(self.priceIndex.cheapestOrder(fromDT, toDT+endMargin, steps), lowerLimit, upperLimit)
+		
+		# save the new charge level for the appliance
+		self.smartCharge = startingCharge - dischargingSum[wantedSlots-1] + numpy.sum(chargingProfile[:wantedSlots]) * chargingRate
+		
+		# get the power profile for the charging interval and save it
+		powerProfile = chargingProfile[:wantedSlots].reshape(-1, steps).mean(axis=1) * self.chargingPower
+		self.smartDemand.set(fromDT, powerProfile)
+	
+	# cuts the limits of how many slots the appliance must and can charge in up to each slot to all the reachable values
+	# at the start of the planned interval the appliance can lag one slot behind its lower limit, inside an already planned interval it can't
+	@staticmethod
+	def cutLimits(lowerLimit: numpy.ndarray, upperLimit: numpy.ndarray, lowerLimitLag: int = 1):
+		slots = numpy.arange(lowerLimit.size)
+		lowerLimit = numpy.maximum(lowerLimit, 0)
+		upperLimit = numpy.minimum(upperLimit, lowerLimit.size)
+		
+		# the limits can't go down
+		lowerLimit = numpy.maximum.accumulate(lowerLimit)
+		upperLimit = numpy.maximum.accumulate(upperLimit)
+		
+		# the limits can't go up by more than one slot in each slot
+		lowerLimit = slots + numpy.maximum.accumulate((lowerLimit - slots)[::-1])[::-1]
+		upperLimit = slots + numpy.maximum.accumulate((upperLimit - slots)[::-1])[::-1]
+		
+		# the appliance can't charge in more slots than there were so far
+		lowerLimit = numpy.minimum(lowerLimit, slots + 1 - lowerLimitLag)
+		upperLimit = numpy.minimum(upperLimit, slots + 1)
+		return lowerLimit, upperLimit
+	
+	# picks the cheapest slots to charge in, so that the number of charged slots up to each slot stays within the limits
+	# the limits start with a zero for the start of the interval, and the appliance charges in exactly as many slots as the last lower limit
+	# the slots are given ordered from the cheapest slot to the most expensive slot
+	# returns 1 for every slot the appliance will charge in, 0 otherwise
+	@staticmethod
+	def cheapestCharging(cheapestOrder: numpy.ndarray, lowerLimit: numpy.ndarray, upperLimit: numpy.ndarray) -> numpy.ndarray:
+		chargingProfile = numpy.zeros(cheapestOrder.size)
+		lowerLimit = lowerLimit.copy()
+		upperLimit = upperLimit.copy()
+		
 		for slot in cheapestOrder:
 			# if the appliance can be turned on at that slot, turn it on and update the limits
 			if lowerLimit[slot] < upperLimit[slot+1] and lowerLimit[slot] < lowerLimit[-1]:
@@ -360,30 +398,83 @@ class Accumulator(Appliance, ABC):
 				lowerLimit[lowerSlot:] -= 1
 				upperLimit[upperSlot:] -= 1
 		
-		# save the new charge level for the appliance
-		self.memory.smart.currentCharge = startingCharge - dischargingSum[wantedSlots-1] + numpy.sum(chargingProfile[:wantedSlots]) * chargingRate
+		return chargingProfile
+	
+	# picks the slots to charge in like cheapestCharging, but first decides in how many slots to charge in each block of the interval
+	# the blocks are given by their boundaries (including the end of the interval) and their average prices, the price should be almost the same in the whole block
+	# the blocks are ordered by their average price, and each block gets as many charging slots as it can while the rest of the interval can still stay within the limits
+	# then only the blocks which are partially used are refined to the individual slots, the limits inside each block can always be kept for any numbers of slots in the blocks
+	@classmethod
+	def coarseToFineCharging(cls, priceProfile: numpy.ndarray, lowerLimit: numpy.ndarray, upperLimit: numpy.ndarray, boundaries: numpy.ndarray, blockPrices: numpy.ndarray) -> numpy.ndarray:
+		totalSlots = priceProfile.size
+		blockSizes = numpy.diff(boundaries)
 		
-		# get the power profile for the charging interval and save it
-		powerProfile = chargingProfile[:wantedSlots] * self.chargingPower
-		self.smartDemand.set(fromDT, powerProfile)
+		# how many more slots have to be charged up to each block boundary, and how many more slots can be charged up to it at most
+		# the highest number is limited by the upper limits and the free slots in the blocks before the boundary
+		# the appliance charges exactly in as many slots as the last lower limit
+		lowerMissing = lowerLimit[boundaries].copy()
+		upperMissing = upperLimit[boundaries].copy()
+		upperMissing[-1] = lowerMissing[-1]
+		freeBefore = boundaries - boundaries[0]
+		reachableHigh = freeBefore + numpy.minimum.accumulate(upperMissing - freeBefore)
+		chargedSlots = numpy.zeros(blockSizes.size, dtype=int)
+		
+		for block in numpy.argsort(blockPrices):
+			if lowerMissing[-1] == 0:
+				break
+			# charging in more slots in the block lowers the reachable highs after it, which can't go under what has to be charged up to the block
+			slots = min(blockSizes[block], reachableHigh[block+1:].min() - lowerMissing[:block+1].max())
+			if slots > 0:
+				chargedSlots[block] = slots
+				lowerMissing[block+1:] -= slots
+				reachableHigh[block+1:] -= slots
+		
+		# fill the fully used blocks and refine the partially used ones
+		chargingProfile = numpy.zeros(totalSlots)
+		chargedBefore = numpy.concatenate(([0], numpy.cumsum(chargedSlots)))
+		for block in numpy.nonzero(chargedSlots)[0]:
+			start = boundaries[block]
+			end = boundaries[block+1]
+			if chargedSlots[block] == blockSizes[block]:
+				chargingProfile[start:end] = 1
+				continue
+			
+			# usually just charging in the cheapest slots of the block keeps the limits
+			blockChargingProfile = numpy.zeros(blockSizes[block])
+			blockChargingProfile[numpy.argpartition(priceProfile[start:end], chargedSlots[block]-1)[:chargedSlots[block]]] = 1
+			charged = chargedBefore[block] + blockChargingProfile.cumsum()
+			if (charged < lowerLimit[start+1:end+1]).any() or (charged > upperLimit[start+1:end+1]).any():
+				# otherwise pick the slots properly, with the limits inside the block set so that it charges in exactly the planned number of slots
+				slotsLeft = numpy.arange(blockSizes[block]-1, -1, -1)
+				blockLowerLimit = numpy.maximum(lowerLimit[start+1:end+1] - chargedBefore[block], chargedSlots[block] - slotsLeft)
+				blockUpperLimit = numpy.minimum(upperLimit[start+1:end+1] - chargedBefore[block], chargedSlots[block])
+				blockLowerLimit, blockUpperLimit = cls.cutLimits(blockLowerLimit, blockUpperLimit, lowerLimitLag=0)
+				blockLowerLimit = numpy.concatenate(([0], blockLowerLimit))
+				blockUpperLimit = numpy.concatenate(([0], blockUpperLimit))
+				blockChargingProfile = cls.cheapestCharging(numpy.argsort(priceProfile[start:end]), blockLowerLimit, blockUpperLimit)
+			chargingProfile[start:end] = blockChargingProfile
+		
+		return chargingProfile
 	
 	# calculates appliance power demand for a given time interval acting as if the accumulator wanted to stay as charged as possible
 	def calculateUncontrolledDemand(self, fromDT: datetime.datetime, toDT: datetime.datetime):
 		# simulates an uncontrolled charging algorithm, when an appliance wants to have as much energy stored as possible
 		
-		# how much energy goes into the appliance each minute it's turned on
-		chargingRate = self.chargingPower / 60 # kWh per minute
-		# how much energy leaves the appliance each minute of the interval
-		dischargingRates = self.memory.dischargingProfile.get(fromDT, toDT) / 60 # kWh per minute for each minute
+		# how much energy goes into the appliance each step it's turned on
+		steps = self.stepsPerSlot()
+		stepLength = timeConfig.slotLength / steps # minutes
+		chargingRate = self.chargingPower * stepLength / 60 # kWh per step
+		# how much energy leaves the appliance each step of the interval
+		dischargingRates = numpy.repeat(self.dischargingProfile(fromDT, toDT), steps) * stepLength / 60 # kWh per step for each step
 		
 		# never discharge past 0 and never charge over the capacity
 		upperLimit = self.capacity # kWh
 		
 		# get the current charge from memory
-		charge = self.memory.uncontrolled.currentCharge
+		charge = self.uncontrolledCharge
 		
 		# the power profile for the interval
-		totalSlots = utils.minutesBetween(fromDT, toDT)
+		totalSlots = utils.slotsBetween(fromDT, toDT) * steps
 		powerProfile = numpy.zeros(totalSlots)
 		
 		# simulate the progression of charge during the interval
@@ -394,31 +485,33 @@ class Accumulator(Appliance, ABC):
 				powerProfile[slot] = self.chargingPower
 		
 		# save the new charge level to memory
-		self.memory.uncontrolled.currentCharge = charge
+		self.uncontrolledCharge = charge
 		
-		# save the calculated demand
-		self.uncontrolledDemand.set(fromDT, powerProfile)
+		# save the calculated demand, averaged over the steps of each time slot
+		self.uncontrolledDemand.set(fromDT, powerProfile.reshape(-1, steps).mean(axis=1))
 	
 	# calculates appliance power demand for a given time interval acting as if the accumulator wanted to always charge completely and then discharge completely
 	def calculateSpreadOutDemand(self, fromDT: datetime.datetime, toDT: datetime.datetime):
 		# simulates a thermostat-based charging, when an appliance starts charging when it discharges past some threshhold, and stops charging when it's fully charged
 		
-		# how much energy goes into the appliance each minute it's turned on
-		chargingRate = self.chargingPower / 60 # kWh per minute
-		# how much energy leaves the appliance each minute of the interval
-		dischargingRates = self.memory.dischargingProfile.get(fromDT, toDT) / 60 # kWh per minute for each minute
+		# how much energy goes into the appliance each step it's turned on
+		steps = self.stepsPerSlot()
+		stepLength = timeConfig.slotLength / steps # minutes
+		chargingRate = self.chargingPower * stepLength / 60 # kWh per step
+		# how much energy leaves the appliance each step of the interval
+		dischargingRates = numpy.repeat(self.dischargingProfile(fromDT, toDT), steps) * stepLength / 60 # kWh per step for each step
 		
 		# never discharge past 0 and never charge over the capacity
 		lowerLimit = 0 # kWh
 		upperLimit = self.capacity # kWh
 		
 		# get the current charge from memory
-		charge = self.memory.spreadOut.currentCharge
+		charge = self.spreadOutCharge
 		# get if we're charging right now from memory
-		charging = self.memory.spreadOut.charging
+		charging = self.spreadOutCharging
 		
 		# the power profile for the interval
-		totalSlots = utils.minutesBetween(fromDT, toDT)
+		totalSlots = utils.slotsBetween(fromDT, toDT) * steps
 		powerProfile = numpy.zeros(totalSlots)
 		# simulate the progression of charge during the interval
 		for slot in range(totalSlots):
@@ -435,22 +528,32 @@ class Accumulator(Appliance, ABC):
 				powerProfile[slot] = self.chargingPower
 		
 		# save the new charge level and if it was charging and the end of the interval
-		self.memory.spreadOut.currentCharge = charge
-		self.memory.spreadOut.charging = charging
+		self.spreadOutCharge = charge
+		self.spreadOutCharging = charging
 		
-		# save the calculated demand
-		self.spreadOutDemand.set(fromDT, powerProfile)
+		# save the calculated demand, averaged over the steps of each time slot
+		self.spreadOutDemand.set(fromDT, powerProfile.reshape(-1, steps).mean(axis=1))
 
 # abstract base class for machine-like household appliances (e.g. dishwasher, washing machine)
 class Machine(Appliance, ABC):
+	__slots__ = ("usages",)
+	
 	# appliance usage statistics
 	usageStatistics: applianceStatistics.MachineStatistics
+	# for each day the time the machine should start after, the time it should finish by and the usage profile of that run, or None if it's not used that day
+	usages: Dict[datetime.date, Optional[Tuple[Tuple[datetime.time, datetime.time], numpy.ndarray]]]
+	# the electricity demands of the machine, stored as its runs
+	smartDemand: SparseProfile
+	uncontrolledDemand: SparseProfile
+	spreadOutDemand: SparseProfile
 	
 	# constructor, just prepares the variables
 	def __init__(self):
 		super().__init__()
-		# for each day keeps time the appliance should start after, time it should finish by and the usage profile of that run of the appliance
-		self.memory.usages = dict()
+		self.smartDemand = SparseProfile()
+		self.uncontrolledDemand = SparseProfile()
+		self.spreadOutDemand = SparseProfile()
+		self.usages = dict()
 	
 	# creates a random appliance with the right parameters
 	@classmethod
@@ -464,33 +567,31 @@ class Machine(Appliance, ABC):
 		# and the usage profile of that run of the appliance
 		for midnight in utils.midnightsBetween(fromDT, toDT):
 			date = midnight.date()
-			if date not in self.memory.usages:
+			if date not in self.usages:
 				if random.random() < self.usageStatistics.usageProbabilities[date]:
 					startAfter = self.usageStatistics.randomStartAfter()
 					finishBy = self.usageStatistics.randomFinishBy()
-					powerUsageProfile = self.usageStatistics.randomUsageProfile()
-					self.memory.usages[date] = ((startAfter, finishBy), powerUsageProfile)
+					powerUsageProfile = utils.toSlots(self.usageStatistics.randomUsageProfile())
+					self.usages[date] = ((startAfter, finishBy), powerUsageProfile)
 				else:
-					self.memory.usages[date] = None
+					self.usages[date] = None
 	
 	# calculates appliance power demand for a given time interval acting as if the appliance was NOT smart
 	def calculateSmartDemand(self, fromDT: datetime.datetime, toDT: datetime.datetime):
 		# for each day in the interval, calculate the best time to start the appliance so that the run would be the cheapest
 		for midnight in utils.midnightsBetween(fromDT, toDT):
 			date = midnight.date()
-			# the power profile of that day (plus some overlap)
-			powerProfile = numpy.zeros(2 * utils.minutesIn(oneDay))
 			
 			# get the appliance usage for that day and act accordingly
-			usage = self.memory.usages[date]
+			usage = self.usages[date]
 			if usage is not None:
 				# the price for the interval
-				priceProfile = self.priceProfile.get(midnight, midnight+2*oneDay)
+				priceProfile = self.priceIndex.prices(midnight, midnight+2*oneDay)
 				
 				# the slots in which the appliance is available for being turned on
 				((startAfter, finishBy), powerUsageProfile) = usage
-				startAfterSlot = startAfter.hour * 60 + startAfter.minute
-				finishBySlot = finishBy.hour * 60 + finishBy.minute + utils.minutesIn(oneDay)
+				startAfterSlot = utils.slotOfDay(startAfter, roundUp=True)
+				finishBySlot = utils.slotOfDay(finishBy) + utils.slotsIn(oneDay)
 				
 				# the length of the run of the appliance
 				runtime = powerUsageProfile.size
@@ -508,52 +609,42 @@ class Machine(Appliance, ABC):
 							cheapestSlot = startingSlot
 							cheapestPrice = slotPrice
 				
-				# put the usage of the appliance at the right time in the power profile
-				powerProfile[cheapestSlot:cheapestSlot+runtime] = powerUsageProfile
-			
-			# save the power profile
-			self.smartDemand.add(midnight, powerProfile)
+				# save the run of the appliance at the right time
+				self.smartDemand.addEvent(midnight, cheapestSlot, powerUsageProfile)
 	
 	# calculates appliance power demand for a given time interval acting as if the appliance wanted to be used as early as possible
 	def calculateUncontrolledDemand(self, fromDT: datetime.datetime, toDT: datetime.datetime):
 		# for each day in the interval, just run the appliance as soon as possible
 		for midnight in utils.midnightsBetween(fromDT, toDT):
 			date = midnight.date()
-			# the power profile of that day (plus some overlap)
-			powerProfile = numpy.zeros(2 * utils.minutesIn(oneDay))
 			
 			# get the appliance usage for that day and act accordingly
-			usage = self.memory.usages[date]
+			usage = self.usages[date]
 			if usage is not None:
 				((startAfter, _), powerUsageProfile) = usage
 				
 				# the slots in which the appliance is available for being turned on
-				startAfterSlot = startAfter.hour * 60 + startAfter.minute
+				startAfterSlot = utils.slotOfDay(startAfter, roundUp=True)
 				
 				# the length of the run of the appliance
 				runtime = powerUsageProfile.size
 				
-				# put the usage of the appliance at the right time in the power profile
-				powerProfile[startAfterSlot:startAfterSlot+runtime] = powerUsageProfile
-			
-			# save the power profile
-			self.uncontrolledDemand.add(midnight, powerProfile)
+				# save the run of the appliance at the right time
+				self.uncontrolledDemand.addEvent(midnight, startAfterSlot, powerUsageProfile)
 	
 	# calculates appliance power demand for a given time interval acting as if the machine wanted to spread out its use across the whole possible interval
 	def calculateSpreadOutDemand(self, fromDT: datetime.datetime, toDT: datetime.datetime):
 		# for each day in the interval, just run the appliance in the middle of the available interval
 		for midnight in utils.midnightsBetween(fromDT, toDT):
 			date = midnight.date()
-			# the power profile of that day (plus some overlap)
-			powerProfile = numpy.zeros(2 * utils.minutesIn(oneDay))
 			
 			# get the appliance usage for that day and act accordingly
-			usage = self.memory.usages[date]
+			usage = self.usages[date]
 			if usage is not None:
 				# the slots in which the appliance is available for being turned on
 				((startAfter, finishBy), powerUsageProfile) = usage
-				startAfterSlot = startAfter.hour * 60 + startAfter.minute
-				finishBySlot = finishBy.hour * 60 + finishBy.minute + utils.minutesIn(oneDay)
+				startAfterSlot = utils.slotOfDay(startAfter, roundUp=True)
+				finishBySlot = utils.slotOfDay(finishBy) + utils.slotsIn(oneDay)
 				
 				# the length of the run of the appliance
 				runtime = powerUsageProfile.size
@@ -561,43 +652,69 @@ class Machine(Appliance, ABC):
 				# the slot in which the appliance should start
 				startingSlot = startAfterSlot + max(0, (finishBySlot - startAfterSlot - runtime) // 2)
 				
-				# put the usage of the appliance at the right time in the power profile
-				powerProfile[startingSlot:startingSlot+runtime] = powerUsageProfile
-			
-			# save the power profile
-			self.spreadOutDemand.add(midnight, powerProfile)
+				# save the run of the appliance at the right time
+				self.spreadOutDemand.addEvent(midnight, startingSlot, powerUsageProfile)
 
 # class representing an electric car
 class Car(Battery):
-	usageStatistics = applianceStatistics.carStatistics[0]
+	__slots__ = ("index",)
+	
+	# the index of the car in its household, the cars are used differently depending on how many cars the household has
+	index: int
+	
+	# constructor, just saves the index and prepares the variables
+	def __init__(self, chargingPower: float = 0, index: int = 0):
+		self.index = index
+		super().__init__(chargingPower=chargingPower)
+	
+	# the usage statistics of the car, according to its index in its household
+	@property
+	def usageStatistics(self) -> applianceStatistics.BatteryStatistics:
+		return applianceStatistics.carStatistics[self.index]
+	
+	# creates a random car, as if it was the first car in its household
+	@classmethod
+	def random(cls):
+		return cls.randomWithIndex()
+	
+	# creates a random car with a given index in its household
 	@classmethod
 	def randomWithIndex(cls, index: int = 0):
 		usageStatistics = applianceStatistics.carStatistics[index]
 		chargingPower = usageStatistics.randomChargingPower()
-		car = cls(chargingPower=chargingPower)
-		car.usageStatistics = usageStatistics
-		return car
+		return cls.withIndex(index=index, chargingPower=chargingPower)
+	
+	# creates a car with a given index in its household and a given charging power
+	@classmethod
+	def withIndex(cls, index: int, chargingPower: float):
+		return cls(chargingPower=chargingPower, index=index)
 
 # class representing air conditioning
 class AirConditioning(Accumulator):
+	__slots__ = ()
 	usageStatistics = applianceStatistics.airConditioningStatistics
 
 # class representing an electrical heating
 class ElectricalHeating(Accumulator):
+	__slots__ = ()
 	usageStatistics = applianceStatistics.electricalHeatingStatistics
 
 # class representing a refrigerator
 class Fridge(Accumulator):
+	__slots__ = ()
 	usageStatistics = applianceStatistics.fridgeStatistics
 
 # class representing a water heater
 class WaterHeater(Accumulator):
+	__slots__ = ()
 	usageStatistics = applianceStatistics.waterHeaterStatistics
 
 # class representing a dishwasher
 class Dishwasher(Machine):
+	__slots__ = ()
 	usageStatistics = applianceStatistics.dishwasherStatistics
 
 # class representing a washing machine
 class WashingMachine(Machine):
+	__slots__ = ()
 	usageStatistics = applianceStatistics.washingMachineStatistics
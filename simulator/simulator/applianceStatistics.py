@@ -14,9 +14,11 @@ from typing import Dict, List, Tuple
 import numpy
 import pandas
 
+from . import dataConfig
+
 from .constants import oneDay
-from .profile import Profile
-from .utils import minutesIn
+from .profile import DailyProfile, Profile
+from .utils import dayFractionsBetween, minutesBetween, minutesIn, readLines, toSlots
 
 thisDir = os.path.dirname(__file__)
 
@@ -30,11 +32,11 @@ class BatteryStatistics(ApplianceStatistics):
 	# possible charging powers of the appliance type
 	chargingPowers: List[float]
 	# probabilities that the appliance will get used on a given day
-	usageProbabilities: Dict[datetime.date, float]
+	usageProbabilities: DailyProfile
 	# possible charges which the appliance might need after usage on a given day
 	neededCharges: Dict[datetime.date, List[float]]
 	# average charge needed by the appliance type on a given day
-	averageNeededCharge: Dict[datetime.date, float]
+	averageNeededCharge: DailyProfile
 	# intervals in which the appliance might be used on a given day
 	usageIntervals: Dict[datetime.date, List[Tuple[datetime.time, datetime.time]]]
 	# profile of what ratio of appliances are available for charging at any given date and time
@@ -44,6 +46,10 @@ class BatteryStatistics(ApplianceStatistics):
 	def randomChargingPower(self) -> float:
 		return random.choice(self.chargingPowers)
 	
+	# generates random charging powers for many appliances at once
+	def randomChargingPowers(self, count: int) -> numpy.ndarray:
+		return numpy.random.choice(self.chargingPowers, size=count)
+	
 	# generates a random needed charge for the appliance, if the appliance gets used at all
 	def randomNeededCharge(self, date: datetime.date) -> float:
 		if random.random() < self.usageProbabilities[date]:
@@ -65,28 +71,27 @@ class BatteryStatistics(ApplianceStatistics):
 	
 	# loads the usage probabilities from a CSV file
 	# in each row in the file there should be a date in the first column and the corresponding usage probability in the second column
-	def loadUsageProbabilitiesFromFile(self, path):
-		data = pandas.read_csv(path, parse_dates=[0])
-		self.usageProbabilities = {}
-		for timestamp, usageprob in data.itertuples(index=False, name=None):
-			date = timestamp.date()
-			self.usageProbabilities[date] = usageprob
+	# if fromDT or toDT are given, only the days between them are loaded
+	def loadUsageProbabilitiesFromFile(self, path, fromDT: datetime.datetime = None, toDT: datetime.datetime = None):
+		self.usageProbabilities = DailyProfile.fromCSV(path, fromDT, toDT)
 	
 	# loads needed charges from a file
 	# on each line of the file there should be a date followed by a list of possible needed charges on that date
-	def loadNeededChargesFromFile(self, path):
+	# if fromDT or toDT are given, only the days between them are loaded
+	def loadNeededChargesFromFile(self, path, fromDT: datetime.datetime = None, toDT: datetime.datetime = None):
 		self.neededCharges = {}
-		self.averageNeededCharge = {}
-		with open(path, "r") as chargesFile:
-			for line in chargesFile:
-				date = datetime.datetime.strptime(line.strip()[:10], "%Y-%m-%d").date()
-				charges = [float(x) for x in line.strip()[11:].strip(" []\n").split(",")]
-				self.neededCharges[date] = charges
-				self.averageNeededCharge[date] = numpy.mean(charges) * self.usageProbabilities[date]
+		averageNeededCharge = {}
+		for line in readLines(path, fromDT, toDT):
+			date = datetime.datetime.strptime(line.strip()[:10], "%Y-%m-%d").date()
+			charges = [float(x) for x in line.strip()[11:].strip(" []\n").split(",")]
+			self.neededCharges[date] = charges
+			averageNeededCharge[date] = numpy.mean(charges) * self.usageProbabilities[date]
+		self.averageNeededCharge = DailyProfile.fromDict(averageNeededCharge)
 	
 	# loads the usage intervals from a file
 	# on each line of the file there should be a date followed by a list of possible usage intervals on that date
-	def loadUsageIntervalsFromFile(self, path):
+	# if fromDT or toDT are given, only the days between them are loaded
+	def loadUsageIntervalsFromFile(self, path, fromDT: datetime.datetime = None, toDT: datetime.datetime = None):
 		def parseInterval(interval) -> Tuple[datetime.time, datetime.time]:
 			if len(interval) < 10:
 				return (None, None)
@@ -96,16 +101,16 @@ class BatteryStatistics(ApplianceStatistics):
 				return (start, end)
 		
 		self.usageIntervals = defaultdict(list)
-		with open(path, "r") as usageIntervalsFile:
-			for line in usageIntervalsFile:
-				date = datetime.datetime.strptime(line.strip()[:10], "%Y-%m-%d").date()
-				intervals = list(map(parseInterval, line.strip()[11:].strip(" []\n").split(", ")))
-				self.usageIntervals[date].extend(intervals)
+		for line in readLines(path, fromDT, toDT):
+			date = datetime.datetime.strptime(line.strip()[:10], "%Y-%m-%d").date()
+			intervals = list(map(parseInterval, line.strip()[11:].strip(" []\n").split(", ")))
+			self.usageIntervals[date].extend(intervals)
 	
 	# loads the availability profile from a CSV file
 	# in each row in the file there should be a date and time in the first column and the corresponding appliance availability in the second column
-	def loadAvailabilityProfileFromFile(self, path):
-		self.availabilityProfile = Profile.fromCSV(path)
+	# if fromDT or toDT are given, only the values between them are loaded
+	def loadAvailabilityProfileFromFile(self, path, fromDT: datetime.datetime = None, toDT: datetime.datetime = None):
+		self.availabilityProfile = Profile.fromCSV(path, fromDT, toDT)
 
 # statistics of accumulator-based household appliances (e.g. water heater, refrigerator)
 class AccumulatorStatistics(ApplianceStatistics):
@@ -118,7 +123,7 @@ class AccumulatorStatistics(ApplianceStatistics):
 	# the average discharging profile for the appliance type
 	dischargingProfile: Profile
 	# average needed charge for the appliance type for each day
-	averageDailyCharge: Dict[datetime.date, float]
+	averageDailyCharge: DailyProfile
 	# mean and standard deviation of the scale of discharging profiles of the appliance type
 	dischargingProfileScaleParameters: Tuple[float, float]
 	
@@ -134,6 +139,18 @@ class AccumulatorStatistics(ApplianceStatistics):
 	def randomDischargingProfileScale(self) -> float:
 		return random.gauss(*self.dischargingProfileScaleParameters)
 	
+	# generates random charging powers for many appliances at once
+	def randomChargingPowers(self, count: int) -> numpy.ndarray:
+		return numpy.random.choice(self.chargingPowers, size=count)
+	
+	# generates random capacities for many appliances at once
+	def randomCapacities(self, count: int) -> numpy.ndarray:
+		return numpy.random.normal(*self.capacityParameters, size=count)
+	
+	# generates random discharging profile scales for many appliances at once
+	def randomDischargingProfileScales(self, count: int) -> numpy.ndarray:
+		return numpy.random.normal(*self.dischargingProfileScaleParameters, size=count)
+	
 	# loads charging powers from a file
 	# the file should have one possible charging power on each line
 	def loadChargingPowersFromFile(self, path: str):
@@ -142,9 +159,11 @@ class AccumulatorStatistics(ApplianceStatistics):
 	
 	# loads the average discharging profile from a CSV file
 	# in each row in the file there should be a date and time in the first column and the corresponding average discharging power in the second column
-	def loadDischargingProfileFromFile(self, path: str):
-		self.dischargingProfile = Profile.fromCSV(path)
-		self.averageDailyCharge = {d: s * 24 for (d, s) in self.dischargingProfile.dailyAverages().items()}
+	# if fromDT or toDT are given, only the values between them are loaded
+	def loadDischargingProfileFromFile(self, path: str, fromDT: datetime.datetime = None, toDT: datetime.datetime = None):
+		self.dischargingProfile = Profile.fromCSV(path, fromDT, toDT)
+		self.averageDailyCharge = self.dischargingProfile.dailyAverages()
+		self.averageDailyCharge.values *= 24
 
 # statistics for machine-like household appliances (e.g. dishwasher, washing machine)
 class MachineStatistics(ApplianceStatistics):
@@ -153,11 +172,11 @@ class MachineStatistics(ApplianceStatistics):
 	# mean minute of the day that the machine must finish by, and its standard deviation
 	finishByParameters: Tuple[int, int]
 	# probabilities that the machine will get used on a given day
-	usageProbabilities: Dict[datetime.date, float]
+	usageProbabilities: DailyProfile
 	# possible power usage profiles of the machine type
 	usageProfiles: List[numpy.ndarray]
 	# average power needed by the machine type on a given day
-	averagePowerNeeded: Dict[datetime.date, float]
+	averagePowerNeeded: DailyProfile
 	
 	# generates a random starting time
 	def randomStartAfter(self) -> datetime.time:
@@ -175,12 +194,9 @@ class MachineStatistics(ApplianceStatistics):
 	
 	# loads the usage probabilities from a CSV file
 	# in each row in the file there should be a date in the first column and the corresponding usage probability in the second column
-	def loadUsageProbabilitiesFromFile(self, path: str):
-		data = pandas.read_csv(path, parse_dates=[0])
-		self.usageProbabilities = {}
-		for timestamp, usageprob in data.itertuples(index=False, name=None):
-			date = timestamp.date()
-			self.usageProbabilities[date] = usageprob
+	# if fromDT or toDT are given, only the days between them are loaded
+	def loadUsageProbabilitiesFromFile(self, path: str, fromDT: datetime.datetime = None, toDT: datetime.datetime = None):
+		self.usageProbabilities = DailyProfile.fromCSV(path, fromDT, toDT)
 	
 	# loads the power usage profiles from a file
 	# on each line of the file there should be a list of power draws for each minute of the operation of the machine
@@ -195,9 +211,54 @@ class MachineStatistics(ApplianceStatistics):
 		
 		averagePowerNeeded = numpy.mean(sums)
 		
-		self.averagePowerNeeded = {}
-		for date, usageProbability in self.usageProbabilities.items():
-			self.averagePowerNeeded[date] = averagePowerNeeded * usageProbability
+		self.averagePowerNeeded = DailyProfile(self.usageProbabilities.startingDate, averagePowerNeeded * self.usageProbabilities.values)
+
+# statistics of all the cars in a household together, used by the grid for planning
+class CarFleetStatistics:
+	# date of the first day of the usage probabilities
+	startingDate: datetime.date
+	# probabilities that the cars will get used on a given day, for each car index and each day
+	usageProbabilities: numpy.ndarray
+	# date and time of the first minute of the availability profiles
+	startingDT: datetime.datetime
+	# ratio of the cars available for charging at any given date and time, for each car index and each minute
+	availabilityProfiles: numpy.ndarray
+	
+	# constructor, stacks the statistics of the individual cars on their common date range
+	def __init__(self, carStatistics: List[BatteryStatistics]):
+		self.startingDate = max(car.usageProbabilities.startingDate for car in carStatistics)
+		endDate = min(car.usageProbabilities.startingDate + datetime.timedelta(days=car.usageProbabilities.values.size) for car in carStatistics)
+		self.usageProbabilities = numpy.stack([car.usageProbabilities.get(self.startingDate, endDate) for car in carStatistics])
+		
+		self.startingDT = max(car.availabilityProfile.startingDT for car in carStatistics)
+		endDT = min(car.availabilityProfile.startingDT + datetime.timedelta(minutes=car.availabilityProfile.values.size*car.availabilityProfile.slotLength) for car in carStatistics)
+		self.availabilityProfiles = numpy.stack([car.availabilityProfile.get(self.startingDT, endDT) for car in carStatistics])
+	
+	# calculates what ratio of the cars that need charging is expected to be available for charging in each time slot of the given interval
+	# the cars are weighted by their average usage probability over the interval
+	def expectedAvailability(self, fromDT: datetime.datetime, toDT: datetime.datetime) -> numpy.ndarray:
+		# get the usage probability of each car averaged over the days in the interval
+		firstDate, fractions = dayFractionsBetween(fromDT, toDT)
+		startIndex = (firstDate - self.startingDate).days
+		if startIndex < 0 or startIndex + fractions.size > self.usageProbabilities.shape[1]:
+			raise KeyError(firstDate)
+		usageProbabilities = self.usageProbabilities[:, startIndex:startIndex+fractions.size]
+		if numpy.isnan(usageProbabilities).any():
+			raise KeyError(firstDate + datetime.timedelta(days=int(numpy.isnan(usageProbabilities).any(axis=0).argmax())))
+		needChargingRatios = usageProbabilities @ fractions / numpy.sum(fractions)
+		
+		# get the availability profiles in the interval (zero where they are missing)
+		length = minutesBetween(fromDT, toDT)
+		availability = numpy.zeros((len(needChargingRatios), length))
+		startIndex = minutesBetween(self.startingDT, fromDT)
+		stopIndex = min(self.availabilityProfiles.shape[1], startIndex + length)
+		if stopIndex > max(0, startIndex):
+			availability[:, max(0, startIndex)-startIndex:stopIndex-startIndex] = self.availabilityProfiles[:, max(0, startIndex):stopIndex]
+		
+		# mix the availability profiles of the individual cars and average them over the time slots of the simulation
+		return toSlots(needChargingRatios @ availability / numpy.sum(needChargingRatios))
+
+# the statistics are loaded only for the interval configured in the data config, or for all the downloaded data if it is not configured
 
 # ownership ratios of various household appliances and vehicles
 # adapted from https://www.eia.gov/consumption/residential/reports/2009/state_briefs/pdf/tx.pdf
@@ -213,10 +274,10 @@ atLeastThisManyCarsProbability = [sum(carCountProbabilities[i:]) for i in range(
 carStatistics = []
 for car in range(4):
 	carStatistics.append(BatteryStatistics())
-	carStatistics[car].loadUsageProbabilitiesFromFile(f"{thisDir}/data/nhts/cars/car{car+1}/usageRatios.csv")
-	carStatistics[car].loadUsageIntervalsFromFile(f"{thisDir}/data/nhts/cars/car{car+1}/trips.txt")
-	carStatistics[car].loadAvailabilityProfileFromFile(f"{thisDir}/data/nhts/cars/car{car+1}/availability.csv")
-	carStatistics[car].loadNeededChargesFromFile(f"{thisDir}/data/dataport/cars/charges.txt")
+	carStatistics[car].loadUsageProbabilitiesFromFile(f"{thisDir}/data/nhts/cars/car{car+1}/usageRatios.csv", dataConfig.fromDT, dataConfig.toDT)
+	carStatistics[car].loadUsageIntervalsFromFile(f"{thisDir}/data/nhts/cars/car{car+1}/trips.txt", dataConfig.fromDT, dataConfig.toDT)
+	carStatistics[car].loadAvailabilityProfileFromFile(f"{thisDir}/data/nhts/cars/car{car+1}/availability.csv", dataConfig.fromDT, dataConfig.toDT)
+	carStatistics[car].loadNeededChargesFromFile(f"{thisDir}/data/dataport/cars/charges.txt", dataConfig.fromDT, dataConfig.toDT)
 	carStatistics[car].loadChargingPowersFromFile(f"{thisDir}/data/dataport/cars/maxPowers.txt")
 
 # load the accumulator capacities statistics from a json file
@@ -228,39 +289,54 @@ airConditioningStatistics = AccumulatorStatistics()
 airConditioningStatistics.capacityParameters = (capacities.airConditioning.mean, capacities.airConditioning.std)
 airConditioningStatistics.dischargingProfileScaleParameters = (1, 0.3)
 airConditioningStatistics.loadChargingPowersFromFile(f"{thisDir}/data/dataport/accumulators/airconditioning/maxPowers.txt")
-airConditioningStatistics.loadDischargingProfileFromFile(f"{thisDir}/data/dataport/accumulators/airconditioning/averageUsage.csv")
+airConditioningStatistics.loadDischargingProfileFromFile(f"{thisDir}/data/dataport/accumulators/airconditioning/averageUsage.csv", dataConfig.fromDT, dataConfig.toDT)
 
 # electrical heating statistics
 electricalHeatingStatistics = AccumulatorStatistics()
 electricalHeatingStatistics.capacityParameters = (capacities.electricalHeating.mean, capacities.electricalHeating.std)
 electricalHeatingStatistics.dischargingProfileScaleParameters = (1, 0.3)
 electricalHeatingStatistics.loadChargingPowersFromFile(f"{thisDir}/data/dataport/accumulators/electricalheating/maxPowers.txt")
-electricalHeatingStatistics.loadDischargingProfileFromFile(f"{thisDir}/data/dataport/accumulators/electricalheating/averageUsage.csv")
+electricalHeatingStatistics.loadDischargingProfileFromFile(f"{thisDir}/data/dataport/accumulators/electricalheating/averageUsage.csv", dataConfig.fromDT, dataConfig.toDT)
 
 # refrigerator statistics
 fridgeStatistics = AccumulatorStatistics()
 fridgeStatistics.capacityParameters = (capacities.fridge.mean, capacities.fridge.std)
 fridgeStatistics.dischargingProfileScaleParameters = (1, 0.3)
 fridgeStatistics.loadChargingPowersFromFile(f"{thisDir}/data/dataport/accumulators/fridge/maxPowers.txt")
-fridgeStatistics.loadDischargingProfileFromFile(f"{thisDir}/data/dataport/accumulators/fridge/averageUsage.csv")
+fridgeStatistics.loadDischargingProfileFromFile(f"{thisDir}/data/dataport/accumulators/fridge/averageUsage.csv", dataConfig.fromDT, dataConfig.toDT)
 
 # water heater statistics
 waterHeaterStatistics = AccumulatorStatistics()
 waterHeaterStatistics.capacityParameters = (capacities.waterHeater.mean, capacities.waterHeater.std)
 waterHeaterStatistics.dischargingProfileScaleParameters = (1, 0.3)
 waterHeaterStatistics.loadChargingPowersFromFile(f"{thisDir}/data/dataport/accumulators/waterheater/maxPowers.txt")
-waterHeaterStatistics.loadDischargingProfileFromFile(f"{thisDir}/data/dataport/accumulators/waterheater/averageUsage.csv")
+waterHeaterStatistics.loadDischargingProfileFromFile(f"{thisDir}/data/dataport/accumulators/waterheater/averageUsage.csv", dataConfig.fromDT, dataConfig.toDT)
 
 # dishwasher statistics
 dishwasherStatistics = MachineStatistics()
 dishwasherStatistics.startAfterParameters = (21*60, 60)
 dishwasherStatistics.finishByParameters = (5*60, 60)
-dishwasherStatistics.loadUsageProbabilitiesFromFile(f"{thisDir}/data/dataport/machines/dishwasher/usages.csv")
+dishwasherStatistics.loadUsageProbabilitiesFromFile(f"{thisDir}/data/dataport/machines/dishwasher/usages.csv", dataConfig.fromDT, dataConfig.toDT)
 dishwasherStatistics.loadUsageProfilesFromFile(f"{thisDir}/data/dataport/machines/dishwasher/profiles.txt")
 
 # washing machine statistics
 washingMachineStatistics = MachineStatistics()
 washingMachineStatistics.startAfterParameters = (21*60, 60)
 washingMachineStatistics.finishByParameters = (5*60, 60)
-washingMachineStatistics.loadUsageProbabilitiesFromFile(f"{thisDir}/data/dataport/machines/washingmachine/usages.csv")
+washingMachineStatistics.loadUsageProbabilitiesFromFile(f"{thisDir}/data/dataport/machines/washingmachine/usages.csv", dataConfig.fromDT, dataConfig.toDT)
 washingMachineStatistics.loadUsageProfilesFromFile(f"{thisDir}/data/dataport/machines/washingmachine/profiles.txt")
+
+# statistics of all the cars in a household together
+carFleetStatistics = CarFleetStatistics(carStatistics)
+
+# expected charge needed by the cars of an average household on each day
+expectedDailyCarConsumption = DailyProfile.weightedTotal(
+	[carStatistics[carIndex].averageNeededCharge for carIndex in range(4)],
+	[atLeastThisManyCarsProbability[carIndex+1] for carIndex in range(4)],
+)
+
+# expected consumption of all the simulated appliances of an average household on each day
+expectedDailyConsumption = DailyProfile.weightedTotal(
+	[expectedDailyCarConsumption, airConditioningStatistics.averageDailyCharge, electricalHeatingStatistics.averageDailyCharge, fridgeStatistics.averageDailyCharge, waterHeaterStatistics.averageDailyCharge, dishwasherStatistics.averagePowerNeeded, washingMachineStatistics.averagePowerNeeded],
+	[1, ownershipRatios.airConditioning, ownershipRatios.electricalHeating, ownershipRatios.fridge, ownershipRatios.waterHeater, ownershipRatios.dishwasher, ownershipRatios.washingMachine],
+)
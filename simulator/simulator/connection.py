@@ -6,30 +6,37 @@ import numpy
 
 from . import utils
 from . import priceConfig
+from . import timeConfig
 
 from .constants import oneDay
 from .house import House
-from .profile import Profile
+from .priceSignal import PriceSignal, PriceSignalProfile
+from .profile import Profile, SharedProfile
 
 # class for the connections between the smart grid and houses
 class Connection:
+	# the attributes are kept in slots instead of a dictionary, as there is a connection for each house
+	__slots__ = ("currentDT", "house", "cheaperPriceRatioProfile", "cheaperMinutesProfile", "priceProfile")
+	
 	# current date and time in the simulation
 	currentDT: datetime.datetime
 	# the connected house
 	house: House
 	# probabilities with which the electricity price should be lower in a given minute
-	cheaperPriceRatioProfile: Profile
+	# the same values are shared by all the connections to the grid
+	cheaperPriceRatioProfile: SharedProfile
 	# times where the prices will be cheaper
 	cheaperMinutesProfile: Profile
-	# the actual price profile for the connected house
-	priceProfile: Profile
+	# the actual price signals for the connected house
+	# the signals are shared with the house and its appliances
+	priceProfile: PriceSignalProfile
 	
 	# constructor, just prepares the variables
 	def __init__(self, house: House):
 		self.house = house
-		self.cheaperPriceRatioProfile = Profile()
+		self.cheaperPriceRatioProfile = SharedProfile()
 		self.cheaperMinutesProfile = Profile()
-		self.priceProfile = Profile()
+		self.priceProfile = PriceSignalProfile()
 	
 	# sets everything up before the start of the simulation
 	def setUp(self, dt: datetime.datetime):
@@ -38,29 +45,32 @@ class Connection:
 		self.house.setUp(dt=dt)
 		
 		# generate cheaper price intervals and the electricity price profile ahead enough in the future
-		self.generateRandomCheaperIntervals(dt-1*oneDay, dt+2*oneDay)
-		self.generatePriceProfile(dt-1*oneDay, dt+2*oneDay)
+		priceHorizon = timeConfig.priceHorizonLength()
+		self.generateRandomCheaperIntervals(dt-1*oneDay, dt+priceHorizon)
+		self.generatePriceProfile(dt-1*oneDay, dt+priceHorizon)
 		
 		# send the generated price profile to the connected house
-		self.sendPriceProfile(dt-1*oneDay, dt+2*oneDay)
+		self.sendPriceProfile(dt-1*oneDay, dt+priceHorizon)
 	
-	# moves ahead one day and does all the calculations that need to be done in that day
+	# moves ahead one tick and does all the calculations that need to be done in that tick
 	def tick(self):
 		# remove past, unneeded values from the profiles to free up some memory
 		self.cheaperPriceRatioProfile.prune(self.currentDT - oneDay)
 		self.cheaperMinutesProfile.prune(self.currentDT - oneDay)
 		self.priceProfile.prune(self.currentDT - oneDay)
 		
-		# move one day ahead
-		self.currentDT += oneDay
+		# move one tick ahead
+		tick = timeConfig.tick()
+		self.currentDT += tick
 		cdt = self.currentDT
 		
-		# generate cheaper price intervals and the electricity price profile for one more day
-		self.generateRandomCheaperIntervals(cdt+oneDay, cdt+2*oneDay)
-		self.generatePriceProfile(cdt+oneDay, cdt+2*oneDay)
+		# generate cheaper price intervals and the electricity price profile for one more tick
+		priceHorizon = timeConfig.priceHorizonLength()
+		self.generateRandomCheaperIntervals(cdt+priceHorizon-tick, cdt+priceHorizon)
+		self.generatePriceProfile(cdt+priceHorizon-tick, cdt+priceHorizon)
 		
 		# send the generated price profile to the connected house
-		self.sendPriceProfile(cdt+oneDay, cdt+2*oneDay)
+		self.sendPriceProfile(cdt+priceHorizon-tick, cdt+priceHorizon)
 	
 	# generates intervals of cheaper prices based on the cheap price probabilities provided by the smart grid
 	def generateRandomCheaperIntervals(self, fromDT: datetime.datetime, toDT: datetime.datetime):
@@ -68,10 +78,14 @@ class Connection:
 		cheapIntervalLength = priceConfig.cheapIntervalLength
 		# at least how many minutes in total have to be cheap per day
 		cheapMinutesTotal = priceConfig.cheapMinutesCount
+		# the same in the time slots of the simulation, the cheap intervals are at least one time slot long
+		cheapIntervalSlots = max(1, round(cheapIntervalLength / timeConfig.slotLength))
+		cheapSlotsTotal = -(-cheapMinutesTotal // timeConfig.slotLength)
 		
 		# if it is configured to have zero minutes cheap, we act as if there was no lower or upper limit on the minutes
 		if cheapMinutesTotal == 0:
 			# get probabilities for the connected house having cheaper electricity at a given minute
+			self.fillMissingPriceRatio(toDT)
 			probs = self.cheaperPriceRatioProfile.get(fromDT, toDT)
 			# generate the positions of the cheaper minutes and save them
 			cheaperMinutes = numpy.random.random(probs.size) < probs
@@ -82,25 +96,26 @@ class Connection:
 			# generate cheaper intervals for each day that starts in the given interval
 			for midnight in utils.midnightsBetween(fromDT, toDT):
 				# start with all prices expensive
-				cheaperIntervals = numpy.zeros(utils.minutesIn(oneDay)+2*cheapIntervalLength)
+				cheaperIntervals = numpy.zeros(utils.slotsIn(oneDay)+2*cheapIntervalSlots)
 				
 				# get probabilities for a cheap interval being positioned in a given spot
 				# we can't change prices for previous days already broadcasted to houses, so we need to make sure the intervals we set will start after midnight of the previous day
-				shift = datetime.timedelta(minutes=cheapIntervalLength)
+				shift = datetime.timedelta(minutes=cheapIntervalSlots*timeConfig.slotLength)
+				self.fillMissingPriceRatio(midnight+shift+oneDay)
 				probs = self.cheaperPriceRatioProfile.get(midnight+shift, midnight+shift+oneDay)
 				
 				# this distinction is just to optimize the calculation, the results are the same
-				if cheapIntervalLength == 1:
-					# generate enough cheap minutes in the given day
-					cheapMinutePositions = utils.randomWithRelativeProbs(probs, count=cheapMinutesTotal)
-					cheaperIntervals[cheapMinutePositions] = 1
+				if cheapIntervalSlots == 1:
+					# generate enough cheap time slots in the given day
+					cheapSlotPositions = utils.randomWithRelativeProbs(probs, count=cheapSlotsTotal)
+					cheaperIntervals[cheapSlotPositions] = 1
 				else:
-					# add cheap intervals until there are enough cheap minutes in the given day
+					# add cheap intervals until there are enough cheap time slots in the given day
 					# some intervals might overlap and that is okay
-					while numpy.sum(cheaperIntervals) < cheapMinutesTotal:
+					while numpy.sum(cheaperIntervals) < cheapSlotsTotal:
 						# put a cheap interval in a random position
-						cheapIntervalStart = utils.minutesIn(shift) + utils.randomWithRelativeProbs(probs) - cheapIntervalLength//2
-						cheaperIntervals[cheapIntervalStart:cheapIntervalStart+cheapIntervalLength] = 1
+						cheapIntervalStart = utils.slotsIn(shift) + utils.randomWithRelativeProbs(probs) - cheapIntervalSlots//2
+						cheaperIntervals[cheapIntervalStart:cheapIntervalStart+cheapIntervalSlots] = 1
 				
 				# save the cheaper intervals
 				self.cheaperMinutesProfile.add(midnight, cheaperIntervals)
@@ -112,28 +127,38 @@ class Connection:
 		higherPrice = priceConfig.higherPrice
 		
 		# get where the price should be cheaper
-		cheapIntervals = numpy.minimum(self.cheaperMinutesProfile.get(fromDT, toDT), 1)
-		
-		# set the prices accordingly
-		prices = numpy.full(cheapIntervals.size, fill_value=higherPrice, dtype=float)
-		prices[cheapIntervals.astype(bool)] = lowerPrice
+		cheapIntervals = self.cheaperMinutesProfile.get(fromDT, toDT) != 0
 		
 		# add a bit of randomness so appliances don't always choose the earliest possible cheap location
-		prices += numpy.random.random(prices.size) * 0.01
+		# only its seed is sent with the prices, the house generates the random values from it
+		seed = numpy.random.randint(2**31)
 		
-		# save the price profile
-		self.priceProfile.set(fromDT, prices)
+		# save the price signal
+		self.priceProfile.set(fromDT, PriceSignal.fromCheapSlots(cheapIntervals, lowerPrice, higherPrice, seed))
 	
-	# sends the price profile to the connected house
+	# sends the price signals for the given interval to the connected house
 	def sendPriceProfile(self, fromDT: datetime.datetime, toDT: datetime.datetime):
-		prices = self.priceProfile.get(fromDT, toDT)
-		self.house.setPriceProfile(fromDT, prices)
+		for dt, signal in self.priceProfile.signals(fromDT, toDT):
+			self.house.setPriceProfile(dt, signal)
 	
 	# sets the probabilities that the electricity will be cheaper in a given minute
 	# called by the grid
 	def setPriceRatio(self, fromDT: datetime.datetime, priceRatio: numpy.ndarray):
+		self.fillMissingPriceRatio(fromDT)
 		self.cheaperPriceRatioProfile.set(fromDT, priceRatio)
 	
+	# makes sure the probabilities of cheaper electricity are known up to toDT
+	# where they didn't arrive from the grid (the message got lost or is late), the probabilities from one day earlier are used instead
+	def fillMissingPriceRatio(self, toDT: datetime.datetime):
+		profile = self.cheaperPriceRatioProfile
+		endDT = profile.endDT()
+		if endDT is None:
+			return
+		while endDT < toDT:
+			missingLength = min(toDT - endDT, oneDay)
+			profile.set(endDT, profile.get(endDT - oneDay, endDT - oneDay + missingLength))
+			endDT += missingLength
+	
 	# collect the electricity demand the house would have if it was using smart appliances
 	# called by the grid
 	def getSmartDemand(self, fromDT: datetime.datetime = None, toDT: datetime.datetime = None):
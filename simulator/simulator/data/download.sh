@@ -2,20 +2,16 @@
 
 pushd "$(dirname ${BASH_SOURCE[0]})" > /dev/null
 
-while read -r line || [ -n "$line" ]; do
-	declare "$line";
-done < config.txt
-
-DIRS=(dataport nhts)
+export PYTHONUNBUFFERED=1
 
 echo "Retreiving data..."
 
-for dir in ${DIRS[@]}; do
-	pushd $dir > /dev/null
-	./download.sh $fromdate $todate | stdbuf -oL sed 's/^/    /'
-	popd > /dev/null
-done
+# the pipeline runs the independent download steps concurrently and skips the steps which are already up to date
+./pipeline.py "$@"
+status=$?
 
 echo "Data retrieved."
 
-popd > /dev/null
\ No newline at end of file
+popd > /dev/null
+
+exit $status
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+import datetime
+import os
+
+from typing import Callable, Iterator, List
+
+import pandas
+
+thisDir = os.path.dirname(os.path.abspath(__file__))
+
+# local store of the raw data downloaded from the data sources
+# the data of each table is split into monthly partitions, so that when the downloaded interval is extended, only the missing months need to be downloaded
+# the derived files are then calculated from the data in the store
+class LocalStore:
+	# folder in which the partitions are saved
+	root: str
+	
+	# constructor, just saves the folder
+	def __init__(self, root: str = f"{thisDir}/store"):
+		self.root = root
+	
+	# returns the first day of the month following the month of the given date
+	@staticmethod
+	def nextMonth(date: datetime.date) -> datetime.date:
+		if date.month == 12:
+			return datetime.date(date.year + 1, 1, 1)
+		else:
+			return datetime.date(date.year, date.month + 1, 1)
+	
+	# returns the first days of all the months overlapping the interval between two dates
+	@classmethod
+	def monthsBetween(cls, fromDate: datetime.date, toDate: datetime.date) -> List[datetime.date]:
+		months = []
+		month = fromDate.replace(day=1)
+		while month < toDate:
+			months.append(month)
+			month = cls.nextMonth(month)
+		return months
+	
+	# returns the path to the file with the partition of a table for a given month
+	# partitions of months which haven't ended yet are saved separately, as their data may still be incomplete
+	def partitionPath(self, table: str, month: datetime.date, complete: bool = True) -> str:
+		return f"{self.root}/{table}/{month:%Y-%m}{'' if complete else '.partial'}.pkl"
+	
+	# returns the months in the interval between two dates for which the complete partitions of a table are not in the store
+	def missingMonths(self, table: str, fromDate: datetime.date, toDate: datetime.date) -> List[datetime.date]:
+		return [month for month in self.monthsBetween(fromDate, toDate) if not os.path.exists(self.partitionPath(table, month))]
+	
+	# downloads the missing partitions of a table in the interval between two dates
+	# the download function gets the first day of the month to download and the first day of the following month, and returns the downloaded data
+	# partitions of months which haven't ended yet are downloaded again each time, until the month ends
+	def update(self, table: str, fromDate: datetime.date, toDate: datetime.date, download: Callable[[datetime.date, datetime.date], pandas.DataFrame]):
+		missingMonths = self.missingMonths(table, fromDate, toDate)
+		print(f"{len(missingMonths)} of {len(self.monthsBetween(fromDate, toDate))} months of {table} data need to be downloaded")
+		for month in missingMonths:
+			print(f"Downloading {table} data for {month:%Y-%m}...")
+			data = download(month, self.nextMonth(month))
+			
+			# save the partition to a temporary file first, so that an interrupted download doesn't leave a broken partition behind
+			complete = self.nextMonth(month) <= datetime.date.today()
+			path = self.partitionPath(table, month, complete)
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+			data.to_pickle(f"{path}.tmp")
+			os.replace(f"{path}.tmp", path)
+			if complete and os.path.exists(self.partitionPath(table, month, False)):
+				os.remove(self.partitionPath(table, month, False))
+	
+	# loads the partition of a table for a given month, the incomplete one if the month hasn't ended yet
+	def loadPartition(self, table: str, month: datetime.date) -> pandas.DataFrame:
+		path = self.partitionPath(table, month)
+		if not os.path.exists(path):
+			path = self.partitionPath(table, month, False)
+		return pandas.read_pickle(path)
+	
+	# loads the partitions of a table in the interval between two dates, one month at a time
+	# if a time column is specified, only the rows with the time in the interval are returned
+	# if a list of columns is specified, only those columns are kept
+	def load(self, table: str, fromDate: datetime.date, toDate: datetime.date, timeColumn: str = None, columns: List[str] = None) -> Iterator[pandas.DataFrame]:
+		for month in self.monthsBetween(fromDate, toDate):
+			data = self.loadPartition(table, month)
+			if timeColumn is not None:
+				data = data[(data[timeColumn] >= pandas.Timestamp(fromDate)) & (data[timeColumn] < pandas.Timestamp(toDate))]
+			if columns is not None:
+				data = data[columns]
+			yield data
+	
+	# loads all the partitions of a table in the interval between two dates at once
+	def loadAll(self, table: str, fromDate: datetime.date, toDate: datetime.date, timeColumn: str = None, columns: List[str] = None) -> pandas.DataFrame:
+		return pandas.concat(list(self.load(table, fromDate, toDate, timeColumn, columns)), ignore_index=True)
+	
+	# returns the contents of a file which doesn't depend on the downloaded interval, downloading it only if it's not in the store yet
+	def file(self, name: str, download: Callable[[], bytes]) -> bytes:
+		path = f"{self.root}/{name}"
+		if not os.path.exists(path):
+			print(f"Downloading {name}...")
+			content = download()
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+			with open(f"{path}.tmp", "wb") as f:
+				f.write(content)
+			os.replace(f"{path}.tmp", path)
+		with open(path, "rb") as f:
+			return f.read()
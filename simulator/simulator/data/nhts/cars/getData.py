@@ -6,23 +6,26 @@ import sys
 
 from collections import defaultdict
 from io import BytesIO
-from types import SimpleNamespace
 from zipfile import ZipFile
 
 import numpy
 import pandas
 import requests
 
+# the local store of the downloaded data is shared by all the download scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+from localStore import LocalStore
+
 fromDT = datetime.datetime.strptime(sys.argv[1], "%Y-%m-%d")
 toDT = datetime.datetime.strptime(sys.argv[2], "%Y-%m-%d")
 
-# download the NHTS data
+# download the NHTS data, unless it's already in the local store (it covers a single year, so it doesn't depend on the interval)
 print("Downloading NHTS car trip data...")
-r = requests.get("https://nhts.ornl.gov/assets/2016/download/Csv.zip")
+content = LocalStore().file("nhts/Csv.zip", lambda: requests.get("https://nhts.ornl.gov/assets/2016/download/Csv.zip").content)
 
 # unpack it
 print("Parsing...")
-with ZipFile(BytesIO(r.content)) as archive:
+with ZipFile(BytesIO(content)) as archive:
 	
 	# parse the household data and trip data
 	# for each day in the desired interval, get the probability of a car making a trip on that day
@@ -39,110 +42,100 @@ with ZipFile(BytesIO(r.content)) as archive:
 		texanTrips = trips[(trips["VEHID"] >= 1) & (trips["VEHID"] <= 12) & (trips["HHSTATE"] == "TX")]
 		
 		# collect information about each of the households
-		householdInfo = defaultdict(SimpleNamespace)
-		
 		# each household is assigned some weight in the data, save that weight
 		# each household reports only on one day, save that day
 		# also save how many vehicles they have
-		for texan in texans.itertuples():
-			householdInfo[texan.HOUSEID].weight = texan.WTHHFIN
-			householdInfo[texan.HOUSEID].vehicleCount = texan.HHVEHCNT
-			householdInfo[texan.HOUSEID].reportMonth = texan.TDAYDATE % 100
-			householdInfo[texan.HOUSEID].reportWeekday = (texan.TRAVDAY - 1) % 7
-			householdInfo[texan.HOUSEID].usedVehicle = [0, 0, 0, 0]
+		householdInfo = pandas.DataFrame({
+			"weight": texans["WTHHFIN"].values,
+			"vehicleCount": texans["HHVEHCNT"].values,
+			"reportMonth": texans["TDAYDATE"].values % 100,
+			"reportWeekday": (texans["TRAVDAY"].values - 1) % 7,
+		}, index=texans["HOUSEID"].values)
 		
 		# for each household save which cars got used on the reported day
-		for trip in texanTrips.itertuples():
-			if trip.VEHID >= 1 and trip.VEHID <= 4:
-				householdInfo[trip.HOUSEID].usedVehicle[trip.VEHID - 1] = 1
+		for car in range(4):
+			usedHouseIDs = texanTrips.loc[texanTrips["VEHID"] == car + 1, "HOUSEID"].unique()
+			householdInfo[f"usedVehicle{car}"] = householdInfo.index.isin(usedHouseIDs)
 		
 		# count how many households have how many cars
-		weightedCarCountOccurences = [0, 0, 0, 0, 0]
-		for household in householdInfo.values():
-			weightedCarCountOccurences[min(household.vehicleCount, 4)] += household.weight
+		weightedCarCountOccurences = householdInfo["weight"].groupby(householdInfo["vehicleCount"].clip(upper=4)).sum().reindex(range(5), fill_value=0)
 		
-		carCountProbabilities = [occ / sum(weightedCarCountOccurences) for occ in weightedCarCountOccurences]
+		carCountProbabilities = weightedCarCountOccurences.values / weightedCarCountOccurences.sum()
 		with open("ownershipRatios.csv", "w+") as ownershipRatiosFile:
 			ownershipRatiosFile.write("carCount,ratio\n")
 			for carCount, ratio in enumerate(carCountProbabilities):
 				ownershipRatiosFile.write(f"{carCount},{ratio:.5f}\n")
 		
-		# count the probability that a car gets used on a given day for each day and each car index
-		usages = [defaultdict(lambda: [0, 0]) for _ in range(4)]
-		for household in householdInfo.values():
-			for car in range(4):
-				if household.vehicleCount > car:
-					if household.usedVehicle[car] == 1:
-						usages[car][(household.reportMonth, household.reportWeekday)][0] += household.weight
-					usages[car][(household.reportMonth, household.reportWeekday)][1] += household.weight
-	
+		# the month and the weekday of each day in the desired interval
+		days = pandas.date_range(fromDT, toDT, freq="D", inclusive="left")
+		dayKeys = pandas.MultiIndex.from_arrays([days.month, days.weekday])
+		minutes = pandas.date_range(fromDT, toDT, freq="min", inclusive="left")
+		
 		# calculate all the statistics for each household car index
 		for car in range(4):
-			# select the trips by the desired vehicle index
-			carTrips = texanTrips[texanTrips["VEHID"] == car + 1]
+			# count the probability that a car gets used on a given day for each day
+			owners = householdInfo[householdInfo["vehicleCount"] > car]
+			usedWeights = owners["weight"].where(owners[f"usedVehicle{car}"], 0).groupby([owners["reportMonth"], owners["reportWeekday"]]).sum()
+			totalWeights = owners["weight"].groupby([owners["reportMonth"], owners["reportWeekday"]]).sum()
+			usageRatios = (usedWeights.reindex(dayKeys, fill_value=0).values / numpy.maximum(1, totalWeights.reindex(dayKeys, fill_value=0).values))
+			
+			# select the trips by the desired vehicle index, ordered by household and trip number
+			carTrips = texanTrips[texanTrips["VEHID"] == car + 1].sort_values(["HOUSEID", "TDTRPNUM"], kind="stable")
 			
-			# for each vehicle and each day determines the first time it left the house and the last time it returned to the house
-			def getUsageInterval(df):
-				sortedDF = df.sort_values("TDTRPNUM")
-				first = sortedDF.iloc[0]
-				last = sortedDF.iloc[-1]
-				# we're interested only in the days where the first trip started from home and last trip ended at home
-				if (first["WHYFROM"] in [1, 2]) and (last["WHYTO"] in [1, 2]) and (first["STRTTIME"] < last["ENDTIME"]):
-					year = first["TDAYDATE"] // 100
-					month = first["TDAYDATE"] % 100
-					# Americans have Sunday as the first day of the week, fix that
-					weekday = first["TRAVDAY"] - 1 % 7
-					departure = "{:02d}:{:02d}".format(first["STRTTIME"] // 100, first["STRTTIME"] % 100)
-					arrival = "{:02d}:{:02d}".format(last["ENDTIME"] // 100, last["ENDTIME"] % 100)
-					return (year, month, weekday, departure, arrival)
-				else:
-					return None
+			# for each vehicle and each day determine the first time it left the house and the last time it returned to the house
+			first = carTrips.drop_duplicates("HOUSEID", keep="first").set_index("HOUSEID")
+			last = carTrips.drop_duplicates("HOUSEID", keep="last").set_index("HOUSEID")
 			
-			# group the trips by household and get the usage intervals of the desired vehicle
-			times = carTrips.groupby(["HOUSEID"]).apply(getUsageInterval).values
+			# we're interested only in the days where the first trip started from home and last trip ended at home
+			valid = first["WHYFROM"].isin([1, 2]) & last["WHYTO"].isin([1, 2]) & (first["STRTTIME"] < last["ENDTIME"])
+			first = first[valid]
+			last = last[valid]
 			
-			# filter out reports where nothing happened
-			times = list(times[times != None])
-			daytrips = pandas.DataFrame(times, columns=["Year", "Month", "Weekday", "Departure", "Arrival"])
+			# Americans have Sunday as the first day of the week, fix that
+			daytrips = pandas.DataFrame({
+				"Month": first["TDAYDATE"].values % 100,
+				"Weekday": first["TRAVDAY"].values - 1,
+				"DepartureSlot": 60 * (first["STRTTIME"].values // 100) + first["STRTTIME"].values % 100,
+				"ArrivalSlot": 60 * (last["ENDTIME"].values // 100) + last["ENDTIME"].values % 100,
+				"Departure": ["{:02d}:{:02d}".format(t // 100, t % 100) for t in first["STRTTIME"].values],
+				"Arrival": ["{:02d}:{:02d}".format(t // 100, t % 100) for t in last["ENDTIME"].values],
+			})
 			
-			# convert data to dictionary
-			dateGroups = daytrips.groupby(["Month", "Weekday"])[["Departure", "Arrival"]]
-			intervals = dateGroups.apply(lambda group: list(group.itertuples(index=False, name=None))).to_dict()
+			# for each month and weekday, calculate in which minutes which ratio of the cars that took a trip was at home
+			keys = pandas.MultiIndex.from_frame(daytrips[["Month", "Weekday"]]).unique()
+			keyIndices = keys.get_indexer(pandas.MultiIndex.from_frame(daytrips[["Month", "Weekday"]]))
+			tripCounts = numpy.bincount(keyIndices, minlength=len(keys))
+			departures = numpy.zeros((len(keys), 24*60+1))
+			# the cars are away from the departure slot until the arrival slot
+			away = daytrips["DepartureSlot"].values < daytrips["ArrivalSlot"].values
+			numpy.add.at(departures, (keyIndices[away], daytrips["DepartureSlot"].values[away]), 1)
+			numpy.add.at(departures, (keyIndices[away], numpy.minimum(daytrips["ArrivalSlot"].values[away], 24*60)), -1)
+			awayRatios = numpy.cumsum(departures, axis=1)[:, :24*60] / numpy.maximum(tripCounts, 1)[:, numpy.newaxis]
+			
+			# for each day in the desired interval get the ratio of cars which are at home in each minute
+			dayKeyIndices = keys.get_indexer(dayKeys)
+			dayAwayRatios = numpy.where((dayKeyIndices >= 0)[:, numpy.newaxis], awayRatios[dayKeyIndices], 0)
+			availability = 1 - (usageRatios[:, numpy.newaxis] * dayAwayRatios)
 			
 			# create the folder for saving the data
 			outFolder = f"car{car+1}"
 			os.makedirs(outFolder, exist_ok=True)
 			
 			# write the parsed data out to files
+			# for each day in the desired interval write out the probability that the car gets used
+			pandas.DataFrame({"date": days.date, "usageRatio": usageRatios}).to_csv(f"{outFolder}/usageRatios.csv", index=False, float_format="%.5f")
+			
 			# for each minute in the desired interval write out what ratio of cars is at home
+			pandas.DataFrame({"datetime": minutes, "availability": availability.ravel()}).to_csv(f"{outFolder}/availability.csv", index=False, float_format="%.5f")
+			
 			# for each day in the desired interval write out what trips were the cars taking
-			with open(f"{outFolder}/usageRatios.csv", "w+") as usageRatioFile, open(f"{outFolder}/trips.txt", "w+") as tripsFile, open(f"{outFolder}/availability.csv", "w+") as availabilityFile:
-				# write headers
-				usageRatioFile.write("date,usageRatio\n")
-				availabilityFile.write("datetime,availability\n")
-
-				currentDT = fromDT
-				while currentDT < toDT:
-					usage = usages[car][(currentDT.month, currentDT.weekday())]
-					usageRatio = usage[0] / max(1, usage[1])
-					usageRatioFile.write(f"{currentDT.date()},{usageRatio:.5f}\n")
-
-					trips = intervals.get((currentDT.month, currentDT.weekday()), [])
-					atHome = numpy.full(24*60, fill_value=max(len(trips), 1), dtype=float)
-					
-					for dep, arr in trips:
-						departureSlot = 60 * int(dep[:2]) + int(dep[-2:])
-						arrivalSlot = 60 * int(arr[:2]) + int(arr[-2:])
-						atHome[departureSlot:arrivalSlot] -= 1
-					
-					availabilityForDay = 1 - (usageRatio * (1 - (atHome / max(len(trips), 1))))
-					for minute, availability in enumerate(availabilityForDay):
-						availabilityFile.write(f"{currentDT+datetime.timedelta(minutes=minute)},{availability:.5f}\n")
-					
-					tripsFile.write(f"{currentDT.date()}: [")
-					tripsFile.write(", ".join([f"{dep}-{arr}" for dep, arr in trips]))
+			intervals = defaultdict(list)
+			for month, weekday, dep, arr in daytrips[["Month", "Weekday", "Departure", "Arrival"]].itertuples(index=False, name=None):
+				intervals[(month, weekday)].append(f"{dep}-{arr}")
+			with open(f"{outFolder}/trips.txt", "w+") as tripsFile:
+				for day in days:
+					tripsFile.write(f"{day.date()}: [")
+					tripsFile.write(", ".join(intervals.get((day.month, day.weekday()), [])))
 					tripsFile.write("]\n")
-					
-					currentDT += datetime.timedelta(days=1)
 
 print("NHTS car trip data retrieved.")
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+
+import datetime
+import multiprocessing
+import multiprocessing.connection
+import os
+import runpy
+import sys
+import time
+
+from typing import Dict, List
+
+# the libraries used by the download scripts are imported only once here,
+# the scripts then run in processes forked from this one, so they don't have to import them again
+import numpy
+import pandas
+import requests
+import sqlalchemy
+
+from localStore import LocalStore
+
+thisDir = os.path.dirname(os.path.abspath(__file__))
+
+# one step of the data download, running the getData.py script in a given folder
+class Stage:
+	# name of the stage
+	name: str
+	# folder with the script, relative to the data folder
+	folder: str
+	# names of the stages whose outputs the stage needs
+	dependencies: List[str]
+	# if the script needs the access credentials to the Dataport database
+	needsCredentials: bool
+	# files which the stage reads, besides the outputs of its dependencies, relative to the data folder
+	inputs: List[str]
+	# files which the stage creates, relative to the data folder
+	outputs: List[str]
+	
+	# constructor, just saves the parameters
+	def __init__(self, name: str, folder: str, dependencies: List[str], needsCredentials: bool, inputs: List[str], outputs: List[str]):
+		self.name = name
+		self.folder = folder
+		self.dependencies = dependencies
+		self.needsCredentials = needsCredentials
+		self.inputs = inputs
+		self.outputs = outputs
+
+# prefixes each line written to the output with the name of the stage, so that the output of the concurrently running stages can be told apart
+class PrefixedOutput:
+	# the output to write to
+	output: object
+	# the prefix of each line
+	prefix: str
+	# the part of the current line which was not written yet
+	buffer: str
+	
+	# constructor, just saves the parameters
+	def __init__(self, output, prefix: str):
+		self.output = output
+		self.prefix = prefix
+		self.buffer = ""
+	
+	# writes the whole lines to the output, keeps the rest for later
+	def write(self, text: str):
+		lines = (self.buffer + text).split("\n")
+		self.buffer = lines.pop()
+		for line in lines:
+			self.output.write(f"{self.prefix}{line}\n")
+		self.output.flush()
+	
+	# writes out the rest of the current line
+	def flush(self):
+		if self.buffer:
+			self.write("\n")
+
+# reads a file with lines in the format key=value into a dictionary
+def readConfig(path: str) -> Dict[str, str]:
+	config = {}
+	with open(path) as configFile:
+		for line in configFile:
+			if "=" in line:
+				key, value = line.strip().split("=", 1)
+				config[key] = value
+	return config
+
+# prepares the stages of the data download for a given interval
+def createStages(fromDate: datetime.date, toDate: datetime.date) -> List[Stage]:
+	# the stages downloading the data to the local store produce the partitions for each month
+	# for the months which haven't ended yet, the complete partition never exists, so the stage always runs to download their data again,
+	# and the stages depending on it see the newly downloaded incomplete partition
+	store = LocalStore()
+	def partitions(table: str) -> List[str]:
+		paths = []
+		for month in store.monthsBetween(fromDate, toDate):
+			paths.append(store.partitionPath(table, month))
+			if store.nextMonth(month) > datetime.date.today():
+				paths.append(store.partitionPath(table, month, False))
+		return [os.path.relpath(path, thisDir) for path in paths]
+	
+	common = ["config.txt", "localStore.py"]
+	accumulators = ["fridge", "electricalheating", "airconditioning", "waterheater"]
+	machines = ["dishwasher", "washingmachine"]
+	horizons = [0, 24, 48, 72, 96, 120]
+	
+	return [
+		Stage("realpower", "dataport/realpower", [], True, common, partitions("dataport/eg_realpower_1min") + partitions("dataport/householdIDs")),
+		Stage("accumulators", "dataport/accumulators", ["realpower"], False, common, [f"dataport/accumulators/{folder}/{file}" for folder in accumulators for file in ["maxPowers.txt", "averageUsage.csv"]]),
+		Stage("machines", "dataport/machines", ["realpower"], False, common, [f"dataport/machines/{folder}/{file}" for folder in machines for file in ["profiles.txt", "usages.csv"]]),
+		Stage("household", "dataport/household", ["realpower"], False, common, ["dataport/household/averageDraw.csv"]),
+		Stage("cars", "dataport/cars", [], True, common, ["dataport/cars/charges.txt", "dataport/cars/maxPowers.txt"]),
+		Stage("ercot", "dataport/ercot", [], True, common, ["dataport/ercot/actual/systemLoad.csv"] + [f"dataport/ercot/predictions/{hoursAhead}.csv" for hoursAhead in horizons]),
+		Stage("nhts", "nhts/cars", [], False, common, ["nhts/cars/ownershipRatios.csv"] + [f"nhts/cars/car{car}/{file}" for car in range(1, 5) for file in ["usageRatios.csv", "availability.csv", "trips.txt"]]),
+	]
+
+# checks if all the outputs of a stage exist and are newer than all its inputs, in which case the stage doesn't have to run again
+def isUpToDate(stage: Stage, stages: Dict[str, Stage]) -> bool:
+	inputs = stage.inputs + [f"{stage.folder}/getData.py"] + [output for dependency in stage.dependencies for output in stages[dependency].outputs]
+	outputs = [f"{thisDir}/{output}" for output in stage.outputs]
+	if not all(os.path.exists(output) for output in outputs):
+		return False
+	oldestOutput = min(os.path.getmtime(output) for output in outputs)
+	return all(os.path.getmtime(f"{thisDir}/{input}") < oldestOutput for input in inputs if os.path.exists(f"{thisDir}/{input}"))
+
+# runs the script of a stage, this runs in a separate forked process
+def runStage(stage: Stage, arguments: List[str]):
+	sys.stdout = PrefixedOutput(sys.__stdout__, f"[{stage.name}] ")
+	sys.stderr = PrefixedOutput(sys.__stderr__, f"[{stage.name}] ")
+	os.chdir(f"{thisDir}/{stage.folder}")
+	sys.argv = ["getData.py"] + arguments
+	try:
+		runpy.run_path("getData.py", run_name="__main__")
+	finally:
+		sys.stdout.flush()
+		sys.stderr.flush()
+
+# runs all the stages which are not up to date, each as soon as all the stages it depends on have finished
+# returns if all the stages finished successfully
+def runPipeline(stageList: List[Stage], fromDate: datetime.date, toDate: datetime.date, credentials: List[str], force: bool = False) -> bool:
+	stages = {stage.name: stage for stage in stageList}
+	context = multiprocessing.get_context("fork")
+	
+	waiting = list(stageList)
+	running = {}
+	startTimes = {}
+	results = {}
+	durations = {}
+	
+	st = time.time()
+	while waiting or running:
+		# start all the stages whose dependencies have finished
+		for stage in list(waiting):
+			dependencyResults = [results.get(dependency) for dependency in stage.dependencies]
+			if None in dependencyResults:
+				continue
+			waiting.remove(stage)
+			
+			if any(result not in ["done", "up to date"] for result in dependencyResults):
+				results[stage.name] = "skipped"
+				print(f"Skipping {stage.name}, some of the stages it depends on failed")
+			elif not force and isUpToDate(stage, stages):
+				results[stage.name] = "up to date"
+				print(f"Stage {stage.name} is up to date")
+			else:
+				print(f"Starting {stage.name}...")
+				arguments = [str(fromDate), str(toDate)] + (credentials if stage.needsCredentials else [])
+				process = context.Process(target=runStage, args=(stage, arguments), name=stage.name)
+				process.start()
+				running[process.sentinel] = (stage, process)
+				startTimes[stage.name] = time.time()
+		
+		# wait until some of the running stages finish
+		if running:
+			for sentinel in multiprocessing.connection.wait(list(running.keys())):
+				stage, process = running.pop(sentinel)
+				process.join()
+				durations[stage.name] = time.time() - startTimes[stage.name]
+				results[stage.name] = "done" if process.exitcode == 0 else "failed"
+				print(f"Stage {stage.name} {results[stage.name]} after {durations[stage.name]:.3f}s")
+	
+	# print how long each stage took
+	print("Stage timings:")
+	for stage in stageList:
+		duration = f"{durations[stage.name]:9.3f}s" if stage.name in durations else ""
+		print(f"    {stage.name:<15}{results[stage.name]:<12}{duration}")
+	print("Pipeline took {:.3f}s in total".format(time.time() - st))
+	
+	return all(result in ["done", "up to date"] for result in results.values())
+
+if __name__ == "__main__":
+	def usage():
+		print(f"Usage: {sys.argv[0]} [--force]")
+	
+	if len(sys.argv) > 2 or (len(sys.argv) == 2 and sys.argv[1] != "--force"):
+		usage()
+		sys.exit(1)
+	force = len(sys.argv) == 2
+	
+	# the interval to download and the access credentials are in the same files as they were for the download scripts
+	config = readConfig(f"{thisDir}/config.txt")
+	key = readConfig(f"{thisDir}/dataport/KEY")
+	try:
+		fromDate = datetime.date.fromisoformat(config["fromdate"])
+		toDate = datetime.date.fromisoformat(config["todate"])
+	except (KeyError, ValueError):
+		print("The config.txt file must contain the fromdate and todate fields in the format YYYY-MM-DD")
+		sys.exit(1)
+	
+	stages = createStages(fromDate, toDate)
+	success = runPipeline(stages, fromDate, toDate, [key.get("username", ""), key.get("password", "")], force)
+	sys.exit(0 if success else 1)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+import datetime
+
+from typing import Tuple
+
+from . import timeConfig
+
+from .constants import oneDay
+
+# which part of the downloaded data is loaded into the statistics
+
+# date and time from which the statistics are loaded, or None to load them from the start of the downloaded data
+fromDT = None
+
+# date and time until which the statistics are loaded, or None to load them until the end of the downloaded data
+toDT = None
+
+# how long before the start of the simulation the statistics are needed
+# the grid predicts the base demand from three days before the start, to have a margin for smoothing it
+startMargin = 3 * oneDay
+
+# overrides the config values
+# has to be called before the statistics are imported, they are loaded only once when importing them
+def configure(**values):
+	for name in values:
+		if name not in ("fromDT", "toDT"):
+			raise KeyError(f"Unknown data config value: {name}")
+	
+	newValues = {**current(), **values}
+	if newValues["fromDT"] is not None and newValues["toDT"] is not None and newValues["fromDT"] >= newValues["toDT"]:
+		raise ValueError(f"Invalid data window: {newValues['fromDT']} is not before {newValues['toDT']}")
+	
+	for name, value in values.items():
+		globals()[name] = value
+
+# returns the current config values
+def current() -> dict:
+	return {
+		"fromDT": fromDT,
+		"toDT": toDT,
+	}
+
+# returns the interval of the statistics which a simulation starting at startingDT and running for simulationLength days needs
+# at the end, the grid plans ahead by the prediction horizon, and the last tick can go past the end of the simulation
+# the interval is extended to whole days, as some of the statistics are daily
+def simulationWindow(startingDT: datetime.datetime, simulationLength: int) -> Tuple[datetime.datetime, datetime.datetime]:
+	startDT = startingDT - startMargin
+	endDT = startingDT + simulationLength * oneDay + timeConfig.tick() + timeConfig.predictionHorizonLength()
+	return datetime.datetime.combine(startDT.date(), datetime.time()), datetime.datetime.combine(endDT.date(), datetime.time()) + oneDay
+
+# limits the loaded statistics to what a simulation starting at startingDT and running for simulationLength days needs
+def configureForSimulation(startingDT: datetime.datetime, simulationLength: int):
+	fromDT, toDT = simulationWindow(startingDT, simulationLength)
+	configure(fromDT=fromDT, toDT=toDT)
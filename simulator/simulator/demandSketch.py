@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+import datetime
+
+from typing import List, Tuple
+
+import numpy
+
+from . import timeConfig
+
+from .utils import slotsBetween
+
+# the distribution of the demands of the individual households, without keeping the demand of each household
+# the demands are counted in histograms with logarithmically growing bins, one for each time bucket,
+# so any quantile can be estimated with a bounded relative error, and each bucket takes the same memory regardless of the number of households
+# once a bucket is complete, only its quantiles are kept and its histogram is dropped
+
+# length of one time bucket whose household demands are summarized together [minutes]
+bucketLength = 60
+
+# the quantiles of the household demands calculated for each bucket, in addition to the maximum
+quantiles = [0.5, 0.95, 0.99]
+
+# the largest relative error of the estimated quantiles
+relativeAccuracy = 0.01
+
+# the smallest demand which is told apart from zero, and the demand from which all the demands share the last bin [kW]
+# the exact maximum of each bucket is kept separately, so the maximum is correct even for the demands in the last bin
+minDemand = 0.001
+maxDemand = 100
+
+# how many households are collected before their demands are added to the histograms all at once
+batchSize = 256
+
+# ratio between the bounds of each histogram bin
+gamma = (1 + relativeAccuracy) / (1 - relativeAccuracy)
+
+# number of histogram bins, the first one for the demands below minDemand, and the rest growing by gamma
+binCount = 2 + int(numpy.ceil(numpy.log(maxDemand / minDemand) / numpy.log(gamma)))
+
+# returns the histogram bin of each demand
+def demandBins(demands: numpy.ndarray) -> numpy.ndarray:
+	bins = numpy.zeros(demands.shape, dtype=numpy.int64)
+	positive = demands >= minDemand
+	bins[positive] = 1 + numpy.minimum(numpy.log(demands[positive] / minDemand) / numpy.log(gamma), binCount - 2).astype(numpy.int64)
+	return bins
+
+# returns the value representing the demands in each histogram bin, within the relative accuracy from all of them
+def binDemands() -> numpy.ndarray:
+	return numpy.concatenate(([0], minDemand * gamma ** numpy.arange(binCount - 1) * 2 * gamma / (1 + gamma)))
+
+# sketch of the distribution of the household demands in each time bucket, for one demand control algorithm
+class DemandSketch:
+	# date and time from which the buckets are counted
+	originDT: datetime.datetime
+	# number of time slots of the simulation in each bucket
+	slotsPerBucket: int
+	# the index of the first bucket which is not complete yet
+	firstBucket: int
+	# the histograms of the buckets which are not complete yet, one row for each bucket
+	counts: numpy.ndarray
+	# the maximum household demand in the buckets which are not complete yet
+	maxima: numpy.ndarray
+	# the quantiles and the maximum of each complete bucket, one row for each bucket
+	results: List[numpy.ndarray]
+	# the demands of the households collected since the last batch was added to the histograms, with the date and time of their start
+	pending: List[Tuple[datetime.datetime, numpy.ndarray]]
+	
+	# constructor, the buckets are counted from the first demands added
+	def __init__(self):
+		self.originDT = None
+		self.slotsPerBucket = max(1, bucketLength // timeConfig.slotLength)
+		self.firstBucket = 0
+		self.counts = numpy.zeros((0, binCount), dtype=numpy.uint32)
+		self.maxima = numpy.zeros(0)
+		self.results = []
+		self.pending = []
+	
+	# adds the demand of one household starting at fromDT to the sketch
+	# the demand is only remembered until there is a whole batch of them, the values must not change until then
+	def add(self, fromDT: datetime.datetime, demand: numpy.ndarray):
+		self.pending.append((fromDT, demand))
+		if len(self.pending) >= batchSize:
+			self.flush()
+	
+	# adds all the remembered household demands to the histograms
+	# the demands starting at the same time are added together, with one histogram update for the whole batch
+	def flush(self):
+		if self.originDT is None and len(self.pending) > 0:
+			self.originDT = self.pending[0][0]
+		
+		for fromDT in sorted(set(dt for dt, _ in self.pending)):
+			demands = numpy.stack([demand for dt, demand in self.pending if dt == fromDT])
+			startSlot = slotsBetween(self.originDT, fromDT)
+			buckets = (startSlot + numpy.arange(demands.shape[1])) // self.slotsPerBucket - self.firstBucket
+			
+			# make room for the new buckets
+			newBucketCount = buckets[-1] + 1
+			if newBucketCount > self.counts.shape[0]:
+				self.counts = numpy.concatenate((self.counts, numpy.zeros((newBucketCount - self.counts.shape[0], binCount), dtype=numpy.uint32)))
+				self.maxima = numpy.concatenate((self.maxima, numpy.zeros(newBucketCount - self.maxima.size)))
+			
+			# count the demands in the bins of their buckets, all the buckets at once
+			cells = buckets[numpy.newaxis, :] * binCount + demandBins(demands)
+			self.counts += numpy.bincount(cells.ravel(), minlength=self.counts.size).reshape(self.counts.shape).astype(numpy.uint32)
+			numpy.maximum.at(self.maxima, buckets, demands.max(axis=0))
+		self.pending = []
+	
+	# calculates the quantiles of the buckets ending before toDT, which can't get any more demands, and drops their histograms
+	# if toDT is not given, all the buckets are completed
+	def complete(self, toDT: datetime.datetime = None):
+		self.flush()
+		if self.originDT is None:
+			return
+		
+		completeCount = self.counts.shape[0] if toDT is None else min(self.counts.shape[0], slotsBetween(self.originDT, toDT) // self.slotsPerBucket - self.firstBucket)
+		if completeCount <= 0:
+			return
+		
+		# find the bin in which each quantile is in each bucket
+		cumulativeCounts = numpy.cumsum(self.counts[:completeCount], axis=1, dtype=numpy.int64)
+		totals = cumulativeCounts[:, -1]
+		representatives = binDemands()
+		for bucket in range(completeCount):
+			if totals[bucket] == 0:
+				self.results.append(numpy.full(len(quantiles) + 1, numpy.nan))
+				continue
+			ranks = numpy.array(quantiles) * (totals[bucket] - 1)
+			bins = numpy.searchsorted(cumulativeCounts[bucket], ranks, side="right")
+			# the representative value can be a bit over the maximum, which is known exactly
+			values = numpy.minimum(representatives[bins], self.maxima[bucket])
+			self.results.append(numpy.append(values, self.maxima[bucket]))
+		
+		self.firstBucket += completeCount
+		self.counts = self.counts[completeCount:]
+		self.maxima = self.maxima[completeCount:]
+	
+	# returns the starts of the complete buckets between fromDT and toDT and their quantiles and maximum, one row for each bucket
+	def get(self, fromDT: datetime.datetime, toDT: datetime.datetime) -> Tuple[List[datetime.datetime], numpy.ndarray]:
+		if self.originDT is None:
+			return [], numpy.zeros((0, len(quantiles) + 1))
+		
+		bucketDelta = datetime.timedelta(minutes=self.slotsPerBucket * timeConfig.slotLength)
+		indices = [index for index in range(len(self.results)) if fromDT <= self.originDT + index * bucketDelta < toDT]
+		bucketDTs = [self.originDT + index * bucketDelta for index in indices]
+		values = numpy.array([self.results[index] for index in indices]).reshape(-1, len(quantiles) + 1)
+		return bucketDTs, values
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+
+import datetime
+import gc
+import io
+import json
+import random
+import socket
+import struct
+import time
+
+from typing import List, Tuple
+
+import numpy
+import pandas
+
+from . import priceConfig, timeConfig, utils
+
+from .connection import Connection
+from .constants import oneDay
+from .grid import Grid
+from .population import Population
+from .simulator import Simulator
+
+# the simulation split into a coordinator running the grid and workers running the connections and houses, communicating over TCP sockets
+# the coordinator sends the price ratios and the clock signals to the workers, and the workers send back the total demand of their houses
+
+# types of the messages sent between the coordinator and the workers
+# which houses the worker simulates and with which config, sent to the worker right after it connects
+ASSIGN = 1
+# set up the connections and houses of the worker at the time of the message
+SET_UP = 2
+# the cheap price ratios starting at the time of the message
+PRICE_RATIO = 3
+# move the connections of the worker one tick ahead
+TICK_CONNECTIONS = 4
+# move the houses of the worker one tick ahead and send back their demands
+TICK_HOUSES = 5
+# the total smart, uncontrolled and spread out demands of the houses of the worker starting at the time of the message, sent to the coordinator
+DEMANDS = 6
+# the simulation has finished, the worker can disconnect
+FINISH = 7
+# the parameters of the houses the worker simulates, sent right after the assignment
+POPULATION = 8
+
+# header of each message, with the message type, the time of the message in minutes since the epoch and the length of the payload in bytes
+# the payload is a JSON document for the ASSIGN messages, a population saved as a numpy archive for the POPULATION messages,
+# and little-endian 64-bit floats for all the other messages
+header = struct.Struct("!BqI")
+epoch = datetime.datetime(1970, 1, 1)
+
+# the port on which the coordinator waits for the workers by default
+defaultPort = 5555
+
+# sends a message with an optional time and payload
+def sendMessage(sock: socket.socket, messageType: int, dt: datetime.datetime = None, payload: bytes = b""):
+	minutes = 0 if dt is None else utils.minutesBetween(epoch, dt)
+	sock.sendall(header.pack(messageType, minutes, len(payload)) + payload)
+
+# sends a message with an array of values as its payload
+def sendValues(sock: socket.socket, messageType: int, dt: datetime.datetime, values: numpy.ndarray):
+	sendMessage(sock, messageType, dt, numpy.asarray(values, dtype="<f8").tobytes())
+
+# receives exactly the given number of bytes
+def receiveExactly(sock: socket.socket, size: int) -> bytearray:
+	data = bytearray(size)
+	view = memoryview(data)
+	received = 0
+	while received < size:
+		count = sock.recv_into(view[received:])
+		if count == 0:
+			raise ConnectionError("The other side closed the connection")
+		received += count
+	return data
+
+# receives one message, returns its type, time and payload
+def receiveMessage(sock: socket.socket) -> Tuple[int, datetime.datetime, bytearray]:
+	messageType, minutes, length = header.unpack(receiveExactly(sock, header.size))
+	return messageType, epoch + datetime.timedelta(minutes=minutes), receiveExactly(sock, length)
+
+# converts the payload of a message to an array of values
+def payloadValues(payload: bytearray) -> numpy.ndarray:
+	return numpy.frombuffer(payload, dtype="<f8").astype(float)
+
+# the connections to the houses simulated by one worker, as seen by the grid in the coordinator
+# it acts like a single connection, passing everything from the grid to the worker and returning the total demands of all the houses of the worker
+class RemoteShard:
+	# socket connected to the worker
+	sock: socket.socket
+	# number of houses simulated by the worker
+	houseCount: int
+	# start of the interval of the last demands received from the worker
+	demandsDT: datetime.datetime
+	# the last demands received from the worker, for each demand control algorithm
+	demands: numpy.ndarray
+	
+	# constructor, just saves the parameters
+	def __init__(self, sock: socket.socket, houseCount: int):
+		self.sock = sock
+		self.houseCount = houseCount
+		self.demandsDT = None
+		self.demands = None
+	
+	# tells the worker which houses of the population to simulate, and with which config
+	# the worker gets only the parameters of its own houses, so it doesn't have to generate or load the whole population
+	def assign(self, index: int, firstHouse: int, population: Population, seed: int):
+		assignment = {
+			"index": index,
+			"firstHouse": firstHouse,
+			"houseCount": self.houseCount,
+			"seed": seed,
+			"priceConfig": priceConfig.current(),
+			"timeConfig": timeConfig.current(),
+		}
+		sendMessage(self.sock, ASSIGN, payload=json.dumps(assignment).encode())
+		buffer = io.BytesIO()
+		population.slice(firstHouse, firstHouse + self.houseCount).save(buffer)
+		sendMessage(self.sock, POPULATION, payload=buffer.getvalue())
+	
+	# sets everything up before the start of the simulation
+	# called by the grid
+	def setUp(self, dt: datetime.datetime):
+		sendMessage(self.sock, SET_UP, dt)
+	
+	# moves ahead one tick in all the connections of the worker
+	# called by the grid
+	def tick(self):
+		sendMessage(self.sock, TICK_CONNECTIONS)
+	
+	# moves ahead one tick in all the houses of the worker, which then send back their demands
+	def tickHouses(self):
+		sendMessage(self.sock, TICK_HOUSES)
+	
+	# sets the probabilities that the electricity will be cheaper in a given time slot
+	# called by the grid
+	def setPriceRatio(self, fromDT: datetime.datetime, priceRatio: numpy.ndarray):
+		sendValues(self.sock, PRICE_RATIO, fromDT, priceRatio)
+	
+	# gets the total demands of the houses of the worker, waiting for them if they weren't received yet
+	def getDemands(self, fromDT: datetime.datetime, toDT: datetime.datetime) -> numpy.ndarray:
+		if self.demandsDT != fromDT:
+			messageType, dt, payload = receiveMessage(self.sock)
+			if messageType != DEMANDS or dt != fromDT:
+				raise ConnectionError(f"Expected the demands for {fromDT} from the worker, got message {messageType} for {dt}")
+			self.demands = payloadValues(payload).reshape(3, -1)
+			self.demandsDT = dt
+		return self.demands
+	
+	# collect the electricity demand the houses would have if they were using smart appliances
+	# called by the grid
+	def getSmartDemand(self, fromDT: datetime.datetime, toDT: datetime.datetime):
+		return self.getDemands(fromDT, toDT)[0]
+	
+	# collect the electricity demand the houses would have if they were NOT using smart appliances
+	# called by the grid
+	def getUncontrolledDemand(self, fromDT: datetime.datetime, toDT: datetime.datetime):
+		return self.getDemands(fromDT, toDT)[1]
+	
+	# collect the electricity demand the houses would have if they were using the spread out algorithm
+	# called by the grid
+	def getSpreadOutDemand(self, fromDT: datetime.datetime, toDT: datetime.datetime):
+		return self.getDemands(fromDT, toDT)[2]
+	
+	# tells the worker that the simulation has finished and disconnects from it
+	def finish(self):
+		try:
+			sendMessage(self.sock, FINISH)
+		finally:
+			self.sock.close()
+
+# smart grid whose houses are simulated by remote workers
+# the workers send only the total demands of their houses, so the distribution of the demands of the individual houses is not known
+class DistributedGrid(Grid):
+	# the connections are whole workers, not single houses
+	sketchHouseholds = False
+	
+	# connects the houses of a worker to the grid
+	def connectShard(self, shard: RemoteShard):
+		self.connections.append(shard)
+	
+	# returns the number of houses connected to the grid through all the workers
+	def houseCount(self) -> int:
+		return sum(shard.houseCount for shard in self.connections)
+
+# the part of the distributed simulation running the grid
+class Coordinator:
+	# waits for workerCount workers to connect, splits the houses between them and runs the simulation
+	# if no population of houses is given, a random one with houseCount houses is generated
+	# the results are the same as from Simulator.run
+	@classmethod
+	def run(cls, startingDT: datetime.datetime, simulationLength: int, houseCount: int, workerCount: int, outputFolder: str = None, host: str = "", port: int = defaultPort, seed: int = None, population: Population = None) -> pandas.DataFrame:
+		if seed is None:
+			seed = random.randrange(2**32)
+		# the population is generated from the seed separately, so the rest of the random numbers don't depend on it
+		if population is None:
+			print("Creating houses...")
+			numpy.random.seed(seed % 2**32)
+			population = Population.random(houseCount)
+		houseCount = population.houseCount
+		random.seed(seed)
+		numpy.random.seed(seed % 2**32)
+		
+		# wait for all the workers to connect
+		print(f"Waiting for {workerCount} workers on port {port}...")
+		sockets: List[socket.socket] = []
+		with socket.create_server((host, port)) as server:
+			while len(sockets) < workerCount:
+				sock, address = server.accept()
+				sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+				sockets.append(sock)
+				print(f"Worker {len(sockets)}/{workerCount} connected from {address[0]}")
+		
+		# remember the starting time
+		st = time.time()
+		
+		# split the houses evenly between the workers and connect them to the grid
+		print("Creating grid...")
+		grid = DistributedGrid()
+		shards = []
+		for index, sock in enumerate(sockets):
+			firstHouse = houseCount * index // workerCount
+			shard = RemoteShard(sock, houseCount * (index + 1) // workerCount - firstHouse)
+			shard.assign(index, firstHouse, population, seed)
+			grid.connectShard(shard)
+			shards.append(shard)
+		
+		try:
+			# set up the grid with the right time, the workers set up their houses in parallel
+			print("Setting up grid...")
+			grid.setUp(startingDT)
+			
+			print("Preparation took {:.3f}s".format(time.time() - st))
+			print()
+			
+			# for each tick of the simulation, let the workers calculate the demands of their houses in parallel and then move the grid ahead
+			endDT = startingDT + simulationLength * oneDay
+			currentDT = startingDT
+			while currentDT < endDT:
+				print("Calculating power draw for", Simulator.tickName(currentDT))
+				t = time.time()
+				for shard in shards:
+					shard.tickHouses()
+				grid.tick()
+				gc.collect()
+				print("Calculation took {:.3f}s".format(time.time() - t))
+				print()
+				currentDT += timeConfig.tick()
+		finally:
+			for shard in shards:
+				shard.finish()
+		
+		print("Simulation took {:.3f}s in total".format(time.time() - st))
+		print()
+		
+		# collect the results from the grid and save them to a folder if specified
+		data = Simulator.collectResults(grid, startingDT, simulationLength, houseCount)
+		if outputFolder is not None:
+			Simulator.saveResults(data, outputFolder, startingDT, simulationLength, houseCount)
+		
+		return data
+
+# the part of the distributed simulation running some of the connections and houses
+class Worker:
+	# connects to the coordinator and simulates the houses it assigns, until the simulation finishes
+	@classmethod
+	def run(cls, host: str, port: int = defaultPort):
+		print(f"Connecting to the coordinator at {host}:{port}...")
+		sock = socket.create_connection((host, port))
+		sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+		try:
+			# get the assigned houses and the config of the simulation
+			messageType, _, payload = receiveMessage(sock)
+			if messageType != ASSIGN:
+				raise ConnectionError(f"Expected the assignment from the coordinator, got message {messageType}")
+			assignment = json.loads(payload)
+			priceConfig.configure(**assignment["priceConfig"])
+			timeConfig.configure(**assignment["timeConfig"])
+			
+			# create the assigned houses from their parameters sent by the coordinator
+			messageType, _, payload = receiveMessage(sock)
+			if messageType != POPULATION:
+				raise ConnectionError(f"Expected the population from the coordinator, got message {messageType}")
+			print("Creating houses...")
+			population = Population.load(io.BytesIO(payload))
+			connections = [Connection(house=house) for house in population.houses()]
+			houses = [conn.house for conn in connections]
+			del population
+			seed = assignment["seed"]
+			
+			# the workers need different random numbers for the usage of their appliances and their prices
+			random.seed(seed + assignment["index"] + 1)
+			numpy.random.seed((seed + assignment["index"] + 1) % 2**32)
+			
+			# do what the coordinator says until the simulation finishes
+			currentDT = None
+			while True:
+				messageType, dt, payload = receiveMessage(sock)
+				if messageType == SET_UP:
+					print("Setting up houses...")
+					currentDT = dt
+					for conn in connections:
+						conn.setUp(dt)
+				elif messageType == PRICE_RATIO:
+					priceRatio = payloadValues(payload)
+					for conn in connections:
+						conn.setPriceRatio(dt, priceRatio)
+				elif messageType == TICK_CONNECTIONS:
+					for conn in connections:
+						conn.tick()
+				elif messageType == TICK_HOUSES:
+					print("Calculating power draw for", Simulator.tickName(currentDT))
+					t = time.time()
+					for house in houses:
+						house.tick()
+					gc.collect()
+					
+					# send back the total demands of the houses for the past tick
+					tick = timeConfig.tick()
+					demands = numpy.zeros((3, utils.slotsIn(tick)))
+					for conn in connections:
+						demands[0] += conn.getSmartDemand(currentDT, currentDT + tick)
+						demands[1] += conn.getUncontrolledDemand(currentDT, currentDT + tick)
+						demands[2] += conn.getSpreadOutDemand(currentDT, currentDT + tick)
+					sendValues(sock, DEMANDS, currentDT, demands)
+					currentDT += tick
+					print("Calculation took {:.3f}s".format(time.time() - t))
+				elif messageType == FINISH:
+					print("Simulation finished")
+					break
+				else:
+					raise ConnectionError(f"Unexpected message {messageType} from the coordinator")
+		finally:
+			sock.close()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+import contextlib
+import datetime
+import multiprocessing
+import os
+import random
+import time
+
+from typing import Tuple
+
+import numpy
+import pandas
+import scipy.stats
+
+from . import metrics, priceConfig, timeConfig
+
+from .simulator import Simulator
+
+# parameters of the ensemble that is currently running
+# the worker processes are forked after these are prepared, so they share them (and the loaded statistics) with the main process
+currentParameters: Tuple[datetime.datetime, int, int, int] = None
+
+# runs one replica of the current ensemble and returns its summary metrics and demands of the houses for each demand control algorithm
+def runReplica(index: int) -> Tuple[int, dict, numpy.ndarray]:
+	startingDT, simulationLength, houseCount, seed = currentParameters
+	
+	# each replica gets its own random numbers, so that the replicas are independent
+	random.seed(seed + index)
+	numpy.random.seed((seed + index) % 2**32)
+	
+	# the progress output of the replicas would get mixed up, so just throw it away
+	with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+		data = Simulator.run(startingDT, simulationLength, houseCount)
+	
+	demands = numpy.stack([data[f"{strategy}Demand"].values for strategy in metrics.strategies])
+	return index, metrics.summarize(data), demands
+
+# runner of multiple independent simulations of the same scenario, to get an estimate of how much the results vary
+class Ensemble:
+	# runs replicas of the simulation until the confidence interval of the chosen summary metric is narrow enough, or until maxReplicas replicas were run
+	# the tolerance is the maximum half-width of the confidence interval relative to the mean of the metric
+	# all the replicas run with the same time slot length, the currently configured one unless specified
+	@classmethod
+	def run(cls, startingDT: datetime.datetime, simulationLength: int, houseCount: int, outputFolder: str = None, maxReplicas: int = 100, metric: str = "SmartPeakToAverage", tolerance: float = 0.01, confidence: float = 0.95, minReplicas: int = 3, quantiles: Tuple[float, ...] = (0.05, 0.5, 0.95), processes: int = None, seed: int = None, slotLength: int = None) -> Tuple[pandas.DataFrame, pandas.DataFrame]:
+		global currentParameters
+		
+		if metric not in metrics.names:
+			raise ValueError(f"Unknown metric: {metric}")
+		if slotLength is not None:
+			timeConfig.configure(slotLength=slotLength)
+		
+		st = time.time()
+		if seed is None:
+			seed = random.randrange(2**32)
+		
+		summaries = []
+		demands = []
+		halfWidth = numpy.inf
+		currentParameters = (startingDT, simulationLength, houseCount, seed)
+		try:
+			with multiprocessing.get_context("fork").Pool(processes=processes) as pool:
+				# the confidence interval is checked after each replica in the order of their indices, whichever worker finishes first
+				# this way the ensemble always stops after the same replicas, so the same seed always gives the same results
+				for index, summary, replicaDemands in pool.imap(runReplica, range(maxReplicas)):
+					summaries.append({"replica": index, **summary})
+					demands.append(replicaDemands)
+					
+					values = numpy.array([s[metric] for s in summaries])
+					mean = numpy.mean(values)
+					if len(values) > 1:
+						halfWidth = scipy.stats.t.ppf((1 + confidence) / 2, len(values) - 1) * numpy.std(values, ddof=1) / numpy.sqrt(len(values))
+					print(f"Replica {index} finished, {metric} = {mean:.5f} ± {halfWidth:.5f} after {len(values)} replicas")
+					
+					# stop if the result is precise enough, the replicas still running get thrown away
+					if len(values) >= minReplicas and halfWidth <= tolerance * abs(mean):
+						print("Confidence interval is narrow enough, stopping")
+						break
+		finally:
+			currentParameters = None
+		
+		# aggregate the demands of the replicas for each time slot
+		demands = numpy.stack(demands) # replica x strategy x time slot
+		aggregated = {"Datetime": [startingDT + datetime.timedelta(minutes=i*timeConfig.slotLength) for i in range(demands.shape[2])]}
+		means = numpy.mean(demands, axis=0)
+		bands = numpy.quantile(demands, quantiles, axis=0)
+		for s, strategy in enumerate(metrics.strategies):
+			aggregated[f"{strategy}DemandMean"] = means[s]
+			for q, quantile in enumerate(quantiles):
+				aggregated[f"{strategy}DemandQ{100*quantile:g}"] = bands[q, s]
+		data = pandas.DataFrame(aggregated)
+		replicas = pandas.DataFrame(summaries).sort_values("replica")
+		
+		print("Ensemble of {} replicas took {:.3f}s in total".format(len(summaries), time.time() - st))
+		
+		# save the results to a folder if specified
+		if outputFolder is not None:
+			os.makedirs(outputFolder, exist_ok=True)
+			
+			# save the simulation parameters and the resulting confidence interval to a separate file
+			values = replicas[metric].values
+			with open(f"{outputFolder}/desc.txt", "w+") as descfile:
+				descfile.write(f"startingDatetime={startingDT}\n")
+				descfile.write(f"simulationLength={simulationLength}\n")
+				descfile.write(f"houseCount={houseCount}\n")
+				descfile.write(f"lowerPrice={priceConfig.lowerPrice}\n")
+				descfile.write(f"higherPrice={priceConfig.higherPrice}\n")
+				descfile.write(f"cheapIntervalLength={priceConfig.cheapIntervalLength}\n")
+				descfile.write(f"cheapMinutesTotal={priceConfig.cheapMinutesCount}\n")
+				descfile.write(f"slotLength={timeConfig.slotLength}\n")
+				descfile.write(f"tickLength={timeConfig.tickLength}\n")
+				descfile.write(f"coarseToFineScheduling={timeConfig.coarseToFineScheduling}\n")
+				descfile.write(f"seed={seed}\n")
+				descfile.write(f"replicaCount={len(values)}\n")
+				descfile.write(f"metric={metric}\n")
+				descfile.write(f"metricMean={numpy.mean(values)}\n")
+				descfile.write(f"metricConfidence={confidence}\n")
+				descfile.write(f"metricHalfWidth={halfWidth}\n")
+			
+			# save the aggregated demands and the summary metrics of each replica to csv files
+			data.to_csv(f"{outputFolder}/data.csv", index=False, header=True, float_format="%.5f")
+			replicas.to_csv(f"{outputFolder}/replicas.csv", index=False, header=True, float_format="%.5f")
+		
+		return data, replicas
@@ -10,10 +10,12 @@ import scipy.signal
 
 from . import applianceStatistics
 from . import gridStatistics
+from . import timeConfig
 from . import utils
 
 from .constants import oneDay
 from .connection import Connection
+from .demandSketch import DemandSketch
 from .house import House
 from .profile import Profile
 
@@ -33,9 +35,16 @@ class Grid:
 	spreadOutDemand: Profile
 	# how many households should be having cheap electricity at any given time
 	cheapPriceRatio: Profile
+	# distribution of the demands of the individual houses for each demand control algorithm
+	smartSketch: DemandSketch
+	uncontrolledSketch: DemandSketch
+	spreadOutSketch: DemandSketch
 	# connections to houses
 	connections: List[Connection]
 	
+	# if each connection is a single house, so its demands are added to the demand sketches
+	sketchHouseholds = True
+	
 	# constructor, just prepares all the variables
 	def __init__(self):
 		self.predictedBaseDemand = Profile()
@@ -44,45 +53,56 @@ class Grid:
 		self.uncontrolledDemand = Profile()
 		self.spreadOutDemand = Profile()
 		self.cheapPriceRatio = Profile()
+		self.smartSketch = DemandSketch()
+		self.uncontrolledSketch = DemandSketch()
+		self.spreadOutSketch = DemandSketch()
 		self.connections = []
 		
 	# connects a house to the grid
 	def connectHouse(self, house: House):
 		self.connections.append(Connection(house=house))
 	
+	# returns the number of houses connected to the grid
+	def houseCount(self) -> int:
+		return len(self.connections)
+	
 	# sets everything up before the start of the simulation
 	def setUp(self, dt: datetime.datetime):
 		self.currentDT = dt
 		
 		# predict base demand, calculate target demand and price ratios enough ahead in the future
-		self.predictBaseDemand(fromDT=dt-3*oneDay, toDT=dt+4*oneDay)
-		self.calculateTargetDemand(fromDT=dt-2*oneDay, toDT=dt+3.5*oneDay)
-		self.calculatePriceRatio(fromDT=dt-1*oneDay, toDT=dt+2.5*oneDay)
+		self.predictBaseDemand(fromDT=dt-3*oneDay, toDT=dt+timeConfig.predictionHorizonLength())
+		self.calculateTargetDemand(fromDT=dt-2*oneDay, toDT=dt+timeConfig.targetDemandHorizonLength())
+		self.calculatePriceRatio(fromDT=dt-1*oneDay, toDT=dt+timeConfig.priceRatioHorizonLength())
 		
 		# pass the price ratios to the house connections
-		self.distributePriceRatios(fromDT=dt-1*oneDay, toDT=dt+2.5*oneDay)
+		self.distributePriceRatios(fromDT=dt-1*oneDay, toDT=dt+timeConfig.priceRatioHorizonLength())
 		
 		# set up all the connections to the houses
 		for conn in self.connections:
 			conn.setUp(dt)
 	
-	# moves ahead one day and does all the calculations that need to be done in that day
+	# moves ahead one tick and does all the calculations that need to be done in that tick
 	def tick(self):
-		self.currentDT += oneDay
+		tick = timeConfig.tick()
+		self.currentDT += tick
 		cdt = self.currentDT
 		
 		# gather and save power demands from all the houses
-		self.collectDemands(fromDT=cdt-oneDay, toDT=cdt)
+		self.collectDemands(fromDT=cdt-tick, toDT=cdt)
 		
-		# predict base demand for one more day
-		self.predictBaseDemand(fromDT=cdt+3*oneDay, toDT=cdt+4*oneDay)
+		# predict base demand for one more tick
+		predictionHorizon = timeConfig.predictionHorizonLength()
+		self.predictBaseDemand(fromDT=cdt+predictionHorizon-tick, toDT=cdt+predictionHorizon)
 		
-		# calculate target demand and price ratios for one more day
-		self.calculateTargetDemand(fromDT=cdt+2.5*oneDay, toDT=cdt+3.5*oneDay)
-		self.calculatePriceRatio(fromDT=cdt+1.5*oneDay, toDT=cdt+2.5*oneDay)
+		# calculate target demand and price ratios for one more tick
+		targetDemandHorizon = timeConfig.targetDemandHorizonLength()
+		priceRatioHorizon = timeConfig.priceRatioHorizonLength()
+		self.calculateTargetDemand(fromDT=cdt+targetDemandHorizon-tick, toDT=cdt+targetDemandHorizon)
+		self.calculatePriceRatio(fromDT=cdt+priceRatioHorizon-tick, toDT=cdt+priceRatioHorizon)
 		
 		# pass the new price ratios to the house connections
-		self.distributePriceRatios(fromDT=cdt+1.5*oneDay, toDT=cdt+2.5*oneDay)
+		self.distributePriceRatios(fromDT=cdt+priceRatioHorizon-tick, toDT=cdt+priceRatioHorizon)
 		
 		# move ahead one day in all the connections to houses as well
 		for conn in self.connections:
@@ -92,8 +112,8 @@ class Grid:
 	def predictBaseDemand(self, fromDT: datetime.datetime, toDT: datetime.datetime):
 		# right now this just takes the total demand forecast and subtracts the recorded draw from households during the specified interval
 		# in an actual grid this would do some fancy calculations to get the prediction
-		demandForecast = gridStatistics.demandForecast.demand.get(fromDT, toDT) * (len(self.connections) / gridStatistics.demandForecast.householdCount)
-		householdDraw = gridStatistics.averageHouseholdDraw.get(fromDT, toDT) * len(self.connections)
+		demandForecast = gridStatistics.demandForecast.demand.get(fromDT, toDT) * (self.houseCount() / gridStatistics.demandForecast.householdCount)
+		householdDraw = gridStatistics.averageHouseholdDraw.get(fromDT, toDT) * self.houseCount()
 		
 		baseDemandPrediction = demandForecast - householdDraw
 		
@@ -105,20 +125,8 @@ class Grid:
 		# in an actual grid this would also take into account the power generation predictions (solar and wind generation, power plant shutdowns etc)
 		
 		# calculate the expected household demand in the given interval
-		# get power usage estimates for all the simulated appliances for each day in the interval and sum them together
-		totalExpectedConsumption = 0.0
-		for fraction, day in utils.dayPortionsBetween(fromDT, toDT):
-			expectedDayConsumption = 0.0
-			for carIndex in range(4):
-				expectedDayConsumption += applianceStatistics.atLeastThisManyCarsProbability[carIndex+1] * applianceStatistics.carStatistics[carIndex].averageNeededCharge[day]
-			expectedDayConsumption += applianceStatistics.ownershipRatios.airConditioning * applianceStatistics.airConditioningStatistics.averageDailyCharge[day]
-			expectedDayConsumption += applianceStatistics.ownershipRatios.electricalHeating * applianceStatistics.electricalHeatingStatistics.averageDailyCharge[day]
-			expectedDayConsumption += applianceStatistics.ownershipRatios.fridge * applianceStatistics.fridgeStatistics.averageDailyCharge[day]
-			expectedDayConsumption += applianceStatistics.ownershipRatios.waterHeater * applianceStatistics.waterHeaterStatistics.averageDailyCharge[day]
-			expectedDayConsumption += applianceStatistics.ownershipRatios.dishwasher * applianceStatistics.dishwasherStatistics.averagePowerNeeded[day]
-			expectedDayConsumption += applianceStatistics.ownershipRatios.washingMachine * applianceStatistics.washingMachineStatistics.averagePowerNeeded[day]
-			
-			totalExpectedConsumption += fraction * len(self.connections) * expectedDayConsumption
+		# the expected power usage of all the simulated appliances for each day is precomputed in the statistics
+		totalExpectedConsumption = self.houseCount() * applianceStatistics.expectedDailyConsumption.weightedSum(fromDT, toDT)
 		
 		# introduce some error in the statistics
 		totalExpectedConsumption *= 0.9 + numpy.random.random() * 0.2
@@ -127,11 +135,11 @@ class Grid:
 		# have some margin at the ends of the desired interval to have a better interpolation
 		startMargin = oneDay
 		endMargin = 0.5*oneDay
-		startIndex = utils.minutesIn(startMargin)
+		startIndex = utils.slotsIn(startMargin)
 		
 		baseDemand = self.predictedBaseDemand.get(fromDT-startMargin, toDT+endMargin)
 		
-		peaks = list(scipy.signal.find_peaks(baseDemand, distance=18*60, width=10)[0])
+		peaks = list(scipy.signal.find_peaks(baseDemand, distance=utils.slotsIn(datetime.timedelta(hours=18)), width=10/timeConfig.slotLength)[0])
 		
 		peakLocs = [0] + peaks + [baseDemand.size-1]
 		peakVals = baseDemand[[peaks[0]] + peaks + [peaks[-1]]]
@@ -147,15 +155,15 @@ class Grid:
 		targetDemand = (smoothDemand - baseDemand)[startIndex:]
 		
 		# calculate the integral of the target demand
-		intervalLength = utils.minutesBetween(fromDT, toDT)
-		totalTargetIntervalConsumption = numpy.sum(targetDemand[:intervalLength]) / 60
+		intervalLength = utils.slotsBetween(fromDT, toDT)
+		totalTargetIntervalConsumption = numpy.sum(targetDemand[:intervalLength]) * timeConfig.slotLength / 60
 		
 		if totalExpectedConsumption <= totalTargetIntervalConsumption:
 			# if the total target consumption is higher than the expected demand of the households, scale it down
 			targetDemand *= (totalExpectedConsumption / totalTargetIntervalConsumption)
 		else:
 			# otherwise shift the target demand up so it covers all the needs of the households
-			targetDemand += ((totalExpectedConsumption - totalTargetIntervalConsumption) / (intervalLength / 60))
+			targetDemand += ((totalExpectedConsumption - totalTargetIntervalConsumption) / (intervalLength * timeConfig.slotLength / 60))
 		
 		# negative demand is not possible in this simulation (eventually could be with vehicle-to-grid systems)
 		targetDemand = numpy.maximum(targetDemand, 0)
@@ -170,7 +178,7 @@ class Grid:
 		# get the target demand with some margin at the ends of the desired interval for a better interpolation
 		startMargin = oneDay
 		endMargin = oneDay
-		startIndex = utils.minutesIn(startMargin)
+		startIndex = utils.slotsIn(startMargin)
 		
 		targetDemand = self.targetDemand.get(fromDT-startMargin, toDT+endMargin)
 		
@@ -179,25 +187,11 @@ class Grid:
 		# dishwashers and washing machines contribute so little to the total power consumption that scaling based on their usage intervals doesn't really make sense
 		
 		# get the ratio of how much of the target demand is expected to be used by cars
-		totalExpectedCarConsumption = 0.0
-		for fraction, day in utils.dayPortionsBetween(fromDT-startMargin, toDT+endMargin):
-			for carIndex in range(4):
-				totalExpectedCarConsumption += fraction * len(self.connections) * applianceStatistics.atLeastThisManyCarsProbability[carIndex+1] * applianceStatistics.carStatistics[carIndex].averageNeededCharge[day]
+		totalExpectedCarConsumption = self.houseCount() * applianceStatistics.expectedDailyCarConsumption.weightedSum(fromDT-startMargin, toDT+endMargin)
 		carDemandRatio = totalExpectedCarConsumption / numpy.sum(targetDemand)
 		
 		# get the statistics for how many cars that need a charge are likely to be at home
-		totalNeedChargingRatio = 0
-		carsAtHome = numpy.zeros(utils.minutesBetween(fromDT-startMargin, toDT+endMargin))
-		for carIndex in range(4):
-			needChargingRatio = 0
-			totalFraction = 0
-			for fraction, day in utils.dayPortionsBetween(fromDT-startMargin, toDT+endMargin):
-				needChargingRatio += fraction * applianceStatistics.carStatistics[carIndex].usageProbabilities[day]
-				totalFraction += fraction
-			needChargingRatio /= totalFraction
-			carsAtHome += needChargingRatio * applianceStatistics.carStatistics[carIndex].availabilityProfile.get(fromDT-startMargin, toDT+endMargin)
-			totalNeedChargingRatio += needChargingRatio
-		carsAtHome /= totalNeedChargingRatio
+		carsAtHome = applianceStatistics.carFleetStatistics.expectedAvailability(fromDT-startMargin, toDT+endMargin)
 		
 		# we need to give more households cheaper prices when there are less cars at home, so those that are at home would charge and cover the target demand
 		availabilityScale = (1 - carDemandRatio) + carDemandRatio * carsAtHome
@@ -206,7 +200,7 @@ class Grid:
 		# we need to make sure the peaks each day correspond to cheap prices for all households
 		# therefore we need to scale the (already scaled) target demand so that the peaks each day scale to 1, to get nice probabilities
 		# get the peaks in the relative target demand, approximately one each day
-		peaks = list(scipy.signal.find_peaks(relativeTargetDemand, distance=18*60, width=10)[0])
+		peaks = list(scipy.signal.find_peaks(relativeTargetDemand, distance=utils.slotsIn(datetime.timedelta(hours=18)), width=10/timeConfig.slotLength)[0])
 		peakLocs = [0] + peaks + [relativeTargetDemand.size-1]
 		peakVals = relativeTargetDemand[[peaks[0]] + peaks + [peaks[-1]]]
 		
@@ -228,15 +222,29 @@ class Grid:
 	
 	# collects the power demands from all the connected households
 	def collectDemands(self, fromDT: datetime.datetime, toDT: datetime.datetime):
-		length = utils.minutesBetween(fromDT, toDT)
+		length = utils.slotsBetween(fromDT, toDT)
 		smartDemand = numpy.zeros(length)
 		uncontrolledDemand = numpy.zeros(length)
 		spreadOutDemand = numpy.zeros(length)
 		for conn in self.connections:
-			smartDemand += conn.getSmartDemand(fromDT, toDT)
-			uncontrolledDemand += conn.getUncontrolledDemand(fromDT, toDT)
-			spreadOutDemand += conn.getSpreadOutDemand(fromDT, toDT)
+			self.addDemands(fromDT, conn.getSmartDemand(fromDT, toDT), conn.getUncontrolledDemand(fromDT, toDT), conn.getSpreadOutDemand(fromDT, toDT), smartDemand, uncontrolledDemand, spreadOutDemand)
+		self.completeSketches(toDT)
 		
 		self.smartDemand.set(fromDT, smartDemand)
 		self.uncontrolledDemand.set(fromDT, uncontrolledDemand)
 		self.spreadOutDemand.set(fromDT, spreadOutDemand)
+	
+	# adds the demands of one connection to the total demands, and to the demand sketches if the connection is a single house
+	def addDemands(self, fromDT: datetime.datetime, smart: numpy.ndarray, uncontrolled: numpy.ndarray, spreadOut: numpy.ndarray, smartDemand: numpy.ndarray, uncontrolledDemand: numpy.ndarray, spreadOutDemand: numpy.ndarray):
+		smartDemand += smart
+		uncontrolledDemand += uncontrolled
+		spreadOutDemand += spreadOut
+		if self.sketchHouseholds:
+			self.smartSketch.add(fromDT, smart)
+			self.uncontrolledSketch.add(fromDT, uncontrolled)
+			self.spreadOutSketch.add(fromDT, spreadOut)
+	
+	# summarizes the demand sketches of the time buckets which ended before toDT, no more demands are collected for them
+	def completeSketches(self, toDT: datetime.datetime):
+		for sketch in (self.smartSketch, self.uncontrolledSketch, self.spreadOutSketch):
+			sketch.complete(toDT)
@@ -4,6 +4,8 @@ import os
 
 from types import SimpleNamespace
 
+from . import dataConfig
+
 from .profile import Profile
 
 thisDir = os.path.dirname(__file__)
@@ -17,14 +19,14 @@ class GridDemandStatistics(SimpleNamespace):
 
 # 4-day-ahead prediction of the Texas grid electricity demand
 demandForecast = GridDemandStatistics()
-demandForecast.demand = Profile.fromCSV(f"{thisDir}/data/dataport/ercot/predictions/96.csv")
+demandForecast.demand = Profile.fromCSV(f"{thisDir}/data/dataport/ercot/predictions/96.csv", dataConfig.fromDT, dataConfig.toDT)
 demandForecast.householdCount = 9500000
 
 
 # actual Texas grid electricity demand
 actualDemand = GridDemandStatistics()
-actualDemand.demand = Profile.fromCSV(f"{thisDir}/data/dataport/ercot/actual/systemLoad.csv")
+actualDemand.demand = Profile.fromCSV(f"{thisDir}/data/dataport/ercot/actual/systemLoad.csv", dataConfig.fromDT, dataConfig.toDT)
 actualDemand.householdCount = 9500000
 
 # average power usage of a household
-averageHouseholdDraw = Profile.fromCSV(f"{thisDir}/data/dataport/household/averageDraw.csv")
+averageHouseholdDraw = Profile.fromCSV(f"{thisDir}/data/dataport/household/averageDraw.csv", dataConfig.fromDT, dataConfig.toDT)
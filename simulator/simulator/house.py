@@ -5,22 +5,28 @@ import random
 
 from typing import List
 
-import numpy
-
-from . import applianceStatistics, utils
+from . import applianceStatistics, timeConfig, utils
 
 from .appliance import Appliance, Car, AirConditioning, ElectricalHeating, WaterHeater, Fridge, WashingMachine, Dishwasher
 from .constants import oneDay
+from .priceIndex import PriceIndex
+from .priceSignal import PriceSignal, PriceSignalProfile
 from .profile import Profile
 
 # class representing a house connected to the smart grid
 class House:
+	# the attributes are kept in slots instead of a dictionary, as the large simulations have millions of houses
+	__slots__ = ("currentDT", "appliances", "priceProfile", "priceIndex", "smartDemand", "uncontrolledDemand", "spreadOutDemand")
+	
 	# current date and time in the simulation
 	currentDT: datetime.datetime
 	# the appliances in this house
 	appliances: List[Appliance]
-	# the electricity prices for any given minute for this house
-	priceProfile: Profile
+	# the electricity price signals for this house
+	# the signals are shared with the connection to the grid and the appliances
+	priceProfile: PriceSignalProfile
+	# the data derived from the electricity prices, calculated once for all the appliances in this house
+	priceIndex: PriceIndex
 	# the electricity demand if this house was using smart appliances
 	smartDemand: Profile
 	# the electricity demand if the appliances in this house would charge as early as possible
@@ -31,7 +37,8 @@ class House:
 	# constructor, just sets up the variables
 	def __init__(self):
 		self.appliances = []
-		self.priceProfile = Profile()
+		self.priceProfile = PriceSignalProfile()
+		self.priceIndex = PriceIndex(self.priceProfile)
 		self.smartDemand = Profile()
 		self.uncontrolledDemand = Profile()
 		self.spreadOutDemand = Profile()
@@ -58,8 +65,9 @@ class House:
 			h.addAppliance(Dishwasher.random())
 		return h
 	
-	# adds an appliance to the house
+	# adds an appliance to the house, the appliance then uses the price data of the house
 	def addAppliance(self, appliance: Appliance):
+		appliance.priceIndex = self.priceIndex
 		self.appliances.append(appliance)
 	
 	# sets up the house for the simulation
@@ -69,7 +77,7 @@ class House:
 		for appliance in self.appliances:
 			appliance.setUp(dt)
 	
-	# moves ahead one day and does all the calculations that need to be done in that day
+	# moves ahead one tick and does all the calculations that need to be done in that tick
 	def tick(self):
 		# remove past, unneeded values from the profiles to free up some memory
 		self.priceProfile.prune(self.currentDT - oneDay)
@@ -81,19 +89,19 @@ class House:
 		for appliance in self.appliances:
 			appliance.tick()
 		
-		# move the current time forward
-		self.currentDT += oneDay
+		# move the current time forward, the price data for the past ticks is not needed anymore
+		self.currentDT += timeConfig.tick()
+		self.priceIndex.prune(self.currentDT)
 		
 		# collect the electricity demands from all the appliances
-		self.collectApplianceDemand(self.currentDT - oneDay, self.currentDT)
+		self.collectApplianceDemand(self.currentDT - timeConfig.tick(), self.currentDT)
 	
-	# sets the electricity price profile for this house
+	# sets the electricity price signal for this house
 	# called by the connection to the grid
-	def setPriceProfile(self, dt: datetime.datetime, prices: numpy.ndarray):
-		self.priceProfile.set(dt, prices)
-		# pass on the price profile to all the appliances in this house
-		for appliance in self.appliances:
-			appliance.setPriceProfile(dt, prices)
+	# the appliances read the prices through the price index of the house, so they don't need to be told about the new signal
+	def setPriceProfile(self, dt: datetime.datetime, signal: PriceSignal):
+		self.priceProfile.set(dt, signal)
+		self.priceIndex.invalidate(dt, dt + datetime.timedelta(minutes=signal.length * timeConfig.slotLength))
 	
 	# gets the electricity demand if this house was using smart appliances
 	def getSmartDemand(self, fromDT: datetime.datetime = None, toDT: datetime.datetime = None):
@@ -108,11 +116,9 @@ class House:
 		return self.spreadOutDemand.get(fromDT, toDT)
 	
 	# collects the electricity demands from all the appliances in the house
+	# the appliances with sparse demand add just their events to the demand of the house
 	def collectApplianceDemand(self, fromDT: datetime.datetime, toDT: datetime.datetime):
 		for appliance in self.appliances:
-			smartDemand = appliance.smartDemand.get(fromDT, toDT)
-			uncontrolledDemand = appliance.uncontrolledDemand.get(fromDT, toDT)
-			spreadOutDemand = appliance.spreadOutDemand.get(fromDT, toDT)
-			self.smartDemand.add(fromDT, smartDemand)
-			self.uncontrolledDemand.add(fromDT, uncontrolledDemand)
-			self.spreadOutDemand.add(fromDT, spreadOutDemand)
+			appliance.smartDemand.addTo(self.smartDemand, fromDT, toDT)
+			appliance.uncontrolledDemand.addTo(self.uncontrolledDemand, fromDT, toDT)
+			appliance.spreadOutDemand.addTo(self.spreadOutDemand, fromDT, toDT)
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+
+from typing import Dict
+
+import numpy
+import pandas
+
+# the demand control algorithms for which the simulator collects results
+strategies = ["Smart", "Uncontrolled", "SpreadOut"]
+
+# names of all the summary metrics
+names = [f"{strategy}{metric}" for strategy in strategies for metric in ["Peak", "PeakToAverage", "TotalPeak", "TotalPeakToAverage", "TargetDeviation"]]
+
+# calculates summary metrics of the simulation results for each demand control algorithm
+def summarize(data: pandas.DataFrame) -> Dict[str, float]:
+	summary = {}
+	baseDemand = data["ActualBaseDemand"].values
+	targetDemand = data["TargetDemand"].values
+	for strategy in strategies:
+		householdDemand = data[f"{strategy}Demand"].values
+		totalDemand = baseDemand + householdDemand
+		
+		# the peaks of the household demand and of the total grid demand, and their ratio to the average demand
+		summary[f"{strategy}Peak"] = numpy.max(householdDemand)
+		summary[f"{strategy}PeakToAverage"] = numpy.max(householdDemand) / numpy.mean(householdDemand)
+		summary[f"{strategy}TotalPeak"] = numpy.max(totalDemand)
+		summary[f"{strategy}TotalPeakToAverage"] = numpy.max(totalDemand) / numpy.mean(totalDemand)
+		# how far the household demand was from the target demand (root mean square error)
+		summary[f"{strategy}TargetDeviation"] = numpy.sqrt(numpy.mean((householdDemand - targetDemand) ** 2))
+	return summary
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+from typing import Dict, Iterator, List, Tuple, Type
+
+import numpy
+
+from . import applianceStatistics, utils
+
+from .appliance import Accumulator, Car, AirConditioning, ElectricalHeating, WaterHeater, Fridge, Machine, WashingMachine, Dishwasher
+from .house import House
+
+# the accumulator types a house can own, in the order in which they are added to the house
+accumulatorTypes: List[Tuple[str, Type[Accumulator]]] = [
+	("airConditioning", AirConditioning),
+	("electricalHeating", ElectricalHeating),
+	("waterHeater", WaterHeater),
+	("fridge", Fridge),
+]
+
+# the machine types a house can own, in the order in which they are added to the house
+machineTypes: List[Tuple[str, Type[Machine]]] = [
+	("washingMachine", WashingMachine),
+	("dishwasher", Dishwasher),
+]
+
+# parameters of one type of accumulators for all the houses in a population
+class AccumulatorFleet:
+	# names of the arrays with the parameters, in the order in which the constructor takes them
+	fields = ("owned", "chargingPowers", "capacities", "dischargingProfileScales", "smartCharges", "spreadOutCharges", "spreadOutCharging")
+	
+	# if the house owns the appliance
+	owned: numpy.ndarray
+	# the power with which the appliance charges
+	chargingPowers: numpy.ndarray # kW
+	# the charging capacity of the appliance
+	capacities: numpy.ndarray # kWh
+	# the scale of the discharging profile of the appliance
+	dischargingProfileScales: numpy.ndarray
+	# the initial charge of the appliance when using the smart algorithm
+	smartCharges: numpy.ndarray # kWh
+	# the initial charge of the appliance when using the spread out algorithm
+	spreadOutCharges: numpy.ndarray # kWh
+	# if the appliance is initially charging when using the spread out algorithm
+	spreadOutCharging: numpy.ndarray
+	
+	# constructor, just saves the parameters
+	def __init__(self, owned: numpy.ndarray, chargingPowers: numpy.ndarray, capacities: numpy.ndarray, dischargingProfileScales: numpy.ndarray, smartCharges: numpy.ndarray, spreadOutCharges: numpy.ndarray, spreadOutCharging: numpy.ndarray):
+		self.owned = owned
+		self.chargingPowers = chargingPowers
+		self.capacities = capacities
+		self.dischargingProfileScales = dischargingProfileScales
+		self.smartCharges = smartCharges
+		self.spreadOutCharges = spreadOutCharges
+		self.spreadOutCharging = spreadOutCharging
+	
+	# generates the parameters of a given accumulator type for a given number of houses according to the ownership and appliance statistics
+	@classmethod
+	def random(cls, houseCount: int, ownershipRatio: float, usageStatistics: applianceStatistics.AccumulatorStatistics):
+		owned = numpy.random.random(houseCount) < ownershipRatio
+		chargingPowers = usageStatistics.randomChargingPowers(houseCount)
+		# in this simulator we can't have an appliance which would charge up faster than in one minute
+		capacities = numpy.maximum(usageStatistics.randomCapacities(houseCount), 1.1 * chargingPowers / 60)
+		# stronger appliances are usually those which get used more, so scale the random discharging profile by the charging power of the appliance
+		dischargingProfileScales = usageStatistics.randomDischargingProfileScales(houseCount) * (chargingPowers / usageStatistics.averageChargingPower)
+		smartCharges = numpy.random.random(houseCount) * capacities
+		spreadOutCharges = numpy.random.random(houseCount) * capacities
+		spreadOutCharging = numpy.random.random(houseCount) < 0.5
+		return cls(owned, chargingPowers, capacities, dischargingProfileScales, smartCharges, spreadOutCharges, spreadOutCharging)
+	
+	# returns the parameters of the houses from start to stop
+	def slice(self, start: int, stop: int):
+		return type(self)(*(getattr(self, field)[start:stop] for field in self.fields))
+	
+	# creates the accumulator of a given type for a given house
+	def create(self, applianceType: Type[Accumulator], index: int) -> Accumulator:
+		return applianceType(
+			chargingPower=self.chargingPowers[index],
+			capacity=self.capacities[index],
+			dischargingProfileScale=self.dischargingProfileScales[index],
+			smartCharge=self.smartCharges[index],
+			spreadOutCharge=self.spreadOutCharges[index],
+			spreadOutCharging=bool(self.spreadOutCharging[index]),
+		)
+
+# class representing a population of houses connected to the smart grid
+# the parameters of all the houses are generated at once and kept in arrays, the actual houses are created from them only when needed
+class Population:
+	# number of houses in the population
+	houseCount: int
+	# how many cars each house owns
+	carCounts: numpy.ndarray
+	# the charging powers of the cars in each house, for each car index (zero if the house doesn't own the car)
+	carChargingPowers: numpy.ndarray # kW
+	# the parameters of the accumulators in each house, for each accumulator type
+	accumulators: Dict[str, AccumulatorFleet]
+	# if each house owns a machine, for each machine type
+	machines: Dict[str, numpy.ndarray]
+	
+	# constructor, just saves the parameters
+	def __init__(self, carCounts: numpy.ndarray, carChargingPowers: numpy.ndarray, accumulators: Dict[str, AccumulatorFleet], machines: Dict[str, numpy.ndarray]):
+		self.houseCount = carCounts.size
+		self.carCounts = carCounts
+		self.carChargingPowers = carChargingPowers
+		self.accumulators = accumulators
+		self.machines = machines
+	
+	# generates a population of random houses according to appliance ownership statistics
+	@classmethod
+	def random(cls, houseCount: int):
+		carCounts = utils.randomWithRelativeProbs(applianceStatistics.carCountProbabilities, count=houseCount, replace=True)
+		carChargingPowers = numpy.zeros((houseCount, len(applianceStatistics.carStatistics)))
+		for carIndex, carStatistics in enumerate(applianceStatistics.carStatistics):
+			owned = carCounts > carIndex
+			carChargingPowers[owned, carIndex] = carStatistics.randomChargingPowers(numpy.count_nonzero(owned))
+		
+		accumulators = {}
+		for name, applianceType in accumulatorTypes:
+			accumulators[name] = AccumulatorFleet.random(houseCount, getattr(applianceStatistics.ownershipRatios, name), applianceType.usageStatistics)
+		
+		machines = {}
+		for name, _ in machineTypes:
+			machines[name] = numpy.random.random(houseCount) < getattr(applianceStatistics.ownershipRatios, name)
+		
+		return cls(carCounts, carChargingPowers, accumulators, machines)
+	
+	# loads a population saved by save, from a path or from a file object
+	@classmethod
+	def load(cls, path):
+		with numpy.load(path) as arrays:
+			accumulators = {name: AccumulatorFleet(*(arrays[f"{name}.{field}"] for field in AccumulatorFleet.fields)) for name, _ in accumulatorTypes}
+			machines = {name: arrays[f"{name}.owned"] for name, _ in machineTypes}
+			return cls(arrays["carCounts"], arrays["carChargingPowers"], accumulators, machines)
+	
+	# saves the parameters of all the houses to a compressed numpy archive, one array for each parameter
+	# the same houses can then be simulated again by loading the population, e.g. to compare two simulations on the same houses
+	# numpy adds the .npz extension to the path if it doesn't have it, the population can also be saved to a file object
+	def save(self, path):
+		arrays = {
+			"carCounts": self.carCounts,
+			"carChargingPowers": self.carChargingPowers,
+		}
+		for name, fleet in self.accumulators.items():
+			for field in AccumulatorFleet.fields:
+				arrays[f"{name}.{field}"] = getattr(fleet, field)
+		for name, owned in self.machines.items():
+			arrays[f"{name}.owned"] = owned
+		numpy.savez_compressed(path, **arrays)
+	
+	# returns the population of the houses from start to stop, e.g. to simulate them separately
+	def slice(self, start: int, stop: int):
+		accumulators = {name: fleet.slice(start, stop) for name, fleet in self.accumulators.items()}
+		machines = {name: owned[start:stop] for name, owned in self.machines.items()}
+		return type(self)(self.carCounts[start:stop], self.carChargingPowers[start:stop], accumulators, machines)
+	
+	# creates the house with a given index in the population
+	def house(self, index: int) -> House:
+		h = House()
+		for carIndex in range(self.carCounts[index]):
+			h.addAppliance(Car.withIndex(index=carIndex, chargingPower=self.carChargingPowers[index, carIndex]))
+		for name, applianceType in accumulatorTypes:
+			fleet = self.accumulators[name]
+			if fleet.owned[index]:
+				h.addAppliance(fleet.create(applianceType, index))
+		for name, applianceType in machineTypes:
+			if self.machines[name][index]:
+				h.addAppliance(applianceType())
+		return h
+	
+	# creates all the houses in the population
+	def houses(self) -> Iterator[House]:
+		for index in range(self.houseCount):
+			yield self.house(index)
@@ -19,3 +19,19 @@ cheapMinutesCount = priceConfig.cheapMinutesCount
 # the electricity prices [money per kWh]
 lowerPrice = priceConfig.lowerPrice
 higherPrice = priceConfig.higherPrice
+
+# overrides the loaded config values, e.g. when comparing multiple price configurations
+def configure(**values):
+	for name, value in values.items():
+		if name not in ("cheapIntervalLength", "cheapMinutesCount", "lowerPrice", "higherPrice"):
+			raise KeyError(f"Unknown price config value: {name}")
+		globals()[name] = value
+
+# returns the current config values
+def current() -> dict:
+	return {
+		"cheapIntervalLength": cheapIntervalLength,
+		"cheapMinutesCount": cheapMinutesCount,
+		"lowerPrice": lowerPrice,
+		"higherPrice": higherPrice,
+	}
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import datetime
+
+from typing import Dict, Tuple
+
+import numpy
+
+from .priceSignal import PriceSignalProfile
+
+# cache of the data derived from the electricity prices of one house, shared by all the appliances in the house
+# all the appliances plan their demand from the same prices in the same intervals, so the prices are sorted and summed up only once for each interval
+# the cached values are read-only, and they are dropped when the prices in their interval change
+class PriceIndex:
+	__slots__ = ("priceProfile", "cache")
+	
+	# the electricity price signals the data is derived from
+	priceProfile: PriceSignalProfile
+	# the cached data, for the kind of the data, the interval it is derived from and the parameters it was calculated with
+	cache: Dict[Tuple, object]
+	
+	# constructor, the prices are read from the given price profile
+	def __init__(self, priceProfile: PriceSignalProfile):
+		self.priceProfile = priceProfile
+		self.cache = {}
+	
+	# returns the cached value with the given key, calculating it first if it's not cached yet
+	def cached(self, key: Tuple, calculate):
+		if key not in self.cache:
+			self.cache[key] = calculate()
+		return self.cache[key]
+	
+	# returns the prices between fromDT and toDT, with each time slot repeated steps times
+	def prices(self, fromDT: datetime.datetime, toDT: datetime.datetime, steps: int = 1) -> numpy.ndarray:
+		def calculate():
+			prices = numpy.repeat(self.priceProfile.get(fromDT, toDT), steps) if steps > 1 else self.priceProfile.get(fromDT, toDT)
+			prices.flags.writeable = False
+			return prices
+		return self.cached(("prices", fromDT, toDT, steps), calculate)
+	
+	# returns the positions of the prices between fromDT and toDT ordered from the cheapest to the most expensive
+	# the order is taken straight from the price signals, without calculating the prices
+	def cheapestOrder(self, fromDT: datetime.datetime, toDT: datetime.datetime, steps: int = 1) -> numpy.ndarray:
+		def calculate():
+			# the cheap time slots go first, and the time slots with the same price are ordered by their tie-breaking values
+			slotOrder = numpy.lexsort((self.priceProfile.tieBreak(fromDT, toDT), ~self.priceProfile.cheap(fromDT, toDT)))
+			order = (slotOrder[:, numpy.newaxis] * steps + numpy.arange(steps)).ravel()
+			order.flags.writeable = False
+			return order
+		return self.cached(("cheapestOrder", fromDT, toDT, steps), calculate)
+	
+	# returns the positions of the count cheapest prices between fromDT and toDT, counting only the positions from startSlot to stopSlot
+	# the positions are ordered from the cheapest to the most expensive
+	def cheapestSlots(self, fromDT: datetime.datetime, toDT: datetime.datetime, startSlot: int, stopSlot: int, count: int) -> numpy.ndarray:
+		order = self.cheapestOrder(fromDT, toDT)
+		return order[(order >= startSlot) & (order < stopSlot)][:count]
+	
+	# returns the sums of the prices between fromDT and toDT up to each position, starting with a zero
+	def prefixSums(self, fromDT: datetime.datetime, toDT: datetime.datetime, steps: int = 1) -> numpy.ndarray:
+		def calculate():
+			sums = numpy.concatenate(([0], numpy.cumsum(self.prices(fromDT, toDT, steps))))
+			sums.flags.writeable = False
+			return sums
+		return self.cached(("prefixSums", fromDT, toDT, steps), calculate)
+	
+	# splits the prices between fromDT and toDT into blocks of at most blockLength positions, split also where the price changes,
+	# so that the price is almost the same in the whole block
+	# returns the boundaries of the blocks (including the end of the last one) and the average price in each block
+	def blocks(self, fromDT: datetime.datetime, toDT: datetime.datetime, steps: int, blockLength: int) -> Tuple[numpy.ndarray, numpy.ndarray]:
+		def calculate():
+			prices = self.prices(fromDT, toDT, steps)
+			priceChanges = numpy.nonzero(numpy.abs(numpy.diff(prices)) > 0.1 * numpy.ptp(prices))[0] + 1
+			boundaries = numpy.append(numpy.union1d(numpy.arange(0, prices.size, blockLength), priceChanges), prices.size)
+			sums = self.prefixSums(fromDT, toDT, steps)
+			blockPrices = numpy.diff(sums[boundaries]) / numpy.diff(boundaries)
+			boundaries.flags.writeable = False
+			blockPrices.flags.writeable = False
+			return boundaries, blockPrices
+		return self.cached(("blocks", fromDT, toDT, steps, blockLength), calculate)
+	
+	# drops the cached data derived from the prices between fromDT and toDT, called when they change
+	def invalidate(self, fromDT: datetime.datetime, toDT: datetime.datetime):
+		self.cache = {key: value for key, value in self.cache.items() if key[2] <= fromDT or toDT <= key[1]}
+	
+	# drops the cached data for the intervals starting before toDT, the appliances only ask for the intervals starting in the current tick
+	def prune(self, toDT: datetime.datetime):
+		self.cache = {key: value for key, value in self.cache.items() if key[1] >= toDT}
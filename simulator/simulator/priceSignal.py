@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+import datetime
+
+from typing import Callable, List, Tuple
+
+import numpy
+
+from . import timeConfig
+
+from .utils import slotsBetween
+
+# how much the prices are changed by the tie-breaking randomness at most [money per kWh]
+# it is much smaller than the difference between the lower and the higher price, so it only orders the time slots with the same price
+tieBreakScale = 0.01
+
+# compact electricity price signal for a number of time slots, as it would be sent to a house
+# the price has only two levels, so the signal is just a bit for each time slot saying if the price is the lower one,
+# and a seed from which the random tie-breaking values are generated, so that the appliances don't always choose the earliest possible cheap time slots
+class PriceSignal:
+	__slots__ = ("length", "cheapBits", "lowerPrice", "higherPrice", "seed")
+	
+	# number of time slots in the signal
+	length: int
+	# the bits saying in which time slots the price is the lower one, packed into bytes
+	cheapBits: numpy.ndarray
+	# the electricity prices [money per kWh]
+	lowerPrice: float
+	higherPrice: float
+	# the seed of the random tie-breaking values
+	seed: int
+	
+	# constructor, just saves the values
+	def __init__(self, length: int, cheapBits: numpy.ndarray, lowerPrice: float, higherPrice: float, seed: int):
+		self.length = length
+		self.cheapBits = cheapBits
+		self.lowerPrice = lowerPrice
+		self.higherPrice = higherPrice
+		self.seed = seed
+	
+	# creates the signal from where the price is the lower one in each time slot
+	@classmethod
+	def fromCheapSlots(cls, cheapSlots: numpy.ndarray, lowerPrice: float, higherPrice: float, seed: int):
+		return cls(cheapSlots.size, numpy.packbits(cheapSlots.astype(bool)), lowerPrice, higherPrice, seed)
+	
+	# returns if the price is the lower one in each time slot
+	def cheap(self) -> numpy.ndarray:
+		return numpy.unpackbits(self.cheapBits, count=self.length).astype(bool)
+	
+	# returns the random tie-breaking value between 0 and 1 for each time slot, they are the same each time they are generated
+	def tieBreak(self) -> numpy.ndarray:
+		return numpy.random.default_rng(self.seed).random(self.length)
+	
+	# returns the actual prices in each time slot, with the tie-breaking values added to them
+	def prices(self) -> numpy.ndarray:
+		return numpy.where(self.cheap(), self.lowerPrice, self.higherPrice) + self.tieBreak() * tieBreakScale
+
+# helper class to store the price signals for a house, one for each interval the prices were sent for
+# the values for any interval are put together from the signals only when they are needed
+class PriceSignalProfile:
+	__slots__ = ("originDT", "windows")
+	
+	# date and time from which the positions of the signals are counted
+	originDT: datetime.datetime
+	# the position of the first time slot of each stored signal and the signal, in the order in which they were set
+	windows: List[Tuple[int, PriceSignal]]
+	
+	# constructor
+	def __init__(self):
+		self.originDT = None
+		self.windows = []
+	
+	# puts together the values between fromDT and toDT from the values of the signals overlapping the interval
+	# the signals set later overwrite the earlier ones, and where there are no signals, the values are zeros
+	def collect(self, fromDT: datetime.datetime, toDT: datetime.datetime, values: Callable[[PriceSignal], numpy.ndarray], dtype: type) -> numpy.ndarray:
+		length = slotsBetween(fromDT, toDT)
+		res = numpy.zeros(length, dtype=dtype)
+		if self.originDT is None:
+			return res
+		
+		startIndex = slotsBetween(self.originDT, fromDT)
+		stopIndex = startIndex + length
+		for windowStart, signal in self.windows:
+			overlapStart = max(startIndex, windowStart)
+			overlapStop = min(stopIndex, windowStart + signal.length)
+			if overlapStart < overlapStop:
+				res[overlapStart-startIndex:overlapStop-startIndex] = values(signal)[overlapStart-windowStart:overlapStop-windowStart]
+		return res
+	
+	# get the prices between fromDT and toDT, return zeros if the prices are missing
+	def get(self, fromDT: datetime.datetime, toDT: datetime.datetime) -> numpy.ndarray:
+		return self.collect(fromDT, toDT, PriceSignal.prices, float)
+	
+	# get if the price is the lower one in each time slot between fromDT and toDT
+	def cheap(self, fromDT: datetime.datetime, toDT: datetime.datetime) -> numpy.ndarray:
+		return self.collect(fromDT, toDT, PriceSignal.cheap, bool)
+	
+	# get the tie-breaking values for each time slot between fromDT and toDT
+	def tieBreak(self, fromDT: datetime.datetime, toDT: datetime.datetime) -> numpy.ndarray:
+		return self.collect(fromDT, toDT, PriceSignal.tieBreak, float)
+	
+	# get the signals starting between fromDT and toDT, together with the date and time of their start
+	def signals(self, fromDT: datetime.datetime, toDT: datetime.datetime) -> List[Tuple[datetime.datetime, PriceSignal]]:
+		if self.originDT is None:
+			return []
+		startIndex = slotsBetween(self.originDT, fromDT)
+		stopIndex = slotsBetween(self.originDT, toDT)
+		return [(self.originDT + datetime.timedelta(minutes=windowStart * timeConfig.slotLength), signal) for windowStart, signal in self.windows if startIndex <= windowStart < stopIndex]
+	
+	# store the signal starting at fromDT
+	def set(self, fromDT: datetime.datetime, signal: PriceSignal):
+		if self.originDT is None:
+			self.originDT = fromDT
+		self.windows.append((slotsBetween(self.originDT, fromDT), signal))
+	
+	# delete the signals with all values before toDT
+	def prune(self, toDT: datetime.datetime):
+		if self.originDT is None:
+			return
+		
+		index = slotsBetween(self.originDT, toDT)
+		self.windows = [(start, signal) for start, signal in self.windows if start + signal.length > index]
@@ -1,49 +1,74 @@
 #!/usr/bin/env python3
 
 import datetime
-from typing import Dict
+import io
+from typing import Dict, List, Tuple, Union
 
 import numpy
 import pandas
 
-from .utils import minutesBetween
+from . import timeConfig
+
+from .utils import dayFractionsBetween, readLines, slotsBetween, slotsIn, toSlots
+
+# reads a CSV file with a date (and time) in the first column, only with the rows between fromDT and toDT if they are given
+# the rows are found by seeking in the file, so reading a short interval doesn't take longer for bigger files
+def readCSV(path: str, fromDT: datetime.datetime = None, toDT: datetime.datetime = None) -> pandas.DataFrame:
+	if fromDT is None and toDT is None:
+		data = pandas.read_csv(path, parse_dates=[0])
+	else:
+		data = pandas.read_csv(io.StringIO("".join(readLines(path, fromDT, toDT, header=True))), parse_dates=[0])
+	if data.empty:
+		raise ValueError(f"No data between {fromDT} and {toDT} in {path}")
+	return data
 
 # helper class to deal with time series
 class Profile:
+	# the attributes are kept in slots, as each house and appliance has several profiles
+	__slots__ = ("startingDT", "values", "slotLength")
+	
 	# date and time of the first stored value
 	startingDT: datetime.datetime
 	# the actual stored values
 	values: numpy.ndarray
+	# length of the time slot of each stored value [minutes]
+	slotLength: int
 	
 	# constructor
-	def __init__(self, startingDT: datetime.datetime = None, values: numpy.ndarray = None):
+	# the profile stores values for the time slots of the simulation, unless a different slot length is specified
+	def __init__(self, startingDT: datetime.datetime = None, values: numpy.ndarray = None, slotLength: int = None):
 		self.startingDT = startingDT
+		self.slotLength = timeConfig.slotLength if slotLength is None else slotLength
 		if values is None or startingDT is None:
 			self.values = numpy.empty(0)
 		else:
 			self.values = values.copy()
 	
 	# get values between fromDT and toDT, return zeros if the values are missing
+	# the values are returned for the time slots of the simulation, if the profile stores values for shorter time slots, they are averaged
 	def get(self, fromDT: datetime.datetime, toDT: datetime.datetime = None):
 		if self.startingDT is None:
 			if toDT is None:
 				raise IndexError()
 			else:
-				length = minutesBetween(fromDT, toDT)
+				length = slotsBetween(fromDT, toDT)
 				return numpy.zeros(length)
 		
-		startIndex = minutesBetween(self.startingDT, fromDT)
 		if toDT is None:
+			if self.slotLength != timeConfig.slotLength:
+				return self.get(fromDT, fromDT + datetime.timedelta(minutes=timeConfig.slotLength))[0]
+			startIndex = slotsBetween(self.startingDT, fromDT, self.slotLength)
 			if startIndex < 0 or startIndex >= self.values.size:
 				return 0
 			else:
 				return self.values[startIndex]
 		else:
-			length = minutesBetween(fromDT, toDT)
+			startIndex = slotsBetween(self.startingDT, fromDT, self.slotLength)
+			length = slotsBetween(fromDT, toDT, self.slotLength)
 			res = numpy.zeros(length, dtype=float)
-			stopIndex = min(self.values.size, minutesBetween(self.startingDT, toDT))
+			stopIndex = min(self.values.size, slotsBetween(self.startingDT, toDT, self.slotLength))
 			res[:stopIndex-startIndex] = self.values[startIndex:stopIndex]
-			return res
+			return toSlots(res, self.slotLength)
 	
 	# set values starting at fromDT to newValues
 	def set(self, fromDT: datetime.datetime, newValues: numpy.ndarray):
@@ -51,7 +76,7 @@ class Profile:
 			self.startingDT = fromDT
 			self.values = newValues.copy()
 		else:
-			startIndex = minutesBetween(self.startingDT, fromDT)
+			startIndex = slotsBetween(self.startingDT, fromDT, self.slotLength)
 			newSize = startIndex + newValues.size
 			
 			if newSize > self.values.size:
@@ -64,19 +89,23 @@ class Profile:
 		if self.startingDT is None:
 			self.startingDT = fromDT
 		
-		startIndex = minutesBetween(self.startingDT, fromDT)
+		startIndex = slotsBetween(self.startingDT, fromDT, self.slotLength)
 		newSize = startIndex + valuesToAdd.size
 		
 		if newSize > self.values.size:
 			self.values.resize(newSize, refcheck=False)
 		self.values[startIndex:startIndex+valuesToAdd.size] += valuesToAdd
 	
+	# add up the values between fromDT and toDT to another profile
+	def addTo(self, profile: "Profile", fromDT: datetime.datetime, toDT: datetime.datetime):
+		profile.add(fromDT, self.get(fromDT, toDT))
+	
 	# smoothly transition from the currently stored values to newValues starting at fromDT using a cosine interpolation
 	def transition(self, fromDT: datetime.datetime, newValues: numpy.ndarray):
 		if self.startingDT is None:
 			self.set(fromDT, newValues)
 		else:
-			startIndex = minutesBetween(self.startingDT, fromDT)
+			startIndex = slotsBetween(self.startingDT, fromDT, self.slotLength)
 			overlappingValues = self.values.size - startIndex
 			
 			newSize = startIndex + newValues.size
@@ -97,7 +126,7 @@ class Profile:
 	# multiply the stored values by scale
 	def scale(self, scale):
 		self.values *= scale
-		
+	
 	# delete stored values up to, but not including, toDT
 	def prune(self, toDT: datetime.datetime):
 		if self.startingDT is None:
@@ -105,37 +134,250 @@ class Profile:
 		if toDT <= self.startingDT:
 			return
 		
-		index = minutesBetween(self.startingDT, toDT)
+		index = slotsBetween(self.startingDT, toDT, self.slotLength)
 		self.startingDT = toDT
 		self.values = self.values[index:].copy()
 	
 	# return a copy of this Profile
 	def copy(self):
-		return Profile(self.startingDT, self.values.copy())
+		return Profile(self.startingDT, self.values.copy(), self.slotLength)
 	
-	# return a dictionary of the averate of stored values for each date in this Profile
-	def dailyAverages(self) -> Dict[datetime.date, float]:
+	# return the average of stored values for each date in this Profile
+	def dailyAverages(self) -> "DailyProfile":
 		if self.startingDT is None or self.values.size == 0:
-			return {}
-		
-		averages = {}
+			return DailyProfile()
 		
-		currentDate = self.startingDT.date()
-		startIndex = minutesBetween(self.startingDT, currentDate)
-		endIndex = startIndex + 24*60
-		
-		while startIndex < self.values.size:
-			dayValues = self.values[max(0, startIndex):min(endIndex, self.values.size)]
-			averages[currentDate] = numpy.mean(dayValues)
-			
-			currentDate += datetime.timedelta(days=1)
-			startIndex += 24*60
-			endIndex += 24*60
-		return averages
+		# pad the values to whole days and average each day, ignoring the padding
+		startingDate = self.startingDT.date()
+		slotsPerDay = slotsIn(datetime.timedelta(days=1), self.slotLength)
+		startPadding = -slotsBetween(self.startingDT, startingDate, self.slotLength)
+		endPadding = -(startPadding + self.values.size) % slotsPerDay
+		paddedValues = numpy.concatenate((numpy.full(startPadding, numpy.nan), self.values, numpy.full(endPadding, numpy.nan)))
+		averages = numpy.nanmean(paddedValues.reshape(-1, slotsPerDay), axis=1)
+		return DailyProfile(startingDate, averages)
 	
+	# load a profile from a CSV file with a value for each minute, with the datetime in the first column and the value in the second column
+	# if fromDT or toDT are given, only the values between them are loaded
 	@classmethod
-	def fromCSV(cls, path):
-		data = pandas.read_csv(path, parse_dates=[0])
+	def fromCSV(cls, path: str, fromDT: datetime.datetime = None, toDT: datetime.datetime = None):
+		data = readCSV(path, fromDT, toDT)
 		startingDT = data.iloc[0, 0].to_pydatetime()
 		values = data.iloc[:, 1].values
-		return cls(startingDT, values)
+		return cls(startingDT, values, 1)
+
+# helper class to deal with time series whose values are shared with other profiles instead of copied
+# the values are stored as read-only windows referencing the arrays they were set from,
+# so passing the same values to many profiles (e.g. the prices to all the appliances in a house) costs just one array
+class SharedProfile:
+	__slots__ = ("originDT", "windows")
+	
+	# date and time from which the positions of the windows are counted
+	originDT: datetime.datetime
+	# the position of the first value of each stored window and its values, in the order in which they were set
+	windows: List[Tuple[int, numpy.ndarray]]
+	
+	# constructor
+	def __init__(self):
+		self.originDT = None
+		self.windows = []
+	
+	# get values between fromDT and toDT, return zeros if the values are missing
+	# if all the values are in one window, a read-only view of it is returned instead of a copy
+	def get(self, fromDT: datetime.datetime, toDT: datetime.datetime = None):
+		if toDT is None:
+			values = self.get(fromDT, fromDT + datetime.timedelta(minutes=timeConfig.slotLength))
+			return values[0]
+		
+		length = slotsBetween(fromDT, toDT)
+		if self.originDT is None:
+			return numpy.zeros(length)
+		startIndex = slotsBetween(self.originDT, fromDT)
+		stopIndex = startIndex + length
+		
+		# the windows set later overwrite the earlier ones, so if the last window overlapping the interval covers it whole, it has all the values
+		for windowStart, values in reversed(self.windows):
+			if windowStart < stopIndex and windowStart + values.size > startIndex:
+				if windowStart <= startIndex and stopIndex <= windowStart + values.size:
+					return values[startIndex-windowStart:stopIndex-windowStart]
+				break
+		
+		# otherwise put the values together from all the windows overlapping the interval
+		res = numpy.zeros(length, dtype=float)
+		for windowStart, values in self.windows:
+			overlapStart = max(startIndex, windowStart)
+			overlapStop = min(stopIndex, windowStart + values.size)
+			if overlapStart < overlapStop:
+				res[overlapStart-startIndex:overlapStop-startIndex] = values[overlapStart-windowStart:overlapStop-windowStart]
+		return res
+	
+	# set values starting at fromDT to newValues, without copying them
+	# the values must not be changed afterwards, the profile only keeps a read-only view of them
+	def set(self, fromDT: datetime.datetime, newValues: numpy.ndarray):
+		if self.originDT is None:
+			self.originDT = fromDT
+		values = newValues.view()
+		values.flags.writeable = False
+		self.windows.append((slotsBetween(self.originDT, fromDT), values))
+	
+	# return the date and time right after the last stored value, or None if there are no values
+	def endDT(self) -> datetime.datetime:
+		if not self.windows:
+			return None
+		return self.originDT + datetime.timedelta(minutes=max(start + values.size for start, values in self.windows) * timeConfig.slotLength)
+	
+	# delete the windows with all values before toDT
+	def prune(self, toDT: datetime.datetime):
+		if self.originDT is None:
+			return
+		
+		index = slotsBetween(self.originDT, toDT)
+		self.windows = [(start, values) for start, values in self.windows if start + values.size > index]
+
+# helper class to deal with time series which are zero most of the time, like the demand of an appliance which runs only a few hours a day
+# instead of the values for each time slot, it stores only the events when the values are not zero,
+# either as a constant value for a number of time slots, or as a reference to an array of values
+class SparseProfile:
+	__slots__ = ("originDT", "events")
+	
+	# date and time from which the positions of the events are counted
+	originDT: datetime.datetime
+	# the position of the first time slot of each event, its length and its constant value or its values
+	events: List[Tuple[int, int, Union[float, numpy.ndarray]]]
+	
+	# constructor
+	def __init__(self):
+		self.originDT = None
+		self.events = []
+	
+	# add an event starting at the given time slot after fromDT
+	# if the values are just one number, the event has that value for length time slots, otherwise it has the given values, which are not copied
+	def addEvent(self, fromDT: datetime.datetime, startSlot: int, values: Union[float, numpy.ndarray], length: int = None):
+		if self.originDT is None:
+			self.originDT = fromDT
+		if length is None:
+			length = values.size
+		if length > 0:
+			self.events.append((slotsBetween(self.originDT, fromDT) + startSlot, length, values))
+	
+	# add the values of the events between fromDT and toDT to another profile
+	def addTo(self, profile: Profile, fromDT: datetime.datetime, toDT: datetime.datetime):
+		if self.originDT is None:
+			return
+		startIndex = slotsBetween(self.originDT, fromDT)
+		stopIndex = startIndex + slotsBetween(fromDT, toDT)
+		
+		# make sure the other profile has space for all the values, then add just the parts of the events in the interval to it
+		offset = slotsBetween(profile.startingDT, fromDT) if profile.startingDT is not None else 0
+		if profile.startingDT is None or profile.values.size < offset + stopIndex - startIndex:
+			profile.add(fromDT, numpy.zeros(stopIndex - startIndex))
+			offset = slotsBetween(profile.startingDT, fromDT)
+		for start, length, values in self.events:
+			overlapStart = max(startIndex, start)
+			overlapStop = min(stopIndex, start + length)
+			if overlapStart < overlapStop:
+				target = profile.values[offset+overlapStart-startIndex:offset+overlapStop-startIndex]
+				if isinstance(values, numpy.ndarray):
+					target += values[overlapStart-start:overlapStop-start]
+				else:
+					target += values
+	
+	# get values between fromDT and toDT, zero outside of the events
+	def get(self, fromDT: datetime.datetime, toDT: datetime.datetime) -> numpy.ndarray:
+		res = Profile(fromDT, numpy.zeros(slotsBetween(fromDT, toDT)))
+		self.addTo(res, fromDT, toDT)
+		return res.values
+	
+	# delete the events which end before toDT
+	def prune(self, toDT: datetime.datetime):
+		if self.originDT is None:
+			return
+		
+		index = slotsBetween(self.originDT, toDT)
+		self.events = [event for event in self.events if event[0] + event[1] > index]
+
+# helper class to deal with series of daily values, stored densely for each day from the first date
+class DailyProfile:
+	# date of the first stored value
+	startingDate: datetime.date
+	# the actual stored values, NaN for the days with missing values
+	values: numpy.ndarray
+	
+	# constructor
+	def __init__(self, startingDate: datetime.date = None, values: numpy.ndarray = None):
+		self.startingDate = startingDate
+		if values is None or startingDate is None:
+			self.values = numpy.empty(0)
+		else:
+			self.values = numpy.array(values, dtype=float)
+	
+	# get the index of the value for a given date
+	def index(self, date: datetime.date) -> int:
+		if self.startingDate is None:
+			return -1
+		return (date - self.startingDate).days
+	
+	# get the value for a given date, raise a KeyError if it's missing
+	def __getitem__(self, date: datetime.date) -> float:
+		index = self.index(date)
+		if index < 0 or index >= self.values.size or numpy.isnan(self.values[index]):
+			raise KeyError(date)
+		return self.values[index]
+	
+	# check if there is a value for a given date
+	def __contains__(self, date: datetime.date) -> bool:
+		index = self.index(date)
+		return 0 <= index < self.values.size and not numpy.isnan(self.values[index])
+	
+	# iterate over the dates and their values, skipping the missing values
+	def items(self):
+		for index, value in enumerate(self.values):
+			if not numpy.isnan(value):
+				yield self.startingDate + datetime.timedelta(days=index), value
+	
+	# get the values for the days between fromDate and toDate, NaN where the values are missing
+	def get(self, fromDate: datetime.date, toDate: datetime.date) -> numpy.ndarray:
+		res = numpy.full((toDate - fromDate).days, numpy.nan)
+		startIndex = self.index(fromDate)
+		stopIndex = min(self.values.size, self.index(toDate))
+		if self.startingDate is not None and stopIndex > max(0, startIndex):
+			res[max(0, startIndex)-startIndex:stopIndex-startIndex] = self.values[max(0, startIndex):stopIndex]
+		return res
+	
+	# sum the values of the days between two datetimes, each weighted by the fraction of the day covered by the interval
+	# raise a KeyError if any of the needed values is missing
+	def weightedSum(self, fromDT: datetime.datetime, toDT: datetime.datetime) -> float:
+		firstDate, fractions = dayFractionsBetween(fromDT, toDT)
+		values = self.get(firstDate, firstDate + datetime.timedelta(days=fractions.size))
+		if numpy.isnan(values).any():
+			raise KeyError(firstDate + datetime.timedelta(days=int(numpy.isnan(values).argmax())))
+		return numpy.dot(fractions, values)
+	
+	# sum multiple daily profiles multiplied by their weights, on the days where all the profiles have values
+	@classmethod
+	def weightedTotal(cls, profiles: List["DailyProfile"], weights: List[float]):
+		startingDate = max(profile.startingDate for profile in profiles)
+		endDate = min(profile.startingDate + datetime.timedelta(days=profile.values.size) for profile in profiles)
+		if endDate <= startingDate:
+			return cls()
+		total = numpy.zeros((endDate - startingDate).days)
+		for profile, weight in zip(profiles, weights):
+			total += weight * profile.get(startingDate, endDate)
+		return cls(startingDate, total)
+	
+	# create a daily profile from a dictionary of values for each date
+	@classmethod
+	def fromDict(cls, dct: Dict[datetime.date, float]):
+		if len(dct) == 0:
+			return cls()
+		startingDate = min(dct.keys())
+		values = numpy.full((max(dct.keys()) - startingDate).days + 1, numpy.nan)
+		for date, value in dct.items():
+			values[(date - startingDate).days] = value
+		return cls(startingDate, values)
+	
+	# load a daily profile from a CSV file, with a date in the first column and the corresponding value in the second column
+	# if fromDT or toDT are given, only the values for the days between them are loaded
+	@classmethod
+	def fromCSV(cls, path: str, fromDT: datetime.datetime = None, toDT: datetime.datetime = None):
+		data = readCSV(path, fromDT, toDT)
+		return cls.fromDict({timestamp.date(): value for timestamp, value in data.iloc[:, :2].itertuples(index=False, name=None)})
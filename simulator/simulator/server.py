@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+
+import contextlib
+import datetime
+import http.client
+import http.server
+import io
+import json
+import math
+import multiprocessing
+import multiprocessing.pool
+import os
+import random
+import signal
+import socket
+import socketserver
+import time
+
+from typing import Dict, List, Tuple
+
+import numpy
+import pandas
+
+from . import applianceStatistics, dataConfig, gridStatistics, metrics, priceConfig
+
+from .constants import oneDay
+from .population import Population
+from .simulator import Simulator
+
+# long-running server answering what-if questions with simulations on populations kept in memory
+# the statistics and populations are loaded only once when the server starts, so each query only runs the simulation itself
+# the queries are received as JSON documents over HTTP, either on a local TCP port or on a Unix socket,
+# and the results are sent back as an uncompressed numpy archive, one array for each column of the results and each summary metric
+
+# the port on which the server listens by default
+defaultPort = 8555
+
+# the columns of the results which don't belong to any demand control algorithm, they are sent back for all the queries
+commonColumns = ["Datetime", "PredictedBaseDemand", "ActualBaseDemand", "TargetDemand", "PriceRatio"]
+
+# returns the interval for which all the statistics needed by the simulations are loaded
+# the grid statistics are loaded for each time slot, and the expected consumption of the households combines all the daily appliance statistics
+def statisticsInterval() -> Tuple[datetime.datetime, datetime.datetime]:
+	profiles = [gridStatistics.demandForecast.demand, gridStatistics.actualDemand.demand, gridStatistics.averageHouseholdDraw]
+	dailyProfile = applianceStatistics.expectedDailyConsumption
+	if any(profile.startingDT is None for profile in profiles) or dailyProfile.startingDate is None:
+		return None, None
+	fromDT = max([profile.startingDT for profile in profiles] + [datetime.datetime.combine(dailyProfile.startingDate, datetime.time())])
+	toDT = min([profile.startingDT + datetime.timedelta(minutes=profile.values.size * profile.slotLength) for profile in profiles] + [datetime.datetime.combine(dailyProfile.startingDate, datetime.time()) + dailyProfile.values.size * oneDay])
+	return fromDT, toDT
+
+# checks the price config values changed by a query, as the price config itself accepts anything
+def checkPriceConfig(values: dict):
+	if not isinstance(values, dict):
+		raise ValueError("The price config must be a JSON object")
+	for name, value in values.items():
+		if name not in priceConfig.current():
+			raise ValueError(f"Unknown price config value: {name}")
+		if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+			raise ValueError(f"Invalid price config value {name}: {value!r}, it must be a number")
+		if name in ("cheapIntervalLength", "cheapMinutesCount") and (value != int(value) or value < 0 or value > 24 * 60):
+			raise ValueError(f"Invalid price config value {name}: {value!r}, it must be a whole number of minutes in a day")
+	if values.get("cheapIntervalLength", 1) == 0:
+		raise ValueError("Invalid price config value cheapIntervalLength: 0, it must be positive")
+
+# one what-if question asked from the server
+class Query:
+	# name of the population of houses to simulate
+	population: str
+	# date and time from which to run the simulation
+	startingDT: datetime.datetime
+	# number of days to simulate
+	simulationLength: int
+	# the price config values changed from the config the server was started with
+	priceConfig: dict
+	# the demand control algorithms whose results are sent back
+	strategies: List[str]
+	# seed for the random number generators
+	seed: int
+	
+	# constructor, just saves the parameters
+	def __init__(self, population: str, startingDT: datetime.datetime, simulationLength: int, priceConfig: dict, strategies: List[str], seed: int):
+		self.population = population
+		self.startingDT = startingDT
+		self.simulationLength = simulationLength
+		self.priceConfig = priceConfig
+		self.strategies = strategies
+		self.seed = seed
+	
+	# creates the query from a JSON document received by the server, checking all its values
+	# the population can be left out if the server has only one, and the seed is random unless specified
+	# the statistics must be loaded for the whole interval the simulation needs, if the interval of the loaded statistics is given
+	@classmethod
+	def fromJSON(cls, document: dict, populationNames: List[str], dataInterval: Tuple[datetime.datetime, datetime.datetime] = (None, None)):
+		if not isinstance(document, dict):
+			raise ValueError("The query must be a JSON object")
+		population = document.get("population", populationNames[0] if len(populationNames) == 1 else None)
+		if population not in populationNames:
+			raise ValueError(f"Unknown population: {population}, it must be one of {populationNames}")
+		startingDT = datetime.datetime.strptime(document["startingDate"], "%Y-%m-%d")
+		simulationLength = int(document["simulationLength"])
+		if simulationLength <= 0:
+			raise ValueError(f"Invalid simulation length: {simulationLength}")
+		fromDT, toDT = dataConfig.simulationWindow(startingDT, simulationLength)
+		dataFromDT, dataToDT = dataInterval
+		if (dataFromDT is not None and fromDT < dataFromDT) or (dataToDT is not None and toDT > dataToDT):
+			raise ValueError(f"The statistics are loaded from {dataFromDT} to {dataToDT}, but the simulation needs them from {fromDT} to {toDT}")
+		queryPriceConfig = document.get("priceConfig", {})
+		checkPriceConfig(queryPriceConfig)
+		strategies = document.get("strategies", metrics.strategies)
+		if not isinstance(strategies, list):
+			raise ValueError("The strategies must be a JSON array")
+		for strategy in strategies:
+			if strategy not in metrics.strategies:
+				raise ValueError(f"Unknown strategy: {strategy}, it must be one of {metrics.strategies}")
+		seed = int(document["seed"]) if "seed" in document else random.randrange(2**32)
+		return cls(population, startingDT, simulationLength, queryPriceConfig, strategies, seed)
+
+# the populations and the price config of the running server
+# the worker processes are forked after these are prepared, so they share them (and the loaded statistics) with the main process
+currentPopulations: Dict[str, Population] = {}
+currentPriceConfig: dict = None
+
+# sets up a worker process of the server, the workers ignore the interrupts, the main process stops them when it is interrupted itself
+def initWorker():
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+# runs the simulation for one query and returns its results in the binary format sent back by the server
+def runQuery(query: Query) -> bytes:
+	# each query gets its own random numbers, so the same query always gives the same results
+	random.seed(query.seed)
+	numpy.random.seed(query.seed % 2**32)
+	# start from the config of the server, so that the previous queries run by the same worker don't change the result
+	priceConfig.configure(**{**currentPriceConfig, **query.priceConfig})
+	
+	# nobody would see the progress output of the simulations, so just throw it away
+	st = time.time()
+	with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+		data = Simulator.run(query.startingDT, query.simulationLength, population=currentPopulations[query.population])
+	
+	# the simulator always simulates all the algorithms, the query just chooses which of them to send back
+	summary = {name: value for name, value in metrics.summarize(data).items() if name.startswith(tuple(query.strategies))}
+	data = data[commonColumns + [f"{strategy}Demand" for strategy in query.strategies]]
+	return encodeResults(data, {**summary, "seed": query.seed, "runtime": time.time() - st})
+
+# converts the results of a simulation to an uncompressed numpy archive
+# the date and time of each time slot is stored as a numpy datetime with a minute resolution, and each summary value as a zero-dimensional array
+def encodeResults(data: pandas.DataFrame, summary: dict) -> bytes:
+	arrays = {column: data[column].values for column in data.columns}
+	arrays["Datetime"] = data["Datetime"].values.astype("datetime64[m]")
+	for name, value in summary.items():
+		arrays[f"summary.{name}"] = numpy.array(value)
+	buffer = io.BytesIO()
+	numpy.savez(buffer, **arrays)
+	return buffer.getvalue()
+
+# converts the results received from the server back to the results table and the summary values
+def decodeResults(payload: bytes) -> Tuple[pandas.DataFrame, dict]:
+	with numpy.load(io.BytesIO(payload)) as arrays:
+		data = pandas.DataFrame({name: arrays[name] for name in arrays.files if not name.startswith("summary.")})
+		summary = {name[len("summary."):]: arrays[name].item() for name in arrays.files if name.startswith("summary.")}
+	data["Datetime"] = data["Datetime"].astype("datetime64[ns]")
+	return data, summary
+
+# handler of the HTTP requests sent to the server
+# POST /simulate runs the simulation for the query in the body of the request, GET /populations lists the populations the server has loaded
+class RequestHandler(http.server.BaseHTTPRequestHandler):
+	# sends back a response with a given status and body
+	def respond(self, status: int, body: bytes, contentType: str):
+		self.send_response(status)
+		self.send_header("Content-Type", contentType)
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+	
+	# sends back an error message as plain text
+	def respondError(self, status: int, message: str):
+		self.respond(status, f"{message}\n".encode(), "text/plain; charset=utf-8")
+	
+	# answers the GET requests
+	def do_GET(self):
+		if self.path != "/populations":
+			self.respondError(404, f"Unknown path: {self.path}")
+			return
+		populations = {name: population.houseCount for name, population in self.server.populations.items()}
+		self.respond(200, json.dumps(populations).encode(), "application/json")
+	
+	# answers the POST requests
+	def do_POST(self):
+		if self.path != "/simulate":
+			self.respondError(404, f"Unknown path: {self.path}")
+			return
+		try:
+			document = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+			query = Query.fromJSON(document, list(self.server.populations.keys()), self.server.dataInterval)
+		except (KeyError, TypeError, ValueError) as e:
+			self.respondError(400, f"Invalid query: {e}")
+			return
+		
+		# the HTTP requests are handled each in its own thread, which just waits for the result from the worker pool
+		try:
+			results = self.server.pool.apply(runQuery, (query,))
+		except Exception as e:
+			self.respondError(500, f"Simulation failed: {e}")
+			return
+		self.respond(200, results, "application/octet-stream")
+	
+	# the client address of a Unix socket is just an empty string, so use the socket path instead
+	def address_string(self) -> str:
+		if isinstance(self.client_address, str):
+			return self.server.server_address
+		return super().address_string()
+
+# HTTP server listening on a local TCP port, handling each request in its own thread
+class HTTPServer(http.server.ThreadingHTTPServer):
+	daemon_threads = True
+	
+	# the populations the queries can simulate
+	populations: Dict[str, Population]
+	# the interval for which the statistics are loaded
+	dataInterval: Tuple[datetime.datetime, datetime.datetime]
+	# the pool of worker processes running the simulations
+	pool: multiprocessing.pool.Pool
+
+# HTTP server listening on a Unix socket, handling each request in its own thread
+class UnixHTTPServer(HTTPServer):
+	address_family = socket.AF_UNIX
+	
+	# the server name and port of a Unix socket don't make sense, so skip looking them up
+	def server_bind(self):
+		socketserver.TCPServer.server_bind(self)
+		self.server_name = "localhost"
+		self.server_port = 0
+
+# the server keeping the statistics and populations loaded between the simulations
+class Server:
+	# runs the server until it is interrupted, answering the queries on the given populations
+	# the server listens on the given port on localhost, or on a Unix socket if its path is given
+	# all the simulations run with the currently configured time slot and tick length, and with the currently configured prices unless the query changes them
+	@classmethod
+	def run(cls, populations: Dict[str, Population], port: int = defaultPort, socketPath: str = None, processes: int = None):
+		global currentPopulations, currentPriceConfig
+		
+		if len(populations) == 0:
+			raise ValueError("The server needs at least one population")
+		
+		currentPopulations = populations
+		currentPriceConfig = priceConfig.current()
+		try:
+			# the workers have to be forked before the server starts its threads
+			with multiprocessing.get_context("fork").Pool(processes=processes, initializer=initWorker) as pool:
+				if socketPath is not None:
+					if os.path.exists(socketPath):
+						os.remove(socketPath)
+					server = UnixHTTPServer(socketPath, RequestHandler)
+				else:
+					server = HTTPServer(("localhost", port), RequestHandler)
+				server.populations = populations
+				server.dataInterval = statisticsInterval()
+				server.pool = pool
+				with server:
+					print(f"Serving {len(populations)} populations on {socketPath if socketPath is not None else f'localhost:{port}'}...")
+					try:
+						server.serve_forever()
+					except KeyboardInterrupt:
+						print("Stopping the server")
+				if socketPath is not None:
+					os.remove(socketPath)
+		finally:
+			currentPopulations = {}
+			currentPriceConfig = None
+	
+	# sends a query to a running server and returns the results table and the summary values
+	# the query has the same fields as the JSON document, e.g. Server.query(startingDate="2018-01-01", simulationLength=7, priceConfig={"cheapIntervalLength": 90})
+	@classmethod
+	def query(cls, port: int = defaultPort, socketPath: str = None, **query) -> Tuple[pandas.DataFrame, dict]:
+		connection = http.client.HTTPConnection("localhost", port)
+		if socketPath is not None:
+			connection.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+			connection.sock.connect(socketPath)
+		try:
+			connection.request("POST", "/simulate", body=json.dumps(query), headers={"Content-Type": "application/json"})
+			response = connection.getresponse()
+			body = response.read()
+			if response.status != 200:
+				raise RuntimeError(f"The server answered {response.status}: {body.decode().strip()}")
+		finally:
+			connection.close()
+		return decodeResults(body)
@@ -5,61 +5,106 @@ import gc
 import os
 import time
 
+import numpy
 import pandas
 
-from . import gridStatistics, priceConfig
+from . import demandSketch, gridStatistics, metrics, priceConfig, timeConfig
 
 from .constants import oneDay
 from .grid import Grid
-from .house import House
+from .population import Population
+from .transport import AsyncGrid, Transport
 
 # smart grid simulator main class
 class Simulator:
 	# run the smart grid simulation
+	# if no population of houses is given, a random one with houseCount houses is generated
+	# if a time slot length is given, the simulation runs with that time resolution, otherwise with the currently configured one
+	# similarly, if a tick length is given, the grid and houses move ahead by that many minutes at once, otherwise by the configured tick length
+	# if a transport is given, the grid communicates with the houses through it, with delayed and lost messages
 	@classmethod
-	def run(cls, startingDT: datetime.datetime, simulationLength: int, houseCount: int, outputFolder: str = None):
+	def run(cls, startingDT: datetime.datetime, simulationLength: int, houseCount: int = None, outputFolder: str = None, population: Population = None, slotLength: int = None, tickLength: int = None, transport: Transport = None):
 		# remember the starting time
 		st = time.time()
+		# set the time resolution before creating anything, all the profiles are created with it
+		if slotLength is not None:
+			timeConfig.configure(slotLength=slotLength)
+		if tickLength is not None:
+			timeConfig.configure(tickLength=tickLength)
 		# create the grid
 		print("Creating grid...")
-		grid = Grid()
+		grid = Grid() if transport is None else AsyncGrid(transport)
 		
-		# create random houses and connect them to the grid
+		# generate a random population of houses if there is none, and connect them to the grid
 		print("Creating houses...")
+		if population is None:
+			population = Population.random(houseCount)
+		houseCount = population.houseCount
 		houses = []
-		for _ in range(houseCount):
-			h = House.random()
+		for h in population.houses():
 			grid.connectHouse(h)
 			houses.append(h)
+		
+		try:
+			# set up the grid with the right time
+			# the grid sets up the connected houses itself
+			print("Setting up grid...")
+			grid.setUp(startingDT)
+			
+			print("Preparation took {:.3f}s".format(time.time() - st))
+			print()
 			
-		# set up the grid with the right time
-		# the grid sets up the connected houses itself
-		print("Setting up grid...")
-		grid.setUp(startingDT)
+			# for each tick of the simulation, send tick signals to the grid and houses for them to tell them time has moved
+			# this is to make it easier to possibly change to a simulator architecture with multiple processes
+			# where the simulator only provides the clock signal and the grid and houses take care of everything else
+			endDT = startingDT + simulationLength * oneDay
+			currentDT = startingDT
+			while currentDT < endDT:
+				print("Calculating power draw for", cls.tickName(currentDT))
+				t = time.time()
+				for i, h in enumerate(houses):
+					print(f"\r{i+1}/{houseCount}... ", end="")
+					h.tick()
+				grid.tick()
+				# call garbage collection manually to ease memory pressure
+				gc.collect()
+				print("Calculation took {:.3f}s".format(time.time() - t))
+				print()
+				currentDT += timeConfig.tick()
+		finally:
+			# the messages which are still on their way are not needed anymore
+			if transport is not None:
+				transport.close()
 		
-		print("Preparation took {:.3f}s".format(time.time() - st))
+		print("Simulation took {:.3f}s in total".format(time.time() - st))
 		print()
 		
-		# for each day of the simulation, send tick signals to the grid and houses for them to tell them time has moved
-		# this is to make it easier to possibly change to a simulator architecture with multiple processes
-		# where the simulator only provides the clock signal and the grid and houses take care of everything else
-		endDT = startingDT + simulationLength * oneDay
-		currentDT = startingDT
-		while currentDT < endDT:
-			print("Calculating power draw for", currentDT.date())
-			t = time.time()
-			for i, h in enumerate(houses):
-				print(f"\r{i+1}/{houseCount}... ", end="")
-				h.tick()
-			grid.tick()
-			# call garbage collection manually to ease memory pressure
-			gc.collect()
-			print("Calculation took {:.3f}s".format(time.time() - t))
+		# summarize how the communication went
+		if transport is not None:
+			for name, counts in [("price ratio messages", grid.priceRatioCounts), ("demand reports", grid.reportCounts)]:
+				onTime, late, lost = numpy.sum(list(counts.values()), axis=0)
+				print(f"Of all the {name}, {onTime} arrived on time, {late} were late and {lost} got lost")
 			print()
-			currentDT += oneDay
 		
-		print("Simulation took {:.3f}s in total".format(time.time() - st))
-		print()
+		# collect the results from the grid and save them to a folder if specified
+		data = cls.collectResults(grid, startingDT, simulationLength, houseCount)
+		if outputFolder is not None:
+			cls.saveResults(data, outputFolder, startingDT, simulationLength, houseCount, quantiles=cls.collectQuantiles(grid, startingDT, simulationLength), transport=transport)
+		
+		# return results
+		return data
+	
+	# returns the name of the tick starting at a given time for the progress information, the date if the ticks are whole days
+	@classmethod
+	def tickName(cls, dt: datetime.datetime) -> str:
+		if timeConfig.tickLength % (24 * 60) == 0:
+			return str(dt.date())
+		return str(dt)
+	
+	# collects the results of a finished simulation from the grid
+	@classmethod
+	def collectResults(cls, grid: Grid, startingDT: datetime.datetime, simulationLength: int, houseCount: int) -> pandas.DataFrame:
+		endDT = startingDT + simulationLength * oneDay
 		
 		# collect the results from the grid
 		predictedBaseDemand = grid.predictedBaseDemand.get(startingDT, endDT)
@@ -75,7 +120,7 @@ class Simulator:
 		actualBaseDemand = actualDemand - householdDraw
 		
 		# prepare the datetime column
-		datetimes = [startingDT + datetime.timedelta(minutes=i) for i in range(simulationLength*24*60)]
+		datetimes = [startingDT + datetime.timedelta(minutes=i*timeConfig.slotLength) for i in range(simulationLength*24*60//timeConfig.slotLength)]
 		
 		# gather the results in a pandas dataframe
 		data = pandas.DataFrame({
@@ -89,22 +134,52 @@ class Simulator:
 			"PriceRatio": priceRatio,
 		})
 		
-		# save the results to a folder if specified
-		if outputFolder is not None:
-			os.makedirs(outputFolder, exist_ok=True)
-			
-			# save the simulation parameters to a separate file
-			with open(f"{outputFolder}/desc.txt", "w+") as descfile:
-				descfile.write(f"startingDatetime={startingDT}\n")
-				descfile.write(f"simulationLength={simulationLength}\n")
-				descfile.write(f"houseCount={houseCount}\n")
-				descfile.write(f"lowerPrice={priceConfig.lowerPrice}\n")
-				descfile.write(f"higherPrice={priceConfig.higherPrice}\n")
-				descfile.write(f"cheapIntervalLength={priceConfig.cheapIntervalLength}\n")
-				descfile.write(f"cheapMinutesTotal={priceConfig.cheapMinutesCount}\n")
-			
-			# save the demand values to a csv
-			data.to_csv(f"{outputFolder}/data.csv", index=False, header=True, float_format="%.5f")
-		
-		# return results
 		return data
+	
+	# collects the quantiles of the demands of the individual houses in each time bucket of a finished simulation from the grid
+	# returns None if the grid doesn't know the demands of the individual houses
+	@classmethod
+	def collectQuantiles(cls, grid: Grid, startingDT: datetime.datetime, simulationLength: int) -> pandas.DataFrame:
+		if not grid.sketchHouseholds:
+			return None
+		endDT = startingDT + simulationLength * oneDay
+		
+		# the sketches were completed only up to the end of the last tick, complete also the last bucket if it was cut off
+		quantiles = {}
+		for strategy, sketch in zip(metrics.strategies, (grid.smartSketch, grid.uncontrolledSketch, grid.spreadOutSketch)):
+			sketch.complete()
+			bucketDTs, values = sketch.get(startingDT, endDT)
+			quantiles["Datetime"] = bucketDTs
+			for q, quantile in enumerate(demandSketch.quantiles):
+				quantiles[f"{strategy}HouseholdDemandQ{100*quantile:g}"] = values[:, q]
+			quantiles[f"{strategy}HouseholdDemandMax"] = values[:, -1]
+		
+		return pandas.DataFrame(quantiles)
+	
+	# saves the results of a simulation and its parameters to a folder
+	# if the quantiles of the household demands are given, they are saved next to the results
+	# if the simulation ran with a transport, its parameters are saved with the simulation parameters
+	@classmethod
+	def saveResults(cls, data: pandas.DataFrame, outputFolder: str, startingDT: datetime.datetime, simulationLength: int, houseCount: int, quantiles: pandas.DataFrame = None, transport: Transport = None):
+		os.makedirs(outputFolder, exist_ok=True)
+		
+		# save the simulation parameters to a separate file
+		with open(f"{outputFolder}/desc.txt", "w+") as descfile:
+			descfile.write(f"startingDatetime={startingDT}\n")
+			descfile.write(f"simulationLength={simulationLength}\n")
+			descfile.write(f"houseCount={houseCount}\n")
+			descfile.write(f"lowerPrice={priceConfig.lowerPrice}\n")
+			descfile.write(f"higherPrice={priceConfig.higherPrice}\n")
+			descfile.write(f"cheapIntervalLength={priceConfig.cheapIntervalLength}\n")
+			descfile.write(f"cheapMinutesTotal={priceConfig.cheapMinutesCount}\n")
+			descfile.write(f"slotLength={timeConfig.slotLength}\n")
+			descfile.write(f"tickLength={timeConfig.tickLength}\n")
+			descfile.write(f"coarseToFineScheduling={timeConfig.coarseToFineScheduling}\n")
+			if transport is not None:
+				for name, value in transport.parameters().items():
+					descfile.write(f"transport{name[0].upper()}{name[1:]}={value}\n")
+		
+		# save the demand values to a csv
+		data.to_csv(f"{outputFolder}/data.csv", index=False, header=True, float_format="%.5f")
+		if quantiles is not None:
+			quantiles.to_csv(f"{outputFolder}/quantiles.csv", index=False, header=True, float_format="%.5f")
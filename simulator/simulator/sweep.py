@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+import contextlib
+import datetime
+import itertools
+import multiprocessing
+import os
+import random
+import time
+
+from typing import Dict, List
+
+import numpy
+import pandas
+
+from . import metrics, priceConfig, timeConfig
+
+from .population import Population
+from .simulator import Simulator
+
+# one simulation in a parameter sweep
+class Scenario:
+	# name of the scenario, used as the name of the folder with its results
+	name: str
+	# the price config values used in the scenario
+	priceConfig: dict
+	# date and time from which to run the simulation
+	startingDT: datetime.datetime
+	# number of days to simulate
+	simulationLength: int
+	# number of simulated houses
+	houseCount: int
+	# seed for the random number generators
+	seed: int
+	
+	# constructor, just saves the parameters
+	def __init__(self, name: str, priceConfig: dict, startingDT: datetime.datetime, simulationLength: int, houseCount: int, seed: int):
+		self.name = name
+		self.priceConfig = priceConfig
+		self.startingDT = startingDT
+		self.simulationLength = simulationLength
+		self.houseCount = houseCount
+		self.seed = seed
+
+# the scenarios and populations of the sweep that is currently running
+# the worker processes are forked after these are prepared, so they share them (and the loaded statistics) with the main process
+currentScenarios: List[Scenario] = []
+currentPopulations: Dict[int, Population] = {}
+currentOutputFolder: str = None
+
+# checks the grid of the price config values of a sweep, as any value missing from the current config would be silently left out of the scenarios
+def checkPriceConfigGrid(priceConfigGrid: Dict[str, list]):
+	if not isinstance(priceConfigGrid, dict):
+		raise ValueError("The price config grid must be a JSON object")
+	for name, values in priceConfigGrid.items():
+		if name not in priceConfig.current():
+			raise KeyError(f"Unknown price config value: {name}")
+		if not isinstance(values, list) or len(values) == 0:
+			raise ValueError(f"Invalid price config values {name}: {values!r}, they must be a non-empty list")
+
+# runs the scenario with a given index in the current sweep and returns its summary metrics
+def runScenario(index: int) -> dict:
+	scenario = currentScenarios[index]
+	
+	# each scenario gets its own random numbers, independently of which worker runs it
+	random.seed(scenario.seed)
+	numpy.random.seed(scenario.seed % 2**32)
+	priceConfig.configure(**scenario.priceConfig)
+	
+	# the progress output of the simulations would get mixed up, so save it to a file instead
+	scenarioFolder = f"{currentOutputFolder}/{scenario.name}"
+	os.makedirs(scenarioFolder, exist_ok=True)
+	st = time.time()
+	with open(f"{scenarioFolder}/log.txt", "w") as logFile, contextlib.redirect_stdout(logFile):
+		data = Simulator.run(scenario.startingDT, scenario.simulationLength, outputFolder=scenarioFolder, population=currentPopulations[scenario.houseCount])
+	
+	summary = {
+		"scenario": scenario.name,
+		**scenario.priceConfig,
+		"startingDate": scenario.startingDT.date(),
+		"simulationLength": scenario.simulationLength,
+		"houseCount": scenario.houseCount,
+		"slotLength": timeConfig.slotLength,
+		"tickLength": timeConfig.tickLength,
+		"seed": scenario.seed,
+		**metrics.summarize(data),
+		"runtime": time.time() - st,
+	}
+	print(f"Scenario {scenario.name} finished in {summary['runtime']:.3f}s")
+	return summary
+
+# runner for comparing simulations with multiple price configs, starting dates and house counts
+class Sweep:
+	# runs a simulation for each combination of the price configs, starting dates and house counts
+	# the price configs are specified as lists of possible values for each config value, missing values are taken from the default config
+	# the statistics are loaded only once and each house count gets a single population shared by all its scenarios, so the scenarios are directly comparable
+	# all the scenarios run with the same time slot length, the currently configured one unless specified
+	@classmethod
+	def run(cls, priceConfigGrid: Dict[str, list], startingDTs: List[datetime.datetime], simulationLength: int, houseCounts: List[int], outputFolder: str, processes: int = None, seed: int = None, slotLength: int = None) -> pandas.DataFrame:
+		global currentScenarios, currentPopulations, currentOutputFolder
+		
+		st = time.time()
+		if seed is None:
+			seed = random.randrange(2**32)
+		if slotLength is not None:
+			timeConfig.configure(slotLength=slotLength)
+		
+		# expand the grid of the price config values to all their combinations
+		checkPriceConfigGrid(priceConfigGrid)
+		configNames = list(priceConfig.current().keys())
+		configValues = [priceConfigGrid.get(name, [value]) for name, value in priceConfig.current().items()]
+		priceConfigs = [dict(zip(configNames, values)) for values in itertools.product(*configValues)]
+		
+		# prepare the scenarios
+		scenarios = []
+		for config, startingDT, houseCount in itertools.product(priceConfigs, startingDTs, houseCounts):
+			name = "{:04d}".format(len(scenarios))
+			scenarios.append(Scenario(name, config, startingDT, simulationLength, houseCount, seed + len(scenarios)))
+		
+		# generate one population for each house count
+		print("Creating populations...")
+		numpy.random.seed(seed % 2**32)
+		populations = {houseCount: Population.random(houseCount) for houseCount in sorted(set(houseCounts))}
+		
+		print(f"Running {len(scenarios)} scenarios...")
+		currentScenarios = scenarios
+		currentPopulations = populations
+		currentOutputFolder = outputFolder
+		os.makedirs(outputFolder, exist_ok=True)
+		try:
+			with multiprocessing.get_context("fork").Pool(processes=processes) as pool:
+				summaries = pool.map(runScenario, range(len(scenarios)), chunksize=1)
+		finally:
+			currentScenarios = []
+			currentPopulations = {}
+			currentOutputFolder = None
+		
+		# save a table summarizing all the scenarios
+		summary = pandas.DataFrame(summaries)
+		summary.to_csv(f"{outputFolder}/summary.csv", index=False, header=True, float_format="%.5f")
+		
+		print("Sweep took {:.3f}s in total".format(time.time() - st))
+		return summary
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+import datetime
+
+# the time resolution of the simulation
+
+# possible lengths of one time slot of the simulation [minutes]
+# each of them divides an hour, so the slots are aligned with hours and days
+slotLengths = [1, 5, 15, 60]
+
+# length of one time slot of the simulation [minutes]
+# all the profiles, appliance algorithms and grid planning work with values for each time slot
+slotLength = 1
+
+# length of one tick of the simulation, in which the grid, connections and houses move ahead [minutes]
+# it must either divide a day (for several ticks a day, e.g. to update the prices during the day) or be a whole number of days (for batches of days computed at once)
+tickLength = 24 * 60
+
+# how far ahead the connections send the electricity prices to the houses [minutes]
+# the appliances plan their usage at midnight for a two-day window, so the prices must be known one day past the end of the tick, and at least two days ahead
+# if not set, it is the shortest possible such horizon
+# the grid plans further ahead than that, as it needs to send the price ratios to the connections before they generate the prices
+priceHorizon = None
+
+# if the smart accumulators should first plan their charging in blocks as long as the cheap price intervals and only then in the individual time slots
+# this is much faster, but the result is not always the cheapest possible
+coarseToFineScheduling = False
+
+# overrides the config values
+# has to be called before creating the grid and houses, their profiles keep the time resolution they were created with
+def configure(**values):
+	for name in values:
+		if name not in ("slotLength", "tickLength", "priceHorizon", "coarseToFineScheduling"):
+			raise KeyError(f"Unknown time config value: {name}")
+	
+	# the values depend on each other, so check them all together before setting them
+	newValues = {**current(), **values}
+	minutesPerDay = 24 * 60
+	if newValues["slotLength"] not in slotLengths:
+		raise ValueError(f"Unsupported time slot length: {newValues['slotLength']}, it must be one of {slotLengths}")
+	if newValues["tickLength"] <= 0 or newValues["tickLength"] % newValues["slotLength"] != 0 or (minutesPerDay % newValues["tickLength"] != 0 and newValues["tickLength"] % minutesPerDay != 0):
+		raise ValueError(f"Unsupported tick length: {newValues['tickLength']}, it must be a multiple of the time slot length and either divide a day or be a whole number of days")
+	if newValues["priceHorizon"] is not None and newValues["priceHorizon"] < max(newValues["tickLength"], minutesPerDay) + minutesPerDay:
+		raise ValueError(f"Unsupported price horizon: {newValues['priceHorizon']}, it must be at least one day longer than the tick length and at least two days")
+	
+	for name, value in values.items():
+		globals()[name] = value
+
+# returns the current config values
+def current() -> dict:
+	return {
+		"slotLength": slotLength,
+		"tickLength": tickLength,
+		"priceHorizon": priceHorizon,
+		"coarseToFineScheduling": coarseToFineScheduling,
+	}
+
+# returns the length of one tick of the simulation
+def tick() -> datetime.timedelta:
+	return datetime.timedelta(minutes=tickLength)
+
+# the planning horizons, each of them is how far ahead of the current time something has to be known at the end of each tick
+# with one tick a day, the prices are known two days ahead, the price ratios two and a half days ahead,
+# the target demand three and a half days ahead and the base demand prediction four days ahead
+
+# returns how far ahead the connections know the electricity prices
+# with ticks shorter than a day, the appliances planning at midnight still need the prices for the whole next two days
+def priceHorizonLength() -> datetime.timedelta:
+	if priceHorizon is None:
+		return datetime.timedelta(days=1) + max(tick(), datetime.timedelta(days=1))
+	return datetime.timedelta(minutes=priceHorizon)
+
+# returns how far ahead the grid calculates the price ratios
+# the connections decide the cheap intervals for a whole day at once, as soon as the first prices of that day are needed,
+# so they need the price ratios for the whole day plus some margin for the intervals overlapping midnight
+def priceRatioHorizonLength() -> datetime.timedelta:
+	return priceHorizonLength() + datetime.timedelta(days=1.5) - min(tick(), datetime.timedelta(days=1))
+
+# returns how far ahead the grid calculates the target demand, the price ratio calculation needs it with a day of margin
+def targetDemandHorizonLength() -> datetime.timedelta:
+	return priceRatioHorizonLength() + datetime.timedelta(days=1)
+
+# returns how far ahead the grid predicts the base demand, the target demand calculation needs it with half a day of margin
+def predictionHorizonLength() -> datetime.timedelta:
+	return targetDemandHorizonLength() + datetime.timedelta(days=0.5)
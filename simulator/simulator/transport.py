@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+
+import asyncio
+import datetime
+import selectors
+
+from typing import Callable, Dict, Tuple
+
+import numpy
+
+from . import utils
+
+from .grid import Grid
+
+# the communication between the grid and the connections as messages with a delay, which can also get lost
+# the messages are delivered in an asyncio event loop running in simulated time, so the delays don't slow the simulation down
+
+# selector which never waits, it just moves the simulated time ahead by how long it was supposed to wait
+class SimulatedTimeSelector(selectors.DefaultSelector):
+	# the current simulated time [seconds]
+	now: float
+	
+	# constructor, starts the simulated time at zero
+	def __init__(self):
+		super().__init__()
+		self.now = 0.0
+	
+	# checks the registered files without waiting and moves the simulated time ahead instead
+	def select(self, timeout: float = None):
+		if timeout is not None:
+			self.now += timeout
+		return super().select(0)
+
+# asyncio event loop whose clock is the simulated time of its selector
+# the loop jumps straight to the next scheduled callback instead of waiting for it
+class SimulatedTimeEventLoop(asyncio.SelectorEventLoop):
+	# the selector keeping the simulated time
+	simulatedTimeSelector: SimulatedTimeSelector
+	
+	# constructor, creates the loop with the selector keeping the simulated time
+	def __init__(self):
+		self.simulatedTimeSelector = SimulatedTimeSelector()
+		super().__init__(self.simulatedTimeSelector)
+	
+	# returns the current simulated time
+	def time(self) -> float:
+		return self.simulatedTimeSelector.now
+
+# link between the grid and all its connections, delivering the messages with a random delay or losing them
+class Transport:
+	# the shortest delay of a message [seconds]
+	latency: float
+	# the mean random delay of a message on top of the shortest one [seconds]
+	jitter: float
+	# the probability that a message gets lost
+	lossRate: float
+	# how long after sending the messages the grid waits for them to be delivered [seconds]
+	deadline: float
+	# the messages with delays within this time of each other are delivered together in one batch [seconds]
+	resolution: float
+	# seed of the random number generator for the delays and losses
+	seed: int
+	# random number generator for the delays and losses, separate from the global one so the rest of the simulation is not affected
+	random: numpy.random.Generator
+	# the event loop in which the messages are delivered
+	loop: SimulatedTimeEventLoop
+	
+	# constructor, just saves the parameters and creates the event loop
+	# the deadline must be longer than the shortest delay, otherwise no message would ever arrive in time
+	def __init__(self, latency: float = 0.05, jitter: float = 0.1, lossRate: float = 0.0, deadline: float = 1.0, resolution: float = 0.001, seed: int = None):
+		if deadline <= latency:
+			raise ValueError(f"Unsupported transport deadline: {deadline}, it must be longer than the latency {latency}")
+		self.latency = latency
+		self.jitter = jitter
+		self.lossRate = lossRate
+		self.deadline = deadline
+		self.resolution = resolution
+		self.seed = seed
+		self.random = numpy.random.default_rng(seed)
+		self.loop = SimulatedTimeEventLoop()
+	
+	# sends a message to each of count receivers
+	# the messages arriving before the deadline are passed to deliver, the late ones are passed to deliverLate if it is given, otherwise they are dropped
+	# both get the indices of the receivers whose messages are delivered at the same time, so that there is one callback for each batch instead of for each message
+	# if the messages are reliable, they are all delivered right away
+	# returns how many messages were delivered before the deadline, how many after the deadline and how many were lost
+	def send(self, count: int, deliver: Callable[[numpy.ndarray], None], deliverLate: Callable[[numpy.ndarray], None] = None, reliable: bool = False) -> Tuple[int, int, int]:
+		if reliable:
+			delays = numpy.zeros(count)
+			delivered = numpy.ones(count, dtype=bool)
+		else:
+			delays = self.latency + self.random.exponential(self.jitter, count) if self.jitter > 0 else numpy.full(count, float(self.latency))
+			delivered = self.random.random(count) >= self.lossRate
+		
+		# round the delays up to the resolution, and group the delivered messages with the same delay into batches
+		delays = numpy.ceil(delays / self.resolution) * self.resolution
+		receivers = numpy.flatnonzero(delivered)
+		order = numpy.argsort(delays[receivers], kind="stable")
+		receivers = receivers[order]
+		batchDelays, batchStarts = numpy.unique(delays[receivers], return_index=True)
+		
+		# schedule the delivery of each batch in the event loop
+		for delay, batch in zip(batchDelays, numpy.split(receivers, batchStarts[1:])):
+			if delay < self.deadline:
+				self.loop.call_later(delay, deliver, batch)
+			elif deliverLate is not None:
+				self.loop.call_later(delay, deliverLate, batch)
+		
+		onTime = int(numpy.count_nonzero(delays[receivers] < self.deadline))
+		return onTime, receivers.size - onTime, count - receivers.size
+	
+	# lets the simulated time run until the deadline of the messages sent just now
+	# the late messages stay scheduled and are delivered when waiting for the deadline of some later messages
+	def waitForDeadline(self):
+		self.loop.run_until_complete(asyncio.sleep(self.deadline))
+	
+	# returns the parameters of the transport, e.g. to save them with the results
+	def parameters(self) -> dict:
+		return {
+			"latency": self.latency,
+			"jitter": self.jitter,
+			"lossRate": self.lossRate,
+			"deadline": self.deadline,
+			"resolution": self.resolution,
+			"seed": self.seed,
+		}
+	
+	# closes the event loop, dropping the messages which were not delivered yet
+	def close(self):
+		self.loop.close()
+
+# smart grid communicating with the connections through a transport with delays and losses
+# the price ratios arriving after the deadline are still used by the connections, but only for the rest of the interval they are for
+# the demand reports arriving after the deadline or lost are missing, and the demand of the houses which didn't report it is estimated from the others
+# if no report arrives at all, the demand of the previous tick is used instead, or it is unknown (NaN) if there is no previous tick
+class AsyncGrid(Grid):
+	# the link to the connections
+	transport: Transport
+	# if the messages should be delivered reliably, which they are while setting up the connections
+	reliable: bool
+	# how many of the price ratio messages were delivered before the deadline, after the deadline and lost, for the start of each price ratio interval
+	priceRatioCounts: Dict[datetime.datetime, Tuple[int, int, int]]
+	# how many of the demand reports were delivered before the deadline, after the deadline and lost, for the start of each demand interval
+	reportCounts: Dict[datetime.datetime, Tuple[int, int, int]]
+	
+	# constructor, just prepares all the variables
+	def __init__(self, transport: Transport):
+		super().__init__()
+		self.transport = transport
+		self.reliable = False
+		self.priceRatioCounts = {}
+		self.reportCounts = {}
+	
+	# sets everything up before the start of the simulation
+	# the first price ratios are sent while connecting the houses, so they are delivered right away
+	def setUp(self, dt: datetime.datetime):
+		self.reliable = True
+		super().setUp(dt)
+		self.reliable = False
+	
+	# sends the calculated price ratios to all the connections and waits until the deadline
+	def distributePriceRatios(self, fromDT: datetime.datetime, toDT: datetime.datetime):
+		cheapPriceRatio = self.cheapPriceRatio.get(fromDT, toDT)
+		
+		def deliver(receivers: numpy.ndarray):
+			for index in receivers:
+				self.connections[index].setPriceRatio(fromDT, cheapPriceRatio)
+		
+		self.priceRatioCounts[fromDT] = self.transport.send(len(self.connections), deliver, deliverLate=deliver, reliable=self.reliable)
+		self.transport.waitForDeadline()
+	
+	# asks all the connections for their power demands and sums up the reports that arrived before the deadline
+	def collectDemands(self, fromDT: datetime.datetime, toDT: datetime.datetime):
+		length = utils.slotsBetween(fromDT, toDT)
+		smartDemand = numpy.zeros(length)
+		uncontrolledDemand = numpy.zeros(length)
+		spreadOutDemand = numpy.zeros(length)
+		
+		def deliver(receivers: numpy.ndarray):
+			for index in receivers:
+				conn = self.connections[index]
+				self.addDemands(fromDT, conn.getSmartDemand(fromDT, toDT), conn.getUncontrolledDemand(fromDT, toDT), conn.getSpreadOutDemand(fromDT, toDT), smartDemand, uncontrolledDemand, spreadOutDemand)
+		
+		onTime, late, lost = self.transport.send(len(self.connections), deliver, reliable=self.reliable)
+		self.transport.waitForDeadline()
+		self.reportCounts[fromDT] = (onTime, late, lost)
+		# the sketches only get the demands from the reports which arrived, there is no need to estimate the missing ones for a distribution
+		self.completeSketches(toDT)
+		
+		# estimate the demand of the houses whose reports are missing by scaling up the demand of the houses which reported it
+		if 0 < onTime < len(self.connections):
+			scale = len(self.connections) / onTime
+			smartDemand *= scale
+			uncontrolledDemand *= scale
+			spreadOutDemand *= scale
+		elif onTime == 0 and len(self.connections) > 0:
+			# there is nothing to scale up, so repeat the demand of the previous tick, which is the best guess available
+			previousDT = fromDT - (toDT - fromDT)
+			if self.smartDemand.startingDT is not None and self.smartDemand.startingDT <= previousDT:
+				print(f"Warning: no demand report arrived before the deadline for {fromDT}, using the demand of the previous tick")
+				smartDemand = self.smartDemand.get(previousDT, fromDT)
+				uncontrolledDemand = self.uncontrolledDemand.get(previousDT, fromDT)
+				spreadOutDemand = self.spreadOutDemand.get(previousDT, fromDT)
+			else:
+				print(f"Warning: no demand report arrived before the deadline for {fromDT}, the demand is unknown")
+				smartDemand[:] = numpy.nan
+				uncontrolledDemand[:] = numpy.nan
+				spreadOutDemand[:] = numpy.nan
+		
+		self.smartDemand.set(fromDT, smartDemand)
+		self.uncontrolledDemand.set(fromDT, uncontrolledDemand)
+		self.spreadOutDemand.set(fromDT, spreadOutDemand)
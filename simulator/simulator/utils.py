@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 
 import datetime
+import math
+import re
 from typing import List, Tuple
 
 import numpy
 
+from . import timeConfig
+
 from .constants import oneDay
 
 # helper functions frequently used in the simulator
@@ -21,6 +25,47 @@ def minutesBetween(startDT: datetime.datetime, endDT: datetime.datetime) -> int:
 		endDT = datetime.datetime.combine(endDT, datetime.time())
 	return minutesIn(endDT - startDT)
 
+# counts the time slots of the simulation in a timedelta object
+# the slot length is the one currently configured, unless specified
+def slotsIn(td: datetime.timedelta, slotLength: int = None) -> int:
+	if slotLength is None:
+		slotLength = timeConfig.slotLength
+	return minutesIn(td) // slotLength
+
+# counts the time slots of the simulation between two datetimes
+# the slot length is the one currently configured, unless specified
+def slotsBetween(startDT: datetime.datetime, endDT: datetime.datetime, slotLength: int = None) -> int:
+	if slotLength is None:
+		slotLength = timeConfig.slotLength
+	return minutesBetween(startDT, endDT) // slotLength
+
+# returns the index of the time slot of the day containing a given time of day
+# if roundUp is set, returns the index of the first time slot starting at or after that time instead
+def slotOfDay(time: datetime.time, roundUp: bool = False) -> int:
+	minutes = time.hour * 60 + time.minute
+	if roundUp:
+		return -(-minutes // timeConfig.slotLength)
+	return minutes // timeConfig.slotLength
+
+# averages values given for each minute (or for each shorter time slot) over each time slot of the simulation
+# the values are padded with zeros to whole time slots, so that the total energy of a power profile stays the same
+def toSlots(values: numpy.ndarray, valueSlotLength: int = 1) -> numpy.ndarray:
+	valuesPerSlot = timeConfig.slotLength // valueSlotLength
+	if valuesPerSlot == 1:
+		return values
+	paddedValues = numpy.pad(values, (0, -values.size % valuesPerSlot), mode='constant', constant_values=0)
+	return paddedValues.reshape(-1, valuesPerSlot).mean(axis=1)
+
+# splits time slots into runs of consecutive time slots, returns the first time slot and the length of each run
+def consecutiveRuns(slots: numpy.ndarray) -> List[Tuple[int, int]]:
+	if slots.size == 0:
+		return []
+	slots = numpy.sort(slots)
+	breaks = numpy.flatnonzero(numpy.diff(slots) != 1) + 1
+	starts = numpy.concatenate(([0], breaks))
+	stops = numpy.concatenate((breaks, [slots.size]))
+	return [(int(slots[start]), int(stop - start)) for start, stop in zip(starts, stops)]
+
 # returns the midnights between two datetimes
 def midnightsBetween(startDT: datetime.datetime, endDT: datetime.datetime) -> List[datetime.datetime]:
 	midnights = []
@@ -32,33 +77,28 @@ def midnightsBetween(startDT: datetime.datetime, endDT: datetime.datetime) -> Li
 		currentDT += oneDay
 	return midnights
 
-# returns the days between two datetimes, and for each day also a fraction which is covered in the given interval
-def dayPortionsBetween(startDT: datetime.datetime, endDT: datetime.datetime) -> List[Tuple[float, datetime.date]]:
+# returns the first day between two datetimes, and an array of the fractions of that day and each following day which are covered in the given interval
+def dayFractionsBetween(startDT: datetime.datetime, endDT: datetime.datetime) -> Tuple[datetime.date, numpy.ndarray]:
+	firstDate = startDT.date()
 	if startDT >= endDT:
-		return []
-	elif startDT.date() == endDT.date():
-		return [((endDT - startDT).total_seconds() / (24*60*60), startDT.date())]
-	else:
-		portions = []
-		currentDT = startDT
-		nextMidnight = startDT.replace(hour=0, minute=0, second=0, microsecond=0) + oneDay
-		while nextMidnight <= endDT:
-			portions.append(((nextMidnight - currentDT).total_seconds() / (24*60*60), currentDT.date()))
-			currentDT = nextMidnight
-			nextMidnight = currentDT + oneDay
-		if currentDT < endDT:
-			portions.append(((endDT - currentDT).total_seconds() / (24*60*60), currentDT.date()))
-		return portions
+		return firstDate, numpy.empty(0)
+	firstMidnight = datetime.datetime.combine(firstDate, datetime.time())
+	dayCount = math.ceil((endDT - firstMidnight) / oneDay)
+	fractions = numpy.ones(dayCount)
+	fractions[0] -= (startDT - firstMidnight) / oneDay
+	fractions[-1] -= (firstMidnight + dayCount * oneDay - endDT) / oneDay
+	return firstDate, fractions
 
 # randomly choose an integer with relative probabilities provided in an array
-def randomWithRelativeProbs(relativeProbs: numpy.ndarray, count: int = None):
+# if count is specified, choose that many integers, without repetition unless replace is set
+def randomWithRelativeProbs(relativeProbs: numpy.ndarray, count: int = None, replace: bool = False):
 	if not isinstance(relativeProbs, numpy.ndarray):
 		relativeProbs = numpy.array(relativeProbs)
 	probs = relativeProbs / numpy.sum(relativeProbs)
 	if count is None:
 		return numpy.random.choice(probs.size, p=probs)
 	else:
-		return numpy.random.choice(probs.size, size=count, replace=False, p=probs)
+		return numpy.random.choice(probs.size, size=count, replace=replace, p=probs)
 
 # perform a cosine interpolation from a list of coordinates
 def cosineInterpolation(xs: List[int], ys: List[float]) -> numpy.ndarray:
@@ -69,3 +109,50 @@ def cosineInterpolation(xs: List[int], ys: List[float]) -> numpy.ndarray:
 		res.extend(vals)
 	res.append(ys[-1])
 	return numpy.array(res)
+
+# the date, or the date and time, at the start of a line of a data file
+lineDTPattern = re.compile(rb"\d{4}-\d{2}-\d{2}( \d{2}:\d{2}(:\d{2})?)?")
+
+# returns the date and time at the start of a line of a data file, or None if the line doesn't start with one (e.g. an empty line at the end of the file)
+def lineDT(line: bytes) -> datetime.datetime:
+	match = lineDTPattern.match(line)
+	return datetime.datetime.fromisoformat(match.group(0).decode()) if match else None
+
+# returns the position of the first line between the positions start and end of a file which doesn't start before dt
+# the lines must be sorted by the date and time at their start, so the line can be found by a binary search without reading the whole file
+def seekLine(dataFile, dt: datetime.datetime, start: int, end: int) -> int:
+	# the line is always between lo and hi, and lo is always at the start of a line
+	lo, hi = start, end
+	while lo < hi:
+		# find the first line starting after the middle position
+		mid = (lo + hi) // 2
+		dataFile.seek(mid - 1 if mid > lo else lo)
+		if mid > lo:
+			dataFile.readline()
+		pos = dataFile.tell()
+		# if there is no line starting between the middle and hi, check the line at lo instead
+		if pos >= hi:
+			pos = lo
+			dataFile.seek(lo)
+		line = dataFile.readline()
+		lineStart = lineDT(line)
+		if lineStart is None or lineStart >= dt:
+			hi = pos
+		else:
+			lo = pos + len(line)
+	return lo
+
+# returns the lines of a data file with the date and time at their start between fromDT and toDT, or all the lines if they are not given
+# if the file has a header, it is always returned as the first line
+def readLines(path: str, fromDT: datetime.datetime = None, toDT: datetime.datetime = None, header: bool = False) -> List[str]:
+	with open(path, "rb") as dataFile:
+		headerLine = dataFile.readline() if header else b""
+		start = dataFile.tell()
+		end = dataFile.seek(0, 2)
+		if fromDT is not None:
+			start = seekLine(dataFile, fromDT, start, end)
+		if toDT is not None:
+			end = seekLine(dataFile, toDT, start, end)
+		dataFile.seek(start)
+		lines = dataFile.read(end - start).decode().splitlines(keepends=True)
+	return [headerLine.decode()] + lines if header else lines
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+import datetime
+import json
+import sys
+
+def usage():
+	print(f"Usage: {sys.argv[0]} sweepConfig outputFolder")
+
+if len(sys.argv) != 3:
+	usage()
+	sys.exit(1)
+
+try:
+	with open(sys.argv[1], "r") as sweepConfigFile:
+		sweepConfig = json.load(sweepConfigFile)
+	priceConfigGrid = sweepConfig.get("priceConfig", {})
+	startingDates = [datetime.datetime.strptime(date, "%Y-%m-%d") for date in sweepConfig["startingDates"]]
+	simulationLength = max(0, int(sweepConfig["simulationLength"]))
+	houseCounts = [max(0, int(houseCount)) for houseCount in sweepConfig["houseCounts"]]
+	processes = sweepConfig.get("processes")
+	seed = sweepConfig.get("seed")
+	slotLength = sweepConfig.get("slotLength")
+	if slotLength is not None and int(slotLength) not in [1, 5, 15, 60]:
+		raise ValueError("slotLength must be one of 1, 5, 15 or 60 minutes")
+	outputFolder = sys.argv[2]
+except (OSError, ValueError, KeyError) as e:
+	print(f"Invalid sweep config: {e}")
+	usage()
+	sys.exit(1)
+
+# load only the statistics the simulations need, from the earliest starting date to the end of the latest simulation
+# this has to be configured before importing the simulator
+from simulator import dataConfig
+dataConfig.configureForSimulation(min(startingDates), (max(startingDates) - min(startingDates)).days + simulationLength)
+
+# importing after already running code is evil, I know
+# but this takes a long time and would just delay the parameter checking
+from simulator.sweep import Sweep, checkPriceConfigGrid
+
+try:
+	checkPriceConfigGrid(priceConfigGrid)
+except (KeyError, ValueError) as e:
+	print(f"Invalid sweep config: {e}")
+	usage()
+	sys.exit(1)
+
+Sweep.run(priceConfigGrid, startingDates, simulationLength, houseCounts, outputFolder, processes=processes, seed=seed, slotLength=None if slotLength is None else int(slotLength))
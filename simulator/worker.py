@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+
+import sys
+
+def usage():
+	print(f"Usage: {sys.argv[0]} coordinatorHost [port]")
+
+if len(sys.argv) not in (2, 3):
+	usage()
+	sys.exit(1)
+
+try:
+	host = sys.argv[1]
+	port = int(sys.argv[2]) if len(sys.argv) == 3 else 5555
+	if not 0 < port < 65536:
+		raise ValueError()
+except ValueError:
+	usage()
+	sys.exit(1)
+
+# importing after already running code is evil, I know
+# but this takes a long time and would just delay the parameter checking
+from simulator.distributed import Worker
+
+Worker.run(host, port)